@@ -22,7 +22,7 @@ class BaseAgent(ABC):
         client: OpenAI 클라이언트
         role: 에이전트 역할
         agent_card: 에이전트의 자기소개 카드
-        context_manager: 컨텍스트 관리자 (파일 I/O)
+        context_manager: 컨텍스트 관리자 (메모리 컨텍스트 + 파일 미러)
         system_prompt: 시스템 프롬프트
     """
 
@@ -62,11 +62,11 @@ class BaseAgent(ABC):
         pass
 
     def get_private_context(self) -> str:
-        """에이전트의 비공개 컨텍스트 조회"""
+        """에이전트의 비공개 컨텍스트 조회 (메모리 사본, 디스크 읽기 없음)"""
         return self.context_manager.read_private(self.role)
 
     def get_main_context(self) -> str:
-        """공유 토론 히스토리 조회"""
+        """공유 토론 히스토리 조회 (메모리 사본, 디스크 읽기 없음)"""
         return self.context_manager.read_main()
 
     def update_private_context(self, content: str) -> None:
@@ -3,10 +3,21 @@ ContextManager: 파일 기반 메모리 관리
 
 .md 파일을 메모리 스토리지로 사용하여 실시간 개발자 가시성 제공.
 자동 요약 기능으로 컨텍스트 윈도우 최적화.
+
+토론 히스토리는 추가 전용(append-only)으로 기록:
+- debate_history.jsonl: 구조화된 이벤트 로그 (header / message / compaction)
+- debate_history.md: 메모리의 현재 뷰와 같은 내용을 이어 쓰기 (요약 시에만 전체 재작성)
+발언 1건 추가 비용은 히스토리 길이가 아닌 발언 크기에 비례.
+
+메모리의 ContextView가 기준(authoritative) 컨텍스트이고 .md 파일은 영속화 / 관찰용 미러:
+- 읽기: 캐시된 문자열 그대로 반환 (디스크 읽기 / 복사 없음)
+- 쓰기: 메모리 갱신(version 증가) 후 같은 내용을 파일에 반영
 """
 
+import json
 from datetime import datetime
 from pathlib import Path
+from typing import Any
 
 from openai import OpenAI
 
@@ -44,9 +55,50 @@ PRIVATE_CONTEXT_HEADER_TEMPLATE = """\
 """
 
 
+# =============================================================================
+# ContextView: 메모리 컨텍스트
+# =============================================================================
+
+class ContextView:
+    """
+    컨텍스트 1개의 메모리 사본 (이어 쓰기 조각 + 결합 결과 캐시)
+
+    Attributes:
+        version: 내용이 바뀔 때마다 1씩 증가
+        chars: 현재 문자 수 (결합 없이 계산)
+    """
+
+    def __init__(self, content: str = "") -> None:
+        self._parts: list[str] = []
+        self._text: str | None = None
+        self.chars = 0
+        self.version = 0
+        self.replace(content)
+
+    @property
+    def text(self) -> str:
+        """현재 내용 (결합 결과를 캐시하여 변경 전까지 같은 문자열 반환)"""
+        if self._text is None:
+            self._text = "".join(self._parts)
+            self._parts = [self._text]
+        return self._text
+
+    def append(self, chunk: str) -> None:
+        self._parts.append(chunk)
+        self._text = None
+        self.chars += len(chunk)
+        self.version += 1
+
+    def replace(self, content: str) -> None:
+        self._parts = [content]
+        self._text = content
+        self.chars = len(content)
+        self.version += 1
+
+
 class ContextManager:
     """
-    파일 기반 컨텍스트 관리자
+    파일 기반 컨텍스트 관리자 (메모리 사본이 기준, 파일은 미러)
 
     - Main Context: 공유 토론 히스토리 (debate_history.md)
     - Private Context: 에이전트별 비공개 메모 (agent_*.md)
@@ -60,6 +112,7 @@ class ContextManager:
 
     # 파일명 매핑
     MAIN_FILE = "debate_history.md"
+    MAIN_LOG_FILE = "debate_history.jsonl"
     PRIVATE_FILES = {
         AgentRole.JUDGE: "judge_context.md",
         AgentRole.DEBATER_PRO: "debater_pro_context.md",
@@ -80,17 +133,38 @@ class ContextManager:
         # 디렉토리 생성
         self.memory_dir.mkdir(parents=True, exist_ok=True)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        # 메모리 컨텍스트 (기존 파일이 있으면 그 내용에서 시작)
+        self._main = ContextView(self._read_file(self.MAIN_FILE))
+        self._private = {
+            role: ContextView(self._read_file(filename))
+            for role, filename in self.PRIVATE_FILES.items()
+        }
+
+    def _read_file(self, filename: str) -> str:
+        path = self.memory_dir / filename
+        if path.exists():
+            return path.read_text(encoding="utf-8")
+        return ""
+
+    def _append_file(self, filename: str, chunk: str) -> None:
+        with open(self.memory_dir / filename, "a", encoding="utf-8") as f:
+            f.write(chunk)
+
+    def _write_file(self, filename: str, content: str) -> None:
+        (self.memory_dir / filename).write_text(content, encoding="utf-8")
 
     # =========================================================================
     # Main Context (공유 토론 히스토리)
     # =========================================================================
 
     def read_main(self) -> str:
-        """공유 토론 히스토리 읽기"""
-        path = self.memory_dir / self.MAIN_FILE
-        if path.exists():
-            return path.read_text(encoding="utf-8")
-        return ""
+        """공유 토론 히스토리 읽기 (메모리 사본, 디스크 읽기 없음)"""
+        return self._main.text
+
+    @property
+    def main_version(self) -> int:
+        """공유 토론 히스토리 버전 (변경될 때마다 증가)"""
+        return self._main.version
 
     def append_main(self, message: Message) -> None:
         """
@@ -100,30 +174,80 @@ class ContextManager:
             message: 추가할 메시지
 
         Note:
-            threshold 초과 시 자동 요약 트리거
+            - 이벤트 로그(.jsonl)와 Markdown 뷰(.md) 모두 이어 쓰기
+            - threshold 초과 시 자동 요약 트리거 (이때만 .md 전체 재작성)
         """
-        path = self.memory_dir / self.MAIN_FILE
-        current = self.read_main()
+        markdown = message.to_markdown()
+        self._log_main_event(
+            {
+                "type": "message",
+                "message_id": message.message_id,
+                "role": message.role.value,
+                "timestamp": message.timestamp.isoformat(),
+                "text": message.get_text(),
+                "data": message.get_data(),
+                "metadata": message.metadata,
+                "markdown": markdown,
+            }
+        )
 
-        # 메시지 Markdown 변환 후 추가
-        new_content = current + "\n" + message.to_markdown()
+        chunk = "\n" + markdown
+        self._main.append(chunk)
 
         # 요약 체크
-        if len(new_content) > self.config.summary_threshold:
-            new_content = self._summarize_main(new_content)
+        if self._main.chars > self.config.summary_threshold:
+            current = self._main.text
+            summarized = self._summarize_main(current)
+            if summarized != current:
+                self._main.replace(summarized)
+                self._write_file(self.MAIN_FILE, summarized)
+                self._log_main_event({"type": "compaction", "content": summarized})
+                return
 
-        path.write_text(new_content, encoding="utf-8")
+        self._append_file(self.MAIN_FILE, chunk)
 
     def write_main_header(self) -> None:
-        """토론 히스토리 헤더 작성 (초기화)"""
-        path = self.memory_dir / self.MAIN_FILE
+        """토론 히스토리 헤더 작성 (초기화, 이벤트 로그도 새로 시작)"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         header = MAIN_HEADER_TEMPLATE.format(
             topic=self.config.topic,
             timestamp=timestamp,
         )
-        path.write_text(header, encoding="utf-8")
+        (self.memory_dir / self.MAIN_LOG_FILE).unlink(missing_ok=True)
+        self._main.replace(header)
+        self._write_file(self.MAIN_FILE, header)
+        self._log_main_event({"type": "header", "content": header})
+
+    def _log_main_event(self, event: dict[str, Any]) -> None:
+        """이벤트 로그(.jsonl)에 1줄 추가"""
+        path = self.memory_dir / self.MAIN_LOG_FILE
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    @classmethod
+    def render_main_log(cls, path: Path) -> str:
+        """
+        이벤트 로그를 재생하여 토론 히스토리 Markdown 재구성
+
+        Args:
+            path: debate_history.jsonl 경로
+
+        Returns:
+            debate_history.md와 같은 내용
+        """
+        parts: list[str] = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if event["type"] == "message":
+                    parts.append("\n" + event["markdown"])
+                else:  # header / compaction: 뷰 전체 교체
+                    parts = [event["content"]]
+        return "".join(parts)
 
     def _summarize_main(self, content: str) -> str:
         """
@@ -202,28 +326,27 @@ class ContextManager:
     # =========================================================================
 
     def read_private(self, role: AgentRole) -> str:
-        """에이전트 비공개 컨텍스트 읽기"""
-        path = self.memory_dir / self.PRIVATE_FILES[role]
-        if path.exists():
-            return path.read_text(encoding="utf-8")
-        return ""
+        """에이전트 비공개 컨텍스트 읽기 (메모리 사본, 디스크 읽기 없음)"""
+        return self._private[role].text
+
+    def private_version(self, role: AgentRole) -> int:
+        """에이전트 비공개 컨텍스트 버전 (변경될 때마다 증가)"""
+        return self._private[role].version
 
     def write_private(self, role: AgentRole, content: str) -> None:
         """에이전트 비공개 컨텍스트 덮어쓰기"""
-        path = self.memory_dir / self.PRIVATE_FILES[role]
-        path.write_text(content, encoding="utf-8")
+        self._private[role].replace(content)
+        self._write_file(self.PRIVATE_FILES[role], content)
 
     def append_private(self, role: AgentRole, entry: str) -> None:
-        """에이전트 비공개 컨텍스트에 추가"""
-        path = self.memory_dir / self.PRIVATE_FILES[role]
-        current = self.read_private(role)
+        """에이전트 비공개 컨텍스트에 추가 (이어 쓰기)"""
         timestamp = datetime.now().strftime("%H:%M:%S")
         new_entry = f"\n### [{timestamp}]\n{entry}\n"
-        path.write_text(current + new_entry, encoding="utf-8")
+        self._private[role].append(new_entry)
+        self._append_file(self.PRIVATE_FILES[role], new_entry)
 
     def init_private(self, role: AgentRole, role_description: str) -> None:
         """에이전트 비공개 컨텍스트 초기화"""
-        path = self.memory_dir / self.PRIVATE_FILES[role]
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         header = PRIVATE_CONTEXT_HEADER_TEMPLATE.format(
@@ -231,7 +354,7 @@ class ContextManager:
             role_description=role_description,
             timestamp=timestamp,
         )
-        path.write_text(header, encoding="utf-8")
+        self.write_private(role, header)
 
     # =========================================================================
     # Output (최종 결과물)
@@ -250,22 +373,22 @@ class ContextManager:
 
     def clear_all(self) -> None:
         """모든 메모리 파일 삭제 (새 토론 시작용)"""
-        for file in self.memory_dir.glob("*.md"):
-            file.unlink()
+        for pattern in ("*.md", "*.jsonl"):
+            for file in self.memory_dir.glob(pattern):
+                file.unlink()
+        self._main.replace("")
+        for view in self._private.values():
+            view.replace("")
 
     def get_stats(self) -> dict[str, int]:
-        """메모리 통계 반환"""
+        """메모리 통계 반환 (메모리 사본 기준)"""
         stats: dict[str, int] = {}
 
-        main_path = self.memory_dir / self.MAIN_FILE
-        if main_path.exists():
-            stats["main_context_chars"] = len(main_path.read_text(encoding="utf-8"))
+        if self._main.chars:
+            stats["main_context_chars"] = self._main.chars
 
-        for role, filename in self.PRIVATE_FILES.items():
-            path = self.memory_dir / filename
-            if path.exists():
-                stats[f"{role.value}_chars"] = len(
-                    path.read_text(encoding="utf-8")
-                )
+        for role, view in self._private.items():
+            if view.chars:
+                stats[f"{role.value}_chars"] = view.chars
 
         return stats
@@ -29,8 +29,13 @@ class Settings(BaseSettings):
     llm_max_retries: int = 3
     llm_base_delay: float = 1.0  # seconds
 
-    # Worker
-    worker_poll_interval: int = 1  # seconds between polls when no messages
+    # Worker (Pipeline: prefetch → process → ack)
+    worker_receive_batch_size: int = 10  # ReceiveMessage 1회당 최대 메시지 수 (1~10)
+    worker_wait_time_seconds: int = 20  # Long Polling 대기 시간 (0~20)
+    worker_prefetch_size: int = 20  # prefetch 버퍼에 쌓아둘 최대 메시지 수
+    worker_ack_batch_size: int = 10  # DeleteMessageBatch 1회당 최대 삭제 수
+    worker_ack_flush_interval: float = 0.5  # 배치가 덜 찼을 때 삭제를 미루는 최대 시간 (초)
+    worker_visibility_timeout: int = 300  # 큐의 Visibility Timeout (연장 단위, 초)
 
     class Config:
         env_file = ".env"
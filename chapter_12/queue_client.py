@@ -3,8 +3,10 @@ Chapter 12: Production Backend Engineering - Queue Client
 
 AWS SQS 클라이언트 래퍼
 - 메시지 발행 (send_message)
-- 메시지 수신 (receive_messages) - Long Polling
-- 메시지 삭제 (delete_message)
+- 메시지 수신 (receive_messages) - Long Polling, 배치 수신
+- 메시지 삭제 (delete_message, delete_message_batch)
+- 미처리 메시지 반환 (release_messages)
+- Visibility Timeout 연장 (change_visibility)
 """
 
 import json
@@ -13,6 +15,9 @@ from typing import Optional
 
 import boto3
 
+# SQS 배치 API의 최대 엔트리 수 (ReceiveMessage/DeleteMessageBatch 공통)
+SQS_MAX_BATCH_SIZE = 10
+
 
 @dataclass
 class SQSMessage:
@@ -107,6 +112,42 @@ class SQSClient:
             receipt_handle=msg["ReceiptHandle"],
         )
 
+    def receive_messages(
+        self,
+        max_messages: int = SQS_MAX_BATCH_SIZE,
+        wait_time_seconds: int = 20,
+    ) -> list[SQSMessage]:
+        """
+        메시지 배치 수신 (Long Polling)
+
+        큐가 비어 있으면 최대 wait_time_seconds 동안 SQS 서버에서 대기하므로
+        클라이언트 측 sleep 없이도 빈 폴링 비용이 발생하지 않음
+
+        Args:
+            max_messages: 한 번에 수신할 최대 메시지 수 (1~10)
+            wait_time_seconds: Long Polling 대기 시간 (0~20초)
+
+        Returns:
+            SQSMessage 리스트 (메시지가 없으면 빈 리스트)
+        """
+        response = self.sqs.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=max(1, min(max_messages, SQS_MAX_BATCH_SIZE)),
+            WaitTimeSeconds=wait_time_seconds,
+        )
+
+        messages = []
+        for msg in response.get("Messages", []):
+            body = json.loads(msg["Body"])
+            messages.append(
+                SQSMessage(
+                    job_id=body["job_id"],
+                    input_text=body["input_text"],
+                    receipt_handle=msg["ReceiptHandle"],
+                )
+            )
+        return messages
+
     def delete_message(self, receipt_handle: str) -> None:
         """
         메시지 삭제 (처리 완료 후 호출)
@@ -118,3 +159,68 @@ class SQSClient:
             QueueUrl=self.queue_url,
             ReceiptHandle=receipt_handle,
         )
+
+    def delete_message_batch(self, receipt_handles: list[str]) -> list[str]:
+        """
+        메시지 배치 삭제 (최대 10개씩 나누어 DeleteMessageBatch 호출)
+
+        Args:
+            receipt_handles: 삭제할 메시지들의 핸들
+
+        Returns:
+            삭제에 실패한 receipt_handle 리스트
+        """
+        failed: list[str] = []
+        for start in range(0, len(receipt_handles), SQS_MAX_BATCH_SIZE):
+            chunk = receipt_handles[start : start + SQS_MAX_BATCH_SIZE]
+            response = self.sqs.delete_message_batch(
+                QueueUrl=self.queue_url,
+                Entries=[
+                    {"Id": str(i), "ReceiptHandle": handle}
+                    for i, handle in enumerate(chunk)
+                ],
+            )
+            failed.extend(chunk[int(f["Id"])] for f in response.get("Failed", []))
+        return failed
+
+    def change_visibility(
+        self, receipt_handles: list[str], visibility_timeout: int
+    ) -> list[str]:
+        """
+        메시지 Visibility Timeout 변경 (최대 10개씩 ChangeMessageVisibilityBatch 호출)
+
+        Args:
+            receipt_handles: 변경할 메시지들의 핸들
+            visibility_timeout: 지금부터 다시 보이기까지의 시간 (초)
+
+        Returns:
+            변경에 실패한 receipt_handle 리스트 (이미 다시 보이게 된 메시지 등)
+        """
+        failed: list[str] = []
+        for start in range(0, len(receipt_handles), SQS_MAX_BATCH_SIZE):
+            chunk = receipt_handles[start : start + SQS_MAX_BATCH_SIZE]
+            response = self.sqs.change_message_visibility_batch(
+                QueueUrl=self.queue_url,
+                Entries=[
+                    {
+                        "Id": str(i),
+                        "ReceiptHandle": handle,
+                        "VisibilityTimeout": visibility_timeout,
+                    }
+                    for i, handle in enumerate(chunk)
+                ],
+            )
+            failed.extend(chunk[int(f["Id"])] for f in response.get("Failed", []))
+        return failed
+
+    def release_messages(self, receipt_handles: list[str]) -> None:
+        """
+        처리하지 않은 메시지를 즉시 큐에 반환 (VisibilityTimeout=0)
+
+        Graceful Shutdown 시 미리 가져온(prefetch) 메시지가
+        Visibility Timeout 동안 묶여 있지 않도록 다른 Worker에게 돌려줌
+
+        Args:
+            receipt_handles: 반환할 메시지들의 핸들
+        """
+        self.change_visibility(receipt_handles, 0)
@@ -2,30 +2,48 @@
 Chapter 12: Production Backend Engineering - SQS Worker
 
 SQS 메시지를 소비하고 LLM 감정 분석을 수행하는 Worker
-- Long Polling으로 메시지 수신
+- 3단계 파이프라인: Prefetch(수신) → Process(LLM 호출) → Ack(배치 삭제)
+- Long Polling 배치 수신 (현재 배치 처리 중에 다음 배치를 미리 수신)
+- 비동기 배치 삭제 (delete_message_batch)
 - Graceful Shutdown (SIGINT/SIGTERM)
 - 재시도 로직 (max_retries 초과 시 FAILED)
+- Visibility Timeout 연장 (prefetch 대기 / 처리 중 메시지가 다시 보여 중복 처리되지 않도록)
+
+[파이프라인 구조]
+    Prefetch 스레드 ──(inbox: bounded)──▶ Process(메인 스레드) ──(acks: bounded)──▶ Ack 스레드
+    - 수신/삭제 지연이 LLM 호출과 겹쳐서 진행되므로 작업당 추가 오버헤드가 거의 없음
+    - 큐 크기 제한(backpressure)으로 처리 속도보다 많이 가져오지 않음
+    Heartbeat 스레드: 수신 후 아직 삭제/반환하지 않은 메시지의 Visibility Timeout을
+    남은 시간이 절반 아래로 내려가면 다시 worker_visibility_timeout으로 연장
+    (재시도할 메시지는 연장 대상에서 빼서 Visibility Timeout 후 다시 보이게 함)
 """
 
+import queue
 import signal
 import sys
+import threading
 import time
 
 from config import settings
 from database import JobDatabase
 from llm_client import LLMClient
 from models import JobStatus
-from queue_client import SQSClient
+from queue_client import SQSClient, SQSMessage
+
+# Graceful Shutdown 플래그 (스레드 간 공유)
+shutdown_requested = threading.Event()
+
+# Ack 스레드 종료 신호
+_ACK_STOP = object()
 
-# Graceful Shutdown 플래그
-shutdown_requested = False
+# Heartbeat 스레드 종료 신호 (Ack flush 후 설정)
+heartbeat_stop = threading.Event()
 
 
 def signal_handler(sig, frame):
     """SIGINT/SIGTERM 핸들러"""
-    global shutdown_requested
     print("\n⚠️ Shutdown requested. Finishing current job...")
-    shutdown_requested = True
+    shutdown_requested.set()
 
 
 # 시그널 핸들러 등록
@@ -33,6 +51,247 @@ signal.signal(signal.SIGINT, signal_handler)
 signal.signal(signal.SIGTERM, signal_handler)
 
 
+# ============================================================
+# Visibility Timeout 연장 (Heartbeat)
+# ============================================================
+
+
+class VisibilityLeases:
+    """
+    수신했지만 아직 삭제/반환하지 않은 메시지의 Visibility 만료 예상 시각
+
+    Prefetch 스레드가 추가하고, 메인 스레드가 처리 후 제거하며,
+    Heartbeat 스레드가 만료가 가까운 메시지를 연장합니다.
+    """
+
+    def __init__(self, visibility_timeout: int) -> None:
+        self.visibility_timeout = visibility_timeout
+        self._deadlines: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, messages: list[SQSMessage]) -> None:
+        deadline = time.monotonic() + self.visibility_timeout
+        with self._lock:
+            for msg in messages:
+                self._deadlines[msg.receipt_handle] = deadline
+
+    def remove(self, receipt_handles: list[str]) -> None:
+        with self._lock:
+            for handle in receipt_handles:
+                self._deadlines.pop(handle, None)
+
+    def due(self) -> list[str]:
+        """남은 시간이 Visibility Timeout의 절반 미만인 메시지"""
+        threshold = time.monotonic() + self.visibility_timeout / 2
+        with self._lock:
+            return [
+                h for h, deadline in self._deadlines.items() if deadline < threshold
+            ]
+
+    def renewed(self, receipt_handles: list[str], started: float) -> None:
+        """연장 요청 시각(started) 기준으로 만료 시각 갱신 (그새 제거된 메시지는 제외)"""
+        with self._lock:
+            for handle in receipt_handles:
+                if handle in self._deadlines:
+                    self._deadlines[handle] = started + self.visibility_timeout
+
+
+def heartbeat_loop(sqs: SQSClient, leases: VisibilityLeases) -> None:
+    """
+    Visibility Timeout의 1/10 간격으로 만료가 가까운 메시지 연장
+
+    연장 실패(이미 다시 보이게 된 메시지 등)는 경고 후 연장 대상에서 제외.
+    """
+    interval = max(1.0, leases.visibility_timeout / 10)
+    while not heartbeat_stop.wait(interval):
+        handles = leases.due()
+        if not handles:
+            continue
+        started = time.monotonic()
+        try:
+            failed = sqs.change_visibility(handles, leases.visibility_timeout)
+        except Exception as e:
+            print(f"   ⚠️ Visibility extend error: {e}")
+            continue
+        leases.renewed([h for h in handles if h not in failed], started)
+        if failed:
+            leases.remove(failed)
+            print(f"   ⚠️ {len(failed)} message(s) failed to extend visibility")
+
+
+# ============================================================
+# Stage 1: Prefetch (Long Polling 배치 수신)
+# ============================================================
+
+
+def prefetch_loop(sqs: SQSClient, inbox: queue.Queue, leases: VisibilityLeases) -> None:
+    """
+    다음 배치를 미리 수신하여 inbox에 적재
+
+    inbox가 가득 차면 put에서 대기하므로 처리 속도 이상으로 가져오지 않음.
+    수신한 메시지는 바로 연장 대상(leases)에 추가 (inbox 대기 중에도 연장).
+    종료 요청 시 inbox에 넣지 못한 메시지는 즉시 큐에 반환.
+    """
+    while not shutdown_requested.is_set():
+        try:
+            messages = sqs.receive_messages(
+                max_messages=settings.worker_receive_batch_size,
+                wait_time_seconds=settings.worker_wait_time_seconds,
+            )
+        except Exception as e:
+            print(f"\n❌ Prefetch error: {e}")
+            print("   Retrying in 5 seconds...")
+            shutdown_requested.wait(5)
+            continue
+
+        leases.add(messages)
+        for i, msg in enumerate(messages):
+            if not _put_until_shutdown(inbox, msg):
+                # 종료 중: 남은 메시지는 다른 Worker가 가져가도록 반환
+                _release(sqs, messages[i:], leases)
+                return
+
+
+def _put_until_shutdown(inbox: queue.Queue, msg: SQSMessage) -> bool:
+    """inbox에 여유가 생길 때까지 대기 (종료 요청 시 False)"""
+    while not shutdown_requested.is_set():
+        try:
+            inbox.put(msg, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _release(
+    sqs: SQSClient, messages: list[SQSMessage], leases: VisibilityLeases
+) -> None:
+    """처리하지 않은 메시지를 큐에 반환 (연장 대상에서 제외)"""
+    if not messages:
+        return
+    leases.remove([msg.receipt_handle for msg in messages])
+    try:
+        sqs.release_messages([msg.receipt_handle for msg in messages])
+        print(f"   ↩️ Released {len(messages)} prefetched message(s) back to SQS")
+    except Exception as e:
+        # 반환 실패 시에도 Visibility Timeout 후 자동으로 다시 보임
+        print(f"   ⚠️ Release failed ({e}). Messages reappear after visibility timeout")
+
+
+# ============================================================
+# Stage 2: Process (LLM 감정 분석)
+# ============================================================
+
+
+def process_message(db: JobDatabase, llm: LLMClient, msg: SQSMessage) -> bool:
+    """
+    메시지 1개 처리
+
+    Returns:
+        True면 메시지 삭제(ack) 대상, False면 Visibility Timeout 후 재시도
+    """
+    job_id = msg.job_id
+    print(f"\n📥 Processing job: {job_id}")
+    print(f"   Text: {msg.input_text[:50]}...")
+
+    # 상태를 PROCESSING으로 업데이트
+    db.update_status(job_id, JobStatus.PROCESSING)
+    print(f"   📊 Status: PENDING → PROCESSING")
+
+    try:
+        # 감정 분석 수행
+        print(f"   🤖 Calling LLM...")
+        result = llm.analyze_sentiment(msg.input_text)
+
+        # 성공: 상태를 COMPLETED로 업데이트
+        db.update_status(job_id, JobStatus.COMPLETED, output=result)
+        print(f"   ✅ Status: PROCESSING → COMPLETED")
+        print(f"   📊 Result: {result['sentiment']} ({result['confidence']:.2f})")
+        return True
+
+    except Exception as e:
+        # 실패: 재시도 횟수 확인
+        current_retry = db.get_retry_count(job_id)
+        max_retries = db.get_max_retries(job_id)
+
+        print(f"   ❌ LLM Error: {str(e)[:50]}...")
+        print(f"   🔄 Retry count: {current_retry}/{max_retries}")
+
+        if current_retry < max_retries:
+            # 재시도 가능: 카운트 증가, 상태를 PENDING으로 복원
+            db.increment_retry(job_id)
+            db.update_status(job_id, JobStatus.PENDING)
+            print(f"   ⏳ Will retry later (visibility timeout)")
+            # 메시지를 삭제하지 않음 → Visibility Timeout 후 재시도
+            return False
+
+        # 최대 재시도 초과: FAILED 처리 후 삭제 (더 이상 재시도하지 않음)
+        db.update_status(
+            job_id,
+            JobStatus.FAILED,
+            error=f"Max retries exceeded: {str(e)}",
+        )
+        print(f"   💀 Status: PROCESSING → FAILED")
+        return True
+
+
+# ============================================================
+# Stage 3: Ack (비동기 배치 삭제)
+# ============================================================
+
+
+def ack_loop(sqs: SQSClient, acks: queue.Queue) -> None:
+    """
+    삭제할 receipt_handle을 모아 delete_message_batch로 한 번에 삭제
+
+    배치가 가득 차거나(worker_ack_batch_size), 가장 오래된 항목이
+    worker_ack_flush_interval 이상 대기하면 flush.
+    _ACK_STOP 수신 시 남은 항목을 flush하고 종료.
+    """
+    pending: list[str] = []
+    deadline = 0.0
+
+    while True:
+        timeout = max(0.0, deadline - time.monotonic()) if pending else None
+        try:
+            item = acks.get(timeout=timeout)
+        except queue.Empty:
+            _flush_acks(sqs, pending)
+            continue
+
+        if item is _ACK_STOP:
+            _flush_acks(sqs, pending)
+            return
+
+        if not pending:
+            deadline = time.monotonic() + settings.worker_ack_flush_interval
+        pending.append(item)
+
+        if len(pending) >= settings.worker_ack_batch_size:
+            _flush_acks(sqs, pending)
+
+
+def _flush_acks(sqs: SQSClient, pending: list[str]) -> None:
+    """모아둔 메시지 배치 삭제 (pending은 비워짐)"""
+    if not pending:
+        return
+    handles = pending[:]
+    pending.clear()
+    try:
+        failed = sqs.delete_message_batch(handles)
+        print(f"   🗑️ {len(handles) - len(failed)} message(s) deleted from SQS")
+        if failed:
+            # 삭제 실패 메시지는 Visibility Timeout 후 다시 처리될 수 있음
+            print(f"   ⚠️ {len(failed)} message(s) failed to delete")
+    except Exception as e:
+        print(f"   ❌ Delete batch error: {e}")
+
+
+# ============================================================
+# 메인 실행
+# ============================================================
+
+
 def main():
     """Worker 메인 루프"""
     # 클라이언트 초기화
@@ -61,67 +320,42 @@ def main():
         settings.llm_base_delay,
     )
     print(f"   ✅ OpenAI: gpt-5.1 (max_retries={settings.llm_max_retries})")
-    print("🚀 Worker started. Polling for messages... (Ctrl+C to stop)")
 
-    while not shutdown_requested:
-        try:
-            # 메시지 수신
-            msg = sqs.receive_message()
+    # 파이프라인 구성 (bounded queue로 backpressure 적용)
+    inbox: queue.Queue = queue.Queue(maxsize=settings.worker_prefetch_size)
+    acks: queue.Queue = queue.Queue(maxsize=settings.worker_prefetch_size)
+    leases = VisibilityLeases(settings.worker_visibility_timeout)
 
-            if not msg:
-                # 메시지가 없으면 짧게 대기 후 재시도
-                if not shutdown_requested:
-                    time.sleep(settings.worker_poll_interval)
-                continue
-
-            job_id = msg.job_id
-            print(f"\n📥 Processing job: {job_id}")
-            print(f"   Text: {msg.input_text[:50]}...")
+    prefetch_thread = threading.Thread(
+        target=prefetch_loop, args=(sqs, inbox, leases), name="prefetch", daemon=True
+    )
+    ack_thread = threading.Thread(
+        target=ack_loop, args=(sqs, acks), name="ack", daemon=True
+    )
+    heartbeat_thread = threading.Thread(
+        target=heartbeat_loop, args=(sqs, leases), name="heartbeat", daemon=True
+    )
+    prefetch_thread.start()
+    ack_thread.start()
+    heartbeat_thread.start()
+    print("🚀 Worker started. Pipeline: prefetch → process → ack (Ctrl+C to stop)")
 
-            # 상태를 PROCESSING으로 업데이트
-            db.update_status(job_id, JobStatus.PROCESSING)
-            print(f"   📊 Status: PENDING → PROCESSING")
+    while not shutdown_requested.is_set():
+        try:
+            # prefetch된 메시지 꺼내기 (빈 큐에서는 Long Polling이 대기를 담당)
+            try:
+                msg = inbox.get(timeout=0.5)
+            except queue.Empty:
+                continue
 
+            # 처리 결과와 관계없이 (예외 포함) 연장 중단
+            # (삭제 예정 / 재시도는 Visibility Timeout 후 다시 보임)
             try:
-                # 감정 분석 수행
-                print(f"   🤖 Calling LLM...")
-                result = llm.analyze_sentiment(msg.input_text)
-
-                # 성공: 상태를 COMPLETED로 업데이트
-                db.update_status(job_id, JobStatus.COMPLETED, output=result)
-                print(f"   ✅ Status: PROCESSING → COMPLETED")
-                print(f"   📊 Result: {result['sentiment']} ({result['confidence']:.2f})")
-
-                # SQS에서 메시지 삭제
-                sqs.delete_message(msg.receipt_handle)
-                print(f"   🗑️ Message deleted from SQS")
-
-            except Exception as e:
-                # 실패: 재시도 횟수 확인
-                current_retry = db.get_retry_count(job_id)
-                max_retries = db.get_max_retries(job_id)
-
-                print(f"   ❌ LLM Error: {str(e)[:50]}...")
-                print(f"   🔄 Retry count: {current_retry}/{max_retries}")
-
-                if current_retry < max_retries:
-                    # 재시도 가능: 카운트 증가, 상태를 PENDING으로 복원
-                    db.increment_retry(job_id)
-                    db.update_status(job_id, JobStatus.PENDING)
-                    print(f"   ⏳ Will retry later (visibility timeout)")
-                    # 메시지를 삭제하지 않음 → Visibility Timeout 후 재시도
-                else:
-                    # 최대 재시도 초과: FAILED 처리
-                    db.update_status(
-                        job_id,
-                        JobStatus.FAILED,
-                        error=f"Max retries exceeded: {str(e)}",
-                    )
-                    print(f"   💀 Status: PROCESSING → FAILED")
-
-                    # SQS에서 메시지 삭제 (더 이상 재시도하지 않음)
-                    sqs.delete_message(msg.receipt_handle)
-                    print(f"   🗑️ Message deleted from SQS")
+                done = process_message(db, llm, msg)
+            finally:
+                leases.remove([msg.receipt_handle])
+            if done:
+                acks.put(msg.receipt_handle)
 
         except KeyboardInterrupt:
             # Ctrl+C 처리 (signal_handler에서 이미 처리됨)
@@ -129,10 +363,26 @@ def main():
         except Exception as e:
             print(f"\n❌ Worker error: {e}")
             print("   Retrying in 5 seconds...")
-            time.sleep(5)
+            shutdown_requested.wait(5)
 
-    # 정리
+    # 정리: 수신 중단 → 남은 prefetch 반환 → 대기 중인 삭제 flush
     print("\n🛑 Worker shutting down...")
+    shutdown_requested.set()
+    prefetch_thread.join(timeout=settings.worker_wait_time_seconds + 5)
+
+    remaining: list[SQSMessage] = []
+    while True:
+        try:
+            remaining.append(inbox.get_nowait())
+        except queue.Empty:
+            break
+    _release(sqs, remaining, leases)
+
+    acks.put(_ACK_STOP)
+    ack_thread.join()
+    print("   ✅ Pending acks flushed")
+    heartbeat_stop.set()
+
     db.close()
     print("   ✅ MongoDB connection closed")
     sys.exit(0)
@@ -0,0 +1,396 @@
+"""
+Chapter 3-2: Router 벤치마크 - 라벨 세트 기준 정확도 / 지연 / 비용 비교
+
+라벨 세트(JSONL)의 모든 메시지를 router마다 동시에(스레드 풀) 실행하여 비교합니다.
+
+[라벨 세트]
+- 기본값: routing_labels_holdout.jsonl (평가 전용)
+- routing_labels.jsonl은 router_cascade --tune이 임계값을 맞춘 세트이므로
+  그대로 쓰면 cascade 정확도 / 비용이 학습 세트 기준 수치가 됨 (실행 시 경고)
+- 튜닝 세트 / semantic 예시와 겹치는 메시지가 있으면 경고
+
+[지표]
+- 정확도, intent별 precision / recall / F1, 혼동 행렬 (행: 정답, 열: 예측)
+- 메시지당 지연 p50 / p95 (ms)
+- 1,000건당 API 호출 수(LLM / Embedding)와 추정 비용 (router_cascade.STAGE_COST_USD 기준)
+
+[LLM / Embedding 응답] (반복 실행해도 같은 결과)
+- fake: 네트워크 없음. LLM은 라벨 정답을 반환(oracle), Embedding은 문자 bigram 해시 벡터
+  → router 로직 / 지연 / 호출 수 비교용 (semantic 정확도는 의미 없음)
+- cached: 실제 API 응답을 .cache/bench/api_responses.json에 기록 후 재사용
+  → 처음 1회만 API 호출, 이후에는 오프라인으로 같은 결과 재현
+- 재사용 / fake 응답에는 --llm-ms, --embedding-ms 만큼 지연을 넣어 실제 호출 지연을 흉내 냄
+
+[API 호출 수]
+- 재사용 여부와 관계없이 router가 요청한 호출을 셈 (실서비스 비용 추정)
+- router마다 semantic 임베딩 캐시를 비우고 시작 (예시 행렬은 미리 계산되어 제외)
+
+실행:
+  python chapter_3-2/bench_routers.py --llm fake
+  python chapter_3-2/bench_routers.py --llm cached --routers rule semantic cascade --json bench.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+import router_cascade
+import router_distilled
+import router_llm
+import router_rule
+import router_semantic
+from router_cascade import LABELS_PATH, STAGE_COST_USD, example_overlap, load_labels
+from routing_cache import normalize_message
+
+# 평가 전용 라벨 세트 (튜닝 세트 LABELS_PATH / semantic 예시와 겹치지 않음)
+HOLDOUT_LABELS_PATH = Path(__file__).parent / "routing_labels_holdout.jsonl"
+
+ROUTERS = {
+    "rule": router_rule,
+    "semantic": router_semantic,
+    "llm": router_llm,
+    "cascade": router_cascade,
+    "distilled": router_distilled,
+}
+INTENTS = ("faq", "order", "human")
+OTHER = "other"  # 오류 또는 알 수 없는 intent
+
+# API 호출 종류별 1회 비용 (USD)
+CALL_COST_USD = {"llm": STAGE_COST_USD["llm"], "embedding": STAGE_COST_USD["semantic"]}
+
+BENCH_DIR = Path(__file__).parent / ".cache" / "bench"
+RESPONSES_PATH = BENCH_DIR / "api_responses.json"
+FAKE_EMBEDDING_DIMENSIONS = 256
+
+
+class ResponseStore:
+    """API 응답 기록 / 재사용 (요청 파라미터 해시 → 응답)"""
+
+    def __init__(self, path=RESPONSES_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._responses = (
+            json.loads(self.path.read_text(encoding="utf-8"))
+            if self.path.exists()
+            else {}
+        )
+        self.recorded = 0
+
+    @staticmethod
+    def key(kind, params):
+        payload = json.dumps([kind, params], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            return self._responses.get(key)
+
+    def put(self, key, value):
+        with self._lock:
+            self._responses[key] = value
+            self.recorded += 1
+
+    def save(self):
+        if not self.recorded:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(self._responses), encoding="utf-8")
+
+
+def fake_embedding(text):
+    """문자 bigram 해시 벡터 (같은 텍스트 → 항상 같은 벡터)"""
+    vector = np.zeros(FAKE_EMBEDDING_DIMENSIONS, dtype=np.float32)
+    for i in range(max(len(text) - 1, 1)):
+        digest = hashlib.md5(text[i : i + 2].encode("utf-8")).digest()
+        vector[int.from_bytes(digest[:4], "little") % FAKE_EMBEDDING_DIMENSIONS] += 1
+    return vector.tolist()
+
+
+class BenchClient:
+    """
+    OpenAI 클라이언트 대체 (responses.create / embeddings.create만 지원)
+
+    호출 수를 종류별로 세고, mode에 따라 fake 응답 또는 기록된 응답을 반환합니다.
+
+    Args:
+        mode: "fake" | "cached"
+        labels: {메시지: 정답 intent} (fake LLM용)
+        store: ResponseStore (cached용)
+        live_client: 기록되지 않은 요청에 사용할 실제 클라이언트 (cached용)
+        llm_ms / embedding_ms: fake / 재사용 응답에 넣을 지연
+    """
+
+    def __init__(
+        self, mode, labels, store=None, live_client=None, llm_ms=0, embedding_ms=0
+    ):
+        self.mode = mode
+        self.labels = labels
+        self.store = store
+        self.live_client = live_client
+        self.llm_ms = llm_ms
+        self.embedding_ms = embedding_ms
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self.responses = SimpleNamespace(create=self._create_response)
+        self.embeddings = SimpleNamespace(create=self._create_embedding)
+
+    def _count(self, kind):
+        with self._lock:
+            self.calls[kind] += 1
+
+    def _replay(self, kind, params, live, fake, delay_ms):
+        """fake 응답 / 기록된 응답(지연 추가) / 실제 호출 후 기록"""
+        if self.mode == "fake":
+            time.sleep(delay_ms / 1000)
+            return fake()
+        key = ResponseStore.key(kind, params)
+        value = self.store.get(key)
+        if value is None:
+            value = live()
+            self.store.put(key, value)
+        else:
+            time.sleep(delay_ms / 1000)
+        return value
+
+    def _create_response(self, **params):
+        self._count("llm")
+        user_message = params["input"][-1]["content"]
+        text = self._replay(
+            "responses",
+            params,
+            live=lambda: self.live_client.responses.create(**params)
+            .output[0]
+            .content[0]
+            .text,
+            fake=lambda: json.dumps({"intent": self.labels.get(user_message, "human")}),
+            delay_ms=self.llm_ms,
+        )
+        content = SimpleNamespace(text=text)
+        return SimpleNamespace(output=[SimpleNamespace(content=[content])])
+
+    def _create_embedding(self, **params):
+        self._count("embedding")
+        texts = (
+            params["input"] if isinstance(params["input"], list) else [params["input"]]
+        )
+        vectors = self._replay(
+            "embeddings",
+            params,
+            live=lambda: [
+                item.embedding
+                for item in self.live_client.embeddings.create(**params).data
+            ],
+            fake=lambda: [fake_embedding(text) for text in texts],
+            delay_ms=self.embedding_ms,
+        )
+        return SimpleNamespace(
+            data=[SimpleNamespace(embedding=vector) for vector in vectors]
+        )
+
+
+def classify(router, client, message):
+    """
+    Returns:
+        tuple: (예측 intent, 지연 ms)
+    """
+    start = time.perf_counter()
+    try:
+        intent = json.loads(router.run(client, message))["intent"]
+    except Exception:
+        intent = OTHER
+    if intent not in INTENTS:
+        intent = OTHER
+    return intent, (time.perf_counter() - start) * 1000
+
+
+def classification_report(expected, predicted):
+    """
+    Returns:
+        dict: accuracy, intent별 precision / recall / f1 / support, confusion (정답 × 예측)
+    """
+    columns = INTENTS + (OTHER,)
+    confusion = np.zeros((len(INTENTS), len(columns)), dtype=np.int64)
+    for truth, guess in zip(expected, predicted):
+        confusion[INTENTS.index(truth), columns.index(guess)] += 1
+
+    per_intent = {}
+    for i, intent in enumerate(INTENTS):
+        tp = confusion[i, i]
+        predicted_count = confusion[:, i].sum()
+        support = confusion[i].sum()
+        precision = tp / predicted_count if predicted_count else 0.0
+        recall = tp / support if support else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if tp else 0.0
+        per_intent[intent] = {
+            "precision": float(precision),
+            "recall": float(recall),
+            "f1": float(f1),
+            "support": int(support),
+        }
+    return {
+        "accuracy": float(np.trace(confusion[:, : len(INTENTS)]) / len(expected)),
+        "per_intent": per_intent,
+        "confusion": confusion.tolist(),
+    }
+
+
+def benchmark_router(name, make_client, labels, workers):
+    """router 1개를 라벨 세트 전체에 동시 실행"""
+    router = ROUTERS[name]
+    client = make_client()
+    # 빈 인메모리 캐시로 교체 (디스크 캐시는 보존, 콜드 지연 측정)
+    router_semantic.set_embedding_cache(router_semantic.EmbeddingCache(":memory:"))
+    messages = [label["message"] for label in labels]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda m: classify(router, client, m), messages))
+    wall_seconds = time.perf_counter() - start
+
+    predicted = [intent for intent, _ in results]
+    latencies = [latency for _, latency in results]
+    per_1k = 1000 / len(messages)
+    return {
+        "router": name,
+        **classification_report([label["intent"] for label in labels], predicted),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "throughput": len(messages) / wall_seconds,
+        "api_calls_per_1k": {
+            kind: client.calls[kind] * per_1k for kind in CALL_COST_USD
+        },
+        "cost_per_1k": sum(
+            client.calls[kind] * cost for kind, cost in CALL_COST_USD.items()
+        )
+        * per_1k,
+    }
+
+
+def print_results(results):
+    print(
+        f"\n{'router':>10} {'정확도':>6} {'p50(ms)':>8} {'p95(ms)':>8} {'건/s':>7} "
+        f"{'LLM/1k':>7} {'Emb/1k':>7} {'$/1k':>8}"
+    )
+    print("-" * 70)
+    for r in results:
+        calls = r["api_calls_per_1k"]
+        print(
+            f"{r['router']:>10} {r['accuracy']:>6.1%} {r['p50_ms']:>8.1f} "
+            f"{r['p95_ms']:>8.1f} {r['throughput']:>7.1f} {calls['llm']:>7.0f} "
+            f"{calls['embedding']:>7.0f} {r['cost_per_1k']:>8.4f}"
+        )
+
+    columns = INTENTS + (OTHER,)
+    for r in results:
+        print(f"\n📊 {r['router']}")
+        print(
+            f"   {'intent':>6} {'P':>6} {'R':>6} {'F1':>6} {'건수':>4}   혼동 행렬 (예측 →)"
+        )
+        print(
+            f"   {'':>6} {'':>6} {'':>6} {'':>6} {'':>4}   "
+            + " ".join(f"{c:>5}" for c in columns)
+        )
+        for intent, row in zip(INTENTS, r["confusion"]):
+            m = r["per_intent"][intent]
+            print(
+                f"   {intent:>6} {m['precision']:>6.2f} {m['recall']:>6.2f} {m['f1']:>6.2f} "
+                f"{m['support']:>4}   " + " ".join(f"{count:>5}" for count in row)
+            )
+
+
+def check_labels(path, labels):
+    """평가 라벨이 튜닝 세트 / semantic 예시와 겹치면 경고"""
+    if Path(path).resolve() == LABELS_PATH.resolve():
+        print(
+            f"⚠️ {LABELS_PATH.name}은 router_cascade --tune의 튜닝 세트입니다. "
+            "cascade 결과는 학습 세트 기준 수치입니다."
+        )
+        return
+    tuning = {normalize_message(label["message"]) for label in load_labels()}
+    leaked = [
+        label for label in labels if normalize_message(label["message"]) in tuning
+    ]
+    if leaked:
+        print(f"⚠️ 튜닝 세트와 같은 메시지 {len(leaked)}개가 포함되어 있습니다.")
+    overlap = example_overlap(labels)
+    if overlap:
+        print(f"⚠️ semantic 예시와 같은 메시지 {len(overlap)}개가 포함되어 있습니다.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Router 정확도 / 지연 / 비용 벤치마크")
+    parser.add_argument(
+        "--labels", default=str(HOLDOUT_LABELS_PATH), help="라벨 세트 JSONL"
+    )
+    parser.add_argument(
+        "--routers", nargs="+", choices=list(ROUTERS), default=list(ROUTERS)
+    )
+    parser.add_argument("--llm", choices=["fake", "cached"], default="fake")
+    parser.add_argument("--llm-ms", type=float, default=300, help="LLM 응답 지연")
+    parser.add_argument(
+        "--embedding-ms", type=float, default=60, help="Embedding 응답 지연"
+    )
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--json", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    labels = load_labels(args.labels)
+    check_labels(args.labels, labels)
+    answers = {label["message"]: label["intent"] for label in labels}
+    store = live_client = None
+    if args.llm == "cached":
+        from dotenv import load_dotenv
+        from openai import OpenAI
+
+        load_dotenv()
+        store = ResponseStore()
+        live_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+    def make_client():
+        return BenchClient(
+            args.llm, answers, store, live_client, args.llm_ms, args.embedding_ms
+        )
+
+    # 예시 행렬은 모드별로 따로 저장 (fake 벡터가 실제 행렬을 덮어쓰지 않도록) + 미리 계산
+    router_semantic.EXAMPLE_MATRIX_PATH = BENCH_DIR / f"intent_examples_{args.llm}.npz"
+    router_semantic._example_matrix = None
+    router_semantic.load_example_matrix(make_client())
+
+    print(
+        f"📚 라벨 {len(labels)}개 / LLM: {args.llm} "
+        f"(지연 LLM {args.llm_ms:.0f}ms, Embedding {args.embedding_ms:.0f}ms) "
+        f"/ 동시 실행 {args.workers}"
+    )
+    results = [
+        benchmark_router(name, make_client, labels, args.workers)
+        for name in args.routers
+    ]
+    if store is not None:
+        store.save()
+        print(f"   💾 새로 기록한 API 응답 {store.recorded}개 → {store.path}")
+
+    print_results(results)
+    if args.json:
+        report = {
+            "labels": args.labels,
+            "messages": len(labels),
+            "llm": args.llm,
+            "results": results,
+        }
+        Path(args.json).write_text(
+            json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        print(f"\n💾 JSON 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Chapter 3-2: Rule-based Router 벤치마크 - 키워드 수 증가에 따른 분류 비용
+
+키워드 수를 늘려가며 두 방식의 메시지 1건당 키워드 점수 계산 시간을 비교합니다.
+- naive: 키워드마다 `kw in message` (이전 classify_by_keywords 방식, 키워드 수에 비례)
+- aho-corasick: RuleSet.score() (메시지 1회 순회, 키워드 수와 거의 무관)
+
+[키워드 세트]
+- routing_rules.json의 실제 키워드 + 무작위 한글 2~4글자 키워드로 --sizes 개까지 채움
+- 두 방식의 점수가 모두 같은지 먼저 확인한 뒤 시간 측정
+
+실행: python chapter_3-2/bench_rule_router.py --sizes 50 500 5000 50000
+"""
+
+import argparse
+import json
+import random
+import time
+
+from router_rule import RULES_PATH, RuleSet
+from router_cascade import LABELS_PATH, load_labels
+
+
+def random_keyword(rng):
+    return "".join(chr(rng.randint(0xAC00, 0xD7A3)) for _ in range(rng.randint(2, 4)))
+
+
+def build_keywords(base, size, rng):
+    """실제 키워드(base) + 무작위 키워드로 intent별 키워드 리스트 생성 (총 size개)"""
+    keywords = {intent: list(entries) for intent, entries in base.items()}
+    intents = list(keywords)
+    seen = {kw for entries in keywords.values() for kw in entries}
+    while len(seen) < size:
+        keyword = random_keyword(rng)
+        if keyword not in seen:
+            seen.add(keyword)
+            keywords[rng.choice(intents)].append(keyword)
+    return keywords
+
+
+def naive_scores(keywords, message):
+    return {
+        intent: sum(1 for kw in entries if kw in message)
+        for intent, entries in keywords.items()
+    }
+
+
+def per_message_us(score, messages, runs):
+    """메시지 1건당 평균 시간 (µs, runs번 중 가장 빠른 실행 기준)"""
+    best = float("inf")
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        for message in messages:
+            score(message)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(messages) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rule-based Router 키워드 매칭 벤치마크"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000, 50000])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rules = json.loads(RULES_PATH.read_text(encoding="utf-8"))
+    messages = [label["message"] for label in load_labels(LABELS_PATH)]
+    print(
+        f"📚 메시지 {len(messages)}개 (평균 {sum(map(len, messages)) / len(messages):.0f}자)"
+    )
+
+    print(
+        f"\n{'키워드':>8} {'빌드(ms)':>9} {'naive(µs)':>10} {'AC(µs)':>8} {'배속':>6}"
+    )
+    print("-" * 46)
+    for size in args.sizes:
+        keywords = build_keywords(rules["keywords"], size, rng)
+
+        t0 = time.perf_counter()
+        rule_set = RuleSet(keywords, rules.get("patterns", []))
+        build_ms = (time.perf_counter() - t0) * 1000
+
+        # 점수 동일성 확인
+        for message in messages:
+            if rule_set.score(message) != naive_scores(keywords, message):
+                raise SystemExit(f"❌ 점수 불일치: {message}")
+
+        naive = per_message_us(lambda m: naive_scores(keywords, m), messages, args.runs)
+        fast = per_message_us(rule_set.score, messages, args.runs)
+        print(
+            f"{size:>8} {build_ms:>9.1f} {naive:>10.1f} {fast:>8.1f} "
+            f"{naive / fast:>5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
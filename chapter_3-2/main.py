@@ -7,11 +7,15 @@ Chapter 3-2: Intent Routing 패턴 - 다중 Router 방식 비교
 1. LLM-based Router: GPT-5.1을 사용한 유연한 분류
 2. Rule-based Router: 키워드/패턴 기반 빠른 분류
 3. Semantic Router: Embedding 기반 의미적 분류
+
+선택한 router만 요청 경로에서 실행하고, 나머지 router는 백그라운드 shadow로 실행하여
+결과와 지연을 기록합니다. (router_shadow.py, 사용자 응답 지연에 영향 없음)
+API를 호출하는 router(LLM, Semantic)는 정규화된 메시지 기준 라우팅 캐시를 거칩니다. (routing_cache.py)
+
+실서비스용으로는 Cascade Router(Rule → Semantic → LLM)가 router 1개만 실행하여 결정합니다.
 """
 
-import json
 import os
-import time
 
 from dotenv import load_dotenv
 from openai import OpenAI
@@ -19,64 +23,32 @@ from openai import OpenAI
 import module_faq
 import module_human
 import module_order
+import router_cascade
 import router_llm
 import router_rule
 import router_semantic
+from routing_cache import CachedRouter
+from router_shadow import (
+    DEFAULT_LOG_PATH,
+    ShadowLog,
+    ShadowRunner,
+    load_records,
+    print_summary,
+    summarize,
+)
 
 load_dotenv()
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-
-def compare_routers(user_message):
-    """
-    3가지 router를 모두 실행하고 결과를 비교합니다.
-
-    Args:
-        user_message: 사용자 입력 메시지
-
-    Returns:
-        dict: 각 router의 결과 및 성능 메트릭
-    """
-    print(f"\n{'='*70}")
-    print("🔍 Router 방식별 결과 비교")
-    print(f"{'='*70}")
-
-    results = {}
-
-    # Router 1: LLM-based
-    print("\n[1] 🤖 LLM-based Router (GPT-5.1)")
-    print("    특징: 유연성 최고, 비용 발생, 200-500ms 지연")
-    start = time.time()
-    llm_result = router_llm.run(client, user_message)
-    llm_time = (time.time() - start) * 1000
-    llm_intent = json.loads(llm_result)["intent"]
-    print(f"    결과: {llm_intent} (응답시간: {llm_time:.0f}ms)")
-    results["llm"] = {"intent": llm_intent, "time_ms": llm_time, "json": llm_result}
-
-    # Router 2: Rule-based
-    print("\n[2] 📋 Rule-based Router (Keyword/Regex)")
-    print("    특징: 즉시 응답, 무료, 패턴 명확 시 정확")
-    start = time.time()
-    rule_result = router_rule.run(client, user_message)
-    rule_time = (time.time() - start) * 1000
-    rule_intent = json.loads(rule_result)["intent"]
-    print(f"    결과: {rule_intent} (응답시간: {rule_time:.0f}ms)")
-    results["rule"] = {"intent": rule_intent, "time_ms": rule_time, "json": rule_result}
-
-    # Router 3: Semantic Similarity
-    print("\n[3] 🧠 Semantic Router (Embedding)")
-    print("    특징: 의미 이해, 중간 비용, 50-100ms 지연")
-    start = time.time()
-    semantic_result = router_semantic.run(client, user_message)
-    semantic_time = (time.time() - start) * 1000
-    semantic_intent = json.loads(semantic_result)["intent"]
-    print(f"    결과: {semantic_intent} (응답시간: {semantic_time:.0f}ms)")
-    results["semantic"] = {
-        "intent": semantic_intent,
-        "time_ms": semantic_time,
-        "json": semantic_result,
-    }
-    return results
+# 선택한 router 외 나머지는 백그라운드 shadow로 실행 (SHADOW_LOG_PATH: .sqlite 또는 .jsonl)
+# LLM / Semantic은 라우팅 캐시 사용 (Rule은 캐시보다 직접 실행이 빠름)
+ROUTERS = {
+    "llm": CachedRouter(router_llm),
+    "rule": router_rule,
+    "semantic": CachedRouter(router_semantic),
+}
+SHADOW_LOG_PATH = os.getenv("SHADOW_LOG_PATH", str(DEFAULT_LOG_PATH))
+shadow = ShadowRunner(client, ROUTERS, ShadowLog(SHADOW_LOG_PATH))
 
 
 def handle_user_message(user_message, router_type="llm"):
@@ -85,26 +57,39 @@ def handle_user_message(user_message, router_type="llm"):
 
     Args:
         user_message: 사용자 입력 메시지
-        router_type: 사용할 router 타입 ("llm", "rule", "semantic")
+        router_type: 사용할 router 타입 ("llm", "rule", "semantic", "cascade")
 
     Returns:
         str: 최종 답변
     """
     print(f"\n💬 사용자: {user_message}")
 
-    # -------- STEP 1: Router 비교 --------
-    router_results = compare_routers(user_message)
-
-    # -------- STEP 2: 선택한 Router의 결과로 모듈 실행 --------
-    selected_result = router_results[router_type]
-    intent = selected_result["intent"]
+    if router_type == "cascade":
+        # -------- STEP 1~2: Cascade Router 단독 실행 (비교 없음) --------
+        result = router_cascade.route(client, user_message)
+        intent = result["intent"]
+        print(
+            f"🎯 Cascade Router → intent: {intent} "
+            f"(결정 단계: {result['stage']}, {result['time_ms']:.0f}ms, "
+            f"API {result['api_calls']}회, ${result['cost_usd']:.5f})\n"
+        )
+    else:
+        # -------- STEP 1: 선택한 Router 실행 (나머지는 백그라운드 shadow) --------
+        intent, time_ms = shadow.route(router_type, user_message)
 
-    print(f"🎯 최종 선택: {router_type.upper()} Router 결과 사용 → intent: {intent}\n")
+        # -------- STEP 2: 선택한 Router의 결과로 모듈 실행 --------
+        print(
+            f"🎯 {router_type.upper()} Router → intent: {intent} ({time_ms:.0f}ms, "
+            f"shadow: {', '.join(name for name in ROUTERS if name != router_type)})\n"
+        )
 
     # -------- STEP 3: Intent별 모듈 실행 --------
     if "faq" in intent:
         print("📚 FAQ 모듈 실행 중...")
-        answer = module_faq.run(client, user_message)
+        result = module_faq.answer(client, user_message)
+        answer = result["answer"]
+        if result["source"] != "llm":
+            print(f"   🗃️ 저장된 답변 사용 ({result['source']}, {result['match']} 일치)")
     elif "order" in intent:
         print("📦 Order 모듈 실행 중...")
         answer = module_order.run(client, user_message)
@@ -147,3 +132,27 @@ answer3 = handle_user_message(
 )
 print(f"\n💡 최종 답변:\n{answer3}")
 
+# 시나리오 4: Cascade (router 1개만 실행, 결정 단계와 비용 확인)
+print("\n" + "=" * 70)
+print("[시나리오 4: Cascade Router - Rule → Semantic → LLM]")
+answer4 = handle_user_message("교환은 언제까지 가능한가요?", router_type="cascade")
+print(f"\n💡 최종 답변:\n{answer4}")
+
+# 시나리오 5: 라우팅 캐시 (시나리오 1과 띄어쓰기 / 문장부호만 다름 → 캐시 적중)
+print("\n" + "=" * 70)
+print("[시나리오 5: 라우팅 캐시 - 정규화된 메시지 재사용]")
+answer5 = handle_user_message("반품  정책이 어떻게 되나요?!", router_type="llm")
+print(f"\n💡 최종 답변:\n{answer5}")
+
+# -------- Router 방식별 결과 비교 (shadow 기록 기준) --------
+shadow.close()
+print("\n" + "=" * 70)
+print(f"🔍 Router 방식별 결과 비교 (shadow 기록: {SHADOW_LOG_PATH})")
+print_summary(summarize(load_records(SHADOW_LOG_PATH)))
+for name, router in ROUTERS.items():
+    if isinstance(router, CachedRouter):
+        stats = router.stats()
+        print(
+            f"   🗃️ {name} 라우팅 캐시: 적중 {stats['hits']}회 / 미적중 {stats['misses']}회 "
+            f"({stats['hit_rate']:.0%})"
+        )
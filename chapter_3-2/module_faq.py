@@ -1,7 +1,50 @@
 """
 FAQ Module - 제품 관련 일반 질문 답변
+
+[방식]
+1. 검수된 FAQ 저장소(faq_store.json)에서 가장 비슷한 질문 검색
+   - 정규화 후 완전 일치 → 문자 bigram 유사도(Jaccard) → 임베딩 cosine 유사도 순
+   - 문자 유사도는 저장 질문에 없는 bigram이 LEXICAL_MAX_UNMATCHED개 이하일 때만 인정
+     ("해외 배송 기간..."처럼 수식어가 붙은 질문에 "배송 기간..." 답변을 주지 않도록)
+   - 임베딩 유사도는 수식어가 붙은 질문도 높게 나오므로
+     · 검수 항목의 excluded_questions(이 답변을 주면 안 되는 변형)에 가장 가까우면 일치 없음
+     · 검수되지 않은 생성 답변은 더 높은 GENERATED_EMBEDDING_THRESHOLD 적용
+   - threshold 이상이면 저장된 답변을 그대로 반환 (LLM 호출 없음)
+2. 일치하는 질문이 없는 새로운 질문만 LLM으로 답변 생성
+   - 생성 답변은 .cache/faq_generated.jsonl에 저장 → 같은 / 비슷한 질문은 다음부터 재사용
+   - 프롬프트(지식 베이스)가 바뀌면 이전 생성 답변은 사용하지 않음
+
+[비용/성능 특성]
+- 저장소 적중: 완전 일치 / 문자 유사도 ~0.1ms, 임베딩 유사도 Embedding 1회
+  (Semantic router가 같은 메시지를 이미 임베딩했다면 캐시 재사용 → API 호출 없음)
+- 새로운 질문: LLM 생성 1회 (~$0.0001, 수 초)
 """
 
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from router_semantic import EMBEDDING_MODEL, get_embedding, normalize
+from routing_cache import normalize_message
+
+MODEL = "gpt-5.1"
+
+FAQ_STORE_PATH = Path(__file__).parent / "faq_store.json"
+CACHE_DIR = Path(__file__).parent / ".cache"
+VETTED_EMBEDDINGS_PATH = CACHE_DIR / "faq_embeddings.npz"
+GENERATED_PATH = CACHE_DIR / "faq_generated.jsonl"
+
+# 저장된 답변을 그대로 쓰는 최소 유사도
+LEXICAL_THRESHOLD = 0.8
+# 문자 유사도 일치: 질문에만 있는 bigram 허용 개수 (글자 1개 삽입 = bigram 2개)
+LEXICAL_MAX_UNMATCHED = 1
+EMBEDDING_THRESHOLD = 0.85
+# 생성 답변(검수 전)은 거의 같은 질문에만 재사용
+GENERATED_EMBEDDING_THRESHOLD = 0.95
+
 SYSTEM_PROMPT = """
 [역할]
 당신은 제품 지식 베이스를 기반으로 고객 질문에 답변하는 FAQ 전문가입니다.
@@ -32,19 +75,195 @@ SYSTEM_PROMPT = """
 """
 
 
-def run(client, user_message):
-    """
-    FAQ 질문에 대한 답변을 생성합니다.
+def prompt_version():
+    """생성 답변에 영향을 주는 설정(모델 + 프롬프트)의 버전 해시"""
+    payload = f"{MODEL}\n{SYSTEM_PROMPT}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
 
-    Args:
-        client: OpenAI 클라이언트
-        user_message: 사용자 질문
 
-    Returns:
-        str: FAQ 답변 텍스트
+def _bigrams(text):
+    """공백을 제외한 문자 bigram 집합 (한 글자면 그 글자)"""
+    compact = text.replace(" ", "")
+    return {compact[i : i + 2] for i in range(len(compact) - 1)} or {compact}
+
+
+class FaqStore:
+    """
+    FAQ 질문 색인 (검수 항목 + 생성 답변 캐시)
+
+    질문 1개 = 행 1개 (검수 항목은 질문 변형마다 행이 있음)
+    - excluded 행: 검수 항목의 excluded_questions (답변 없음, 가장 가까우면 일치 없음)
+    - 완전 일치: 정규화 질문 → 행 (excluded 행 제외)
+    - 문자 유사도: 행별 bigram 집합
+    - 임베딩 유사도: 행별 정규화 임베딩 행렬 (검수 항목은 1회 배치 임베딩 후 .cache/에 저장)
     """
+
+    def __init__(self, vetted):
+        self.vetted = vetted
+        self.rows = []  # {"question", "id", "answer", "source"}
+        self._exact = {}
+        self._bigrams = []
+        self._thresholds = []  # 행별 임베딩 유사도 threshold
+        self._vectors = None  # (행 수, d), 검수 항목 임베딩 전에는 None
+        self._generated_vectors = []  # 파일에서 읽은 생성 답변 임베딩 (행렬 생성 전)
+        self._lock = threading.Lock()
+        for entry in vetted:
+            for question in entry["questions"]:
+                self._add_row(question, entry["id"], entry["answer"], "vetted")
+            for question in entry.get("excluded_questions", []):
+                self._add_row(question, entry["id"], None, "excluded")
+
+    @classmethod
+    def load(cls):
+        """검수 저장소 + 현재 프롬프트 버전의 생성 답변 캐시"""
+        store = cls(json.loads(FAQ_STORE_PATH.read_text(encoding="utf-8")))
+        if GENERATED_PATH.exists():
+            version = prompt_version()
+            with open(GENERATED_PATH, encoding="utf-8") as f:
+                for line in f:
+                    item = json.loads(line)
+                    if item["prompt_version"] == version:
+                        store._add_row(
+                            item["question"], None, item["answer"], "generated"
+                        )
+                        store._generated_vectors.append(item["embedding"])
+        return store
+
+    def _add_row(self, question, entry_id, answer, source):
+        key = normalize_message(question)
+        self.rows.append(
+            {"question": question, "id": entry_id, "answer": answer, "source": source}
+        )
+        if source != "excluded":
+            self._exact.setdefault(key, len(self.rows) - 1)
+        self._bigrams.append(_bigrams(key))
+        self._thresholds.append(
+            GENERATED_EMBEDDING_THRESHOLD
+            if source == "generated"
+            else EMBEDDING_THRESHOLD
+        )
+
+    @staticmethod
+    def _vetted_version(questions):
+        payload = json.dumps([EMBEDDING_MODEL, questions], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _ensure_vectors(self, client):
+        """검수 질문(excluded 포함) 임베딩 행렬 (저장된 버전이 다르면 1회 배치 임베딩 후 저장)"""
+        if self._vectors is not None:
+            return
+        questions = [
+            row["question"] for row in self.rows if row["source"] != "generated"
+        ]
+        version = self._vetted_version(questions)
+        vetted = None
+        if VETTED_EMBEDDINGS_PATH.exists():
+            with np.load(VETTED_EMBEDDINGS_PATH) as saved:
+                if str(saved["version"]) == version:
+                    vetted = saved["matrix"]
+        if vetted is None:
+            response = client.embeddings.create(model=EMBEDDING_MODEL, input=questions)
+            vetted = normalize([item.embedding for item in response.data])
+            VETTED_EMBEDDINGS_PATH.parent.mkdir(parents=True, exist_ok=True)
+            with open(VETTED_EMBEDDINGS_PATH, "wb") as f:
+                np.savez(f, matrix=vetted, version=np.array(version))
+        generated = self._generated_vectors
+        self._vectors = (
+            np.vstack([vetted, normalize(generated)]) if generated else vetted
+        )
+
+    def match(self, client, question):
+        """
+        가장 비슷한 저장 질문 찾기
+
+        Returns:
+            dict | None: {"row", "match": "exact"|"lexical"|"embedding", "score"}
+                         / threshold를 넘는 질문이 없으면 None
+        """
+        key = normalize_message(question)
+        with self._lock:
+            # STEP 1: 완전 일치 (정규화 기준)
+            if key in self._exact:
+                return {
+                    "row": self.rows[self._exact[key]],
+                    "match": "exact",
+                    "score": 1.0,
+                }
+
+            # STEP 2: 문자 bigram 유사도 (질문에만 있는 bigram이 많으면 제외)
+            grams = _bigrams(key)
+            scores = [
+                (
+                    len(grams & other) / len(grams | other)
+                    if len(grams - other) <= LEXICAL_MAX_UNMATCHED
+                    else 0.0
+                )
+                for other in self._bigrams
+            ]
+            best = int(np.argmax(scores))
+            if scores[best] >= LEXICAL_THRESHOLD:
+                if self.rows[best]["source"] == "excluded":
+                    return None
+                return {
+                    "row": self.rows[best],
+                    "match": "lexical",
+                    "score": scores[best],
+                }
+
+            self._ensure_vectors(client)
+            vectors = self._vectors
+            thresholds = np.array(self._thresholds[: len(vectors)])
+
+        # STEP 3: 임베딩 유사도 (API 호출은 lock 밖에서)
+        # 가장 가까운 질문이 excluded 변형이면 (예: "해외 배송 기간") 일치 없음
+        query = normalize(get_embedding(client, question))
+        similarities = vectors @ query
+        if self.rows[int(np.argmax(similarities))]["source"] == "excluded":
+            return None
+        eligible = np.where(similarities >= thresholds, similarities, -np.inf)
+        best = int(np.argmax(eligible))
+        if np.isfinite(eligible[best]):
+            return {
+                "row": self.rows[best],
+                "match": "embedding",
+                "score": float(similarities[best]),
+            }
+        return None
+
+    def add_generated(self, client, question, answer):
+        """생성 답변 저장 (색인 + .cache/faq_generated.jsonl 추가)"""
+        embedding = list(get_embedding(client, question))
+        with self._lock:
+            self._ensure_vectors(client)
+            self._add_row(question, None, answer, "generated")
+            self._vectors = np.vstack([self._vectors, normalize([embedding])])
+            GENERATED_PATH.parent.mkdir(parents=True, exist_ok=True)
+            with open(GENERATED_PATH, "a", encoding="utf-8") as f:
+                record = {
+                    "question": question,
+                    "answer": answer,
+                    "prompt_version": prompt_version(),
+                    "embedding": embedding,
+                }
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FaqStore.load()
+        return _store
+
+
+def generate(client, user_message):
+    """LLM으로 FAQ 답변 생성 (저장소에 없는 새로운 질문)"""
     response = client.responses.create(
-        model="gpt-5.1",
+        model=MODEL,
         instructions=SYSTEM_PROMPT,
         input=[
             {
@@ -55,3 +274,43 @@ def run(client, user_message):
     )
 
     return response.output[0].content[0].text
+
+
+def answer(client, user_message):
+    """
+    저장소 검색 → (없으면) 생성 + 캐시
+
+    Returns:
+        dict: {"answer", "source": "vetted"|"generated"|"llm", "match", "score"}
+    """
+    store = get_store()
+    found = store.match(client, user_message)
+    if found is not None:
+        row = found["row"]
+        return {
+            "answer": row["answer"],
+            "source": row["source"],
+            "match": found["match"],
+            "score": found["score"],
+        }
+
+    text = generate(client, user_message)
+    store.add_generated(client, user_message, text)
+    return {"answer": text, "source": "llm", "match": None, "score": None}
+
+
+def run(client, user_message):
+    """
+    FAQ 질문에 대한 답변을 반환합니다.
+
+    검수된 FAQ 저장소 / 이전 생성 답변에서 비슷한 질문을 찾으면 저장된 답변을 바로 반환하고,
+    새로운 질문만 LLM으로 생성합니다.
+
+    Args:
+        client: OpenAI 클라이언트
+        user_message: 사용자 질문
+
+    Returns:
+        str: FAQ 답변 텍스트
+    """
+    return answer(client, user_message)["answer"]
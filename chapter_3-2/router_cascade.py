@@ -0,0 +1,392 @@
+"""
+Intent Classifier - Cascade Routing (Rule → Semantic → LLM)
+
+[방식]
+저렴한 router부터 차례로 실행하고, 신뢰도가 충분한 단계에서 바로 결정합니다.
+1. Rule: 정규표현식 패턴 매칭, 또는 키워드 점수 차(1위 - 2위) ≥ rule_margin
+2. Semantic: 유사도 점수 차(1위 - 2위) ≥ semantic_margin (1위 점수는 SIMILARITY_THRESHOLD 이상)
+3. LLM: 앞 단계에서 결정하지 못한 애매한 메시지만
+
+[장점]
+✅ 비용 절감: 명확한 메시지는 무료(Rule) 또는 Embedding 1회로 끝남
+✅ 낮은 평균 지연: LLM 호출은 애매한 메시지에만 발생
+✅ 추적 가능: 어느 단계에서 결정했는지, 비용이 얼마였는지 함께 반환
+
+[임계값 튜닝]
+- 라벨 세트(routing_labels.jsonl)로 메시지별 Rule / Semantic 점수 차를 1회 계산
+  (router_semantic.INTENT_EXAMPLES와 같은 메시지는 유사도 1.0이 되므로 제외)
+- 임계값 조합마다 예상 정확도와 1,000건당 비용 계산 (LLM 단계는 정답으로 가정)
+- 목표 정확도를 만족하는 조합 중 가장 저렴한 조합 → cascade_thresholds.json 저장
+  (router는 파일 수정 시각이 바뀔 때만 다시 읽음)
+
+실행:
+  python chapter_3-2/router_cascade.py "주문 ORD-12345 조회해주세요"
+  python chapter_3-2/router_cascade.py --tune --target-accuracy 0.95
+"""
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+import router_llm
+import router_rule
+import router_semantic
+from routing_cache import normalize_message
+
+STAGES = ("rule", "semantic", "llm")
+
+# 단계별 1회 호출 비용 추정치 (USD, 각 router 문서의 비용 특성 기준)
+STAGE_COST_USD = {"rule": 0.0, "semantic": 0.00002, "llm": 0.0001}
+STAGE_API_CALLS = {"rule": 0, "semantic": 1, "llm": 1}
+
+DEFAULT_THRESHOLDS = {"rule_margin": 2, "semantic_margin": 0.05}
+
+LABELS_PATH = Path(__file__).parent / "routing_labels.jsonl"
+THRESHOLDS_PATH = Path(__file__).parent / "cascade_thresholds.json"
+
+
+def load_thresholds(path=THRESHOLDS_PATH):
+    """
+    튜닝된 임계값 로드 (파일이 없으면 기본값)
+
+    Returns:
+        dict: {"rule_margin": int, "semantic_margin": float}
+    """
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    if Path(path).exists():
+        saved = json.loads(Path(path).read_text(encoding="utf-8"))
+        thresholds.update({key: saved[key] for key in DEFAULT_THRESHOLDS})
+    return thresholds
+
+
+# 로드된 임계값 캐시 (path, 파일 수정 시각, 임계값)
+_thresholds = None
+
+
+def get_thresholds(path=THRESHOLDS_PATH):
+    """
+    튜닝된 임계값 (파일 수정 시각이 바뀌었을 때만 다시 읽음, 메시지마다 파싱하지 않음)
+
+    Returns:
+        dict: {"rule_margin": int, "semantic_margin": float}
+    """
+    global _thresholds
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    if _thresholds is None or _thresholds[:2] != (path, mtime):
+        _thresholds = (path, mtime, load_thresholds(path))
+    return _thresholds[2]
+
+
+def load_labels(path=LABELS_PATH):
+    """
+    라벨 세트 로드 (JSONL: {"message": "...", "intent": "faq"|"order"|"human"})
+
+    Returns:
+        list[dict]: 라벨 레코드 리스트
+    """
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def example_overlap(labels):
+    """
+    router_semantic.INTENT_EXAMPLES와 같은 메시지(정규화 기준)인 라벨
+
+    예시 자체는 유사도 1.0이므로 튜닝 / 평가에 쓰면 semantic 단계가 낙관적으로 나옵니다.
+    """
+    examples = {
+        normalize_message(example)
+        for examples in router_semantic.INTENT_EXAMPLES.values()
+        for example in examples
+    }
+    return [
+        label for label in labels if normalize_message(label["message"]) in examples
+    ]
+
+
+def _margin(scores):
+    """1위 점수 - 2위 점수"""
+    top, second = sorted(scores.values(), reverse=True)[:2]
+    return top - second
+
+
+def rule_signal(user_message):
+    """
+    Rule 단계 판단 근거
+
+    Returns:
+        tuple: (intent, margin) / 패턴 매칭 시 margin = inf, 키워드가 하나도 없으면 0
+    """
+    intent = router_rule.classify_by_pattern(user_message)
+    if intent is not None:
+        return intent, float("inf")
+    scores = router_rule.keyword_scores(user_message)
+    if max(scores.values()) == 0:
+        return "human", 0
+    return router_rule.classify_by_keywords(user_message), _margin(scores)
+
+
+def semantic_signal(client, user_message):
+    """
+    Semantic 단계 판단 근거
+
+    Returns:
+        tuple: (intent, margin) / 1위 점수가 SIMILARITY_THRESHOLD 미만이면 margin = 0
+    """
+    scores = router_semantic.score_intents(client, user_message)
+    intent = max(scores, key=scores.get)
+    if scores[intent] < router_semantic.SIMILARITY_THRESHOLD:
+        return intent, 0.0
+    return intent, _margin(scores)
+
+
+def route(client, user_message, thresholds=None):
+    """
+    Cascade 라우팅: 신뢰도가 충분한 첫 단계의 결과를 사용합니다.
+
+    Args:
+        client: OpenAI 클라이언트
+        user_message: 사용자 입력 메시지
+        thresholds: {"rule_margin", "semantic_margin"} (None이면 get_thresholds())
+
+    Returns:
+        dict: {
+            "intent": 최종 intent,
+            "stage": 결정한 단계 ("rule" | "semantic" | "llm"),
+            "time_ms": 전체 소요 시간,
+            "api_calls": 실행한 단계들의 API 호출 수,
+            "cost_usd": 실행한 단계들의 추정 비용,
+            "trace": 단계별 [{"stage", "intent", "margin", "time_ms"}],
+        }
+    """
+    if thresholds is None:
+        thresholds = get_thresholds()
+    trace = []
+
+    def record(stage, intent, margin, start):
+        trace.append(
+            {
+                "stage": stage,
+                "intent": intent,
+                "margin": margin,
+                "time_ms": (time.perf_counter() - start) * 1000,
+            }
+        )
+
+    # STEP 1: Rule (패턴 매칭 또는 키워드 점수 차가 충분할 때)
+    start = time.perf_counter()
+    intent, margin = rule_signal(user_message)
+    record("rule", intent, margin, start)
+    decided = margin >= thresholds["rule_margin"]
+
+    # STEP 2: Semantic (유사도 점수 차가 충분할 때)
+    if not decided:
+        start = time.perf_counter()
+        intent, margin = semantic_signal(client, user_message)
+        record("semantic", intent, margin, start)
+        decided = margin >= thresholds["semantic_margin"]
+
+    # STEP 3: LLM (남은 애매한 메시지)
+    if not decided:
+        start = time.perf_counter()
+        intent = json.loads(router_llm.run(client, user_message))["intent"]
+        record("llm", intent, None, start)
+
+    stages = [step["stage"] for step in trace]
+    return {
+        "intent": intent,
+        "stage": stages[-1],
+        "time_ms": sum(step["time_ms"] for step in trace),
+        "api_calls": sum(STAGE_API_CALLS[stage] for stage in stages),
+        "cost_usd": sum(STAGE_COST_USD[stage] for stage in stages),
+        "trace": trace,
+    }
+
+
+def router_version():
+    """
+    단계별 router 버전 + 튜닝된 임계값을 합친 버전 (어느 하나가 바뀌어도 바뀜)
+
+    Returns:
+        str: "rule:semantic:llm:임계값" 형태
+    """
+    thresholds = get_thresholds()
+    return ":".join(
+        [
+            router_rule.router_version(),
+            router_semantic.router_version(),
+            router_llm.router_version(),
+            f"{thresholds['rule_margin']}/{thresholds['semantic_margin']}",
+        ]
+    )
+
+
+def run(client, user_message):
+    """
+    Cascade 방식으로 사용자 메시지의 인텐트를 분류합니다.
+
+    Args:
+        client: OpenAI 클라이언트
+        user_message: 사용자 입력 메시지
+
+    Returns:
+        str: JSON 문자열 {"intent": "faq"|"order"|"human", "stage": 결정한 단계}
+    """
+    result = route(client, user_message)
+    return json.dumps(
+        {"intent": result["intent"], "stage": result["stage"]}, ensure_ascii=False
+    )
+
+
+def collect_signals(client, labels):
+    """
+    라벨 세트의 Rule / Semantic 판단 근거를 1회 계산 (임계값 조합마다 재사용)
+
+    Returns:
+        list[dict]: {"intent"(정답), "rule": (intent, margin), "semantic": (intent, margin)}
+    """
+    return [
+        {
+            "intent": label["intent"],
+            "rule": rule_signal(label["message"]),
+            "semantic": semantic_signal(client, label["message"]),
+        }
+        for label in labels
+    ]
+
+
+def simulate(signals, thresholds):
+    """
+    임계값 조합의 예상 성능 (LLM 단계는 정답으로 가정)
+
+    Returns:
+        dict: accuracy, 단계별 결정 비율(decided), 1,000건당 비용(cost_per_1k)
+    """
+    correct = cost = 0.0
+    decided = dict.fromkeys(STAGES, 0)
+    for signal in signals:
+        rule_intent, rule_margin = signal["rule"]
+        semantic_intent, semantic_margin = signal["semantic"]
+        if rule_margin >= thresholds["rule_margin"]:
+            stage, intent = "rule", rule_intent
+        elif semantic_margin >= thresholds["semantic_margin"]:
+            stage, intent = "semantic", semantic_intent
+        else:
+            stage, intent = "llm", signal["intent"]
+        decided[stage] += 1
+        correct += intent == signal["intent"]
+        cost += sum(STAGE_COST_USD[s] for s in STAGES[: STAGES.index(stage) + 1])
+
+    total = len(signals)
+    return {
+        "accuracy": correct / total,
+        "decided": {stage: count / total for stage, count in decided.items()},
+        "cost_per_1k": cost / total * 1000,
+    }
+
+
+def tune_thresholds(signals, target_accuracy=0.95):
+    """
+    목표 정확도를 만족하는 가장 저렴한 임계값 조합 탐색
+
+    후보 임계값은 라벨 세트에서 관측된 점수 차 (+ 해당 단계를 끄는 inf)입니다.
+    비용이 같으면 정확도가 높은 조합을 선택합니다.
+
+    Returns:
+        dict: {"rule_margin", "semantic_margin", **simulate() 결과}
+    """
+    rule_candidates = sorted(
+        {margin for _, margin in (s["rule"] for s in signals) if margin > 0}
+        | {float("inf")}
+    )
+    semantic_candidates = sorted(
+        {margin for _, margin in (s["semantic"] for s in signals) if margin > 0}
+        | {float("inf")}
+    )
+
+    best = None
+    for rule_margin in rule_candidates:
+        for semantic_margin in semantic_candidates:
+            thresholds = {
+                "rule_margin": rule_margin,
+                "semantic_margin": semantic_margin,
+            }
+            result = {**thresholds, **simulate(signals, thresholds)}
+            if result["accuracy"] < target_accuracy:
+                continue
+            if best is None or (result["cost_per_1k"], -result["accuracy"]) < (
+                best["cost_per_1k"],
+                -best["accuracy"],
+            ):
+                best = result
+    return best
+
+
+def main():
+    from dotenv import load_dotenv
+    from openai import OpenAI
+
+    parser = argparse.ArgumentParser(
+        description="Cascade router (Rule → Semantic → LLM)"
+    )
+    parser.add_argument("messages", nargs="*", help="라우팅할 메시지")
+    parser.add_argument("--tune", action="store_true", help="라벨 세트로 임계값 튜닝")
+    parser.add_argument("--labels", default=str(LABELS_PATH))
+    parser.add_argument("--target-accuracy", type=float, default=0.95)
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+    if args.tune:
+        labels = load_labels(args.labels)
+        overlap = example_overlap(labels)
+        if overlap:
+            print(
+                f"⚠️ semantic 예시와 같은 라벨 {len(overlap)}개는 튜닝에서 제외합니다"
+            )
+            labels = [label for label in labels if label not in overlap]
+        signals = collect_signals(client, labels)
+        print(f"📚 라벨 {len(labels)}개 / 목표 정확도 {args.target_accuracy:.0%}")
+        print(f"   LLM 단독: ${STAGE_COST_USD['llm'] * 1000:.4f} per 1k")
+        result = simulate(signals, DEFAULT_THRESHOLDS)
+        print(
+            f"   기본값: 정확도 {result['accuracy']:.1%} / "
+            f"${result['cost_per_1k']:.4f} per 1k"
+        )
+
+        best = tune_thresholds(signals, args.target_accuracy)
+        if best is None:
+            print("❌ 목표 정확도를 만족하는 임계값이 없습니다.")
+            return
+        decided = " / ".join(f"{s} {best['decided'][s]:.0%}" for s in STAGES)
+        print(
+            f"✅ rule_margin={best['rule_margin']} "
+            f"semantic_margin={best['semantic_margin']:.4f}: "
+            f"정확도 {best['accuracy']:.1%} / ${best['cost_per_1k']:.4f} per 1k "
+            f"(결정 단계: {decided})"
+        )
+        # 임시 파일 → 교체 (실행 중인 router가 쓰다 만 파일을 읽지 않도록)
+        tmp_path = THRESHOLDS_PATH.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps(best, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        os.replace(tmp_path, THRESHOLDS_PATH)
+        print(f"   💾 저장: {THRESHOLDS_PATH}")
+
+    for message in args.messages:
+        result = route(client, message)
+        print(
+            f"\n💬 {message}\n   → {result['intent']} "
+            f"(단계: {result['stage']}, {result['time_ms']:.0f}ms, "
+            f"API {result['api_calls']}회, ${result['cost_usd']:.5f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,475 @@
+"""
+Intent Classifier - Distilled Local Classifier (LLM 라우팅 결과로 학습)
+
+[방식]
+LLM router가 내린 (메시지, intent) 결정을 학습 데이터로 삼아
+문자 n-gram TF-IDF + 선형 모델(softmax 회귀, NumPy)을 학습합니다.
+학습된 모델은 로컬에서 실행되어 API 호출 없이 LLM의 판단을 흉내 냅니다.
+
+[장점]
+✅ 빠름: 메시지 1건 ~0.1ms (GPU 불필요)
+✅ 무료: 학습된 모델은 API 호출 없음
+✅ LLM 수준에 근접: LLM 결정 로그가 쌓일수록 정확해짐
+
+[단점]
+❌ 학습 데이터 필요: LLM 결정 로그가 충분히 쌓여야 함
+❌ 분포 변화에 약함: 새로운 유형의 질문은 재학습 전까지 놓침
+   → 확신도(softmax 확률)가 MIN_CONFIDENCE 미만이면 LLM router로 대체
+
+[학습 데이터]
+- shadow 기록(router_shadow.py)의 LLM 결정 (primary / shadow 모두, 오류 제외)
+- 같은 메시지(정규화 기준)는 가장 최근 결정만 사용
+- --extra JSONL ({"message", "intent"})로 추가 데이터 지정 가능 (INTENTS 밖 intent는 건너뜀)
+
+[승격 (promotion)]
+- 정규화 메시지 해시로 고정 분할한 holdout에서 LLM 결정과의 일치율 측정
+- 일치율 ≥ PROMOTION_ACCURACY이고 현재 모델보다 나쁘지 않으면 candidate → model 승격
+- 보고서: .cache/distilled/report.json
+
+[비용/성능 특성]
+- API 비용: $0 (확신도 낮은 메시지만 LLM 비용)
+- 응답 속도: ~0.1ms
+- 정확도: LLM 대비 일치율 (보고서 참고)
+
+실행:
+  python chapter_3-2/router_distilled.py --train               # 1회 학습 + 승격 판단
+  python chapter_3-2/router_distilled.py --train --every 60    # 60분마다 재학습
+  python chapter_3-2/router_distilled.py "반품 정책이 어떻게 되나요?"
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+import router_llm
+from router_shadow import DEFAULT_LOG_PATH, load_records
+from routing_cache import normalize_message
+
+INTENTS = ("faq", "order", "human")
+
+NGRAM_RANGE = (1, 3)
+MIN_DF = 2
+MAX_FEATURES = 50_000
+
+EPOCHS = 300
+LEARNING_RATE = 2.0
+L2 = 1e-4
+
+HOLDOUT_RATIO = 0.2
+MIN_SAMPLES = 50
+PROMOTION_ACCURACY = 0.95
+MIN_CONFIDENCE = 0.6
+
+ARTIFACT_DIR = Path(__file__).parent / ".cache" / "distilled"
+MODEL_PATH = ARTIFACT_DIR / "model.npz"
+CANDIDATE_PATH = ARTIFACT_DIR / "candidate.npz"
+REPORT_PATH = ARTIFACT_DIR / "report.json"
+
+
+def char_ngrams(user_message):
+    """정규화된 메시지의 문자 n-gram (앞뒤 공백 포함, 단어 경계 정보 유지)"""
+    text = f" {normalize_message(user_message)} "
+    low, high = NGRAM_RANGE
+    return [
+        text[i : i + n] for n in range(low, high + 1) for i in range(len(text) - n + 1)
+    ]
+
+
+class DistilledClassifier:
+    """
+    문자 n-gram TF-IDF + softmax 회귀
+
+    Attributes:
+        vocab: n-gram → feature 번호
+        idf: feature별 IDF (V,)
+        weights: (V, intent 수), bias: (intent 수,)
+        meta: 학습 정보 (version, trained_at, samples, ...)
+    """
+
+    def __init__(self, vocab, idf, weights, bias, intents=INTENTS, meta=None):
+        self.vocab = vocab
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+        self.intents = tuple(intents)
+        self.meta = meta or {}
+
+    def features(self, user_message):
+        """
+        TF-IDF 희소 벡터 (1 + log(tf)) × idf, L2 정규화
+
+        Returns:
+            tuple: (feature 번호 배열, 값 배열)
+        """
+        counts = Counter(
+            self.vocab[gram] for gram in char_ngrams(user_message) if gram in self.vocab
+        )
+        if not counts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        index = np.fromiter(counts, dtype=np.int64, count=len(counts))
+        values = (1 + np.log(np.fromiter(counts.values(), dtype=np.float32))) * (
+            self.idf[index]
+        )
+        return index, values / np.linalg.norm(values)
+
+    def predict_proba(self, user_message):
+        """intent별 확률 (softmax)"""
+        index, values = self.features(user_message)
+        logits = values @ self.weights[index] + self.bias
+        logits = np.exp(logits - logits.max())
+        return logits / logits.sum()
+
+    def predict(self, user_message):
+        """
+        Returns:
+            tuple: (intent, 확률)
+        """
+        proba = self.predict_proba(user_message)
+        best = int(np.argmax(proba))
+        return self.intents[best], float(proba[best])
+
+    @classmethod
+    def train(cls, messages, intents):
+        """
+        (메시지, intent) 쌍으로 학습
+
+        - 어휘: 문서 빈도 MIN_DF 이상, 상위 MAX_FEATURES개 n-gram
+        - 최적화: 전체 배치 경사 하강 (cross-entropy + L2, 희소 TF-IDF 행렬)
+        """
+        grams = [set(char_ngrams(message)) for message in messages]
+        df = Counter(gram for doc in grams for gram in doc)
+        kept = [gram for gram, count in df.most_common(MAX_FEATURES) if count >= MIN_DF]
+        vocab = {gram: i for i, gram in enumerate(kept)}
+        n = len(messages)
+        idf = np.array(
+            [np.log((1 + n) / (1 + df[gram])) + 1 for gram in kept], dtype=np.float32
+        )
+
+        model = cls(
+            vocab,
+            idf,
+            np.zeros((len(vocab), len(INTENTS)), dtype=np.float32),
+            np.zeros(len(INTENTS), dtype=np.float32),
+        )
+
+        # 학습 행렬은 희소 (행, feature 번호, 값) - n × V dense는 로그가 쌓이면 수 GB
+        rows = [np.zeros(0, dtype=np.int64)]
+        cols = [np.zeros(0, dtype=np.int64)]
+        vals = [np.zeros(0, dtype=np.float32)]
+        for row, message in enumerate(messages):
+            index, values = model.features(message)
+            rows.append(np.full(len(index), row, dtype=np.int64))
+            cols.append(index)
+            vals.append(values)
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+        vals = np.concatenate(vals)[:, None]
+        y = np.zeros((n, len(INTENTS)), dtype=np.float32)
+        y[np.arange(n), [INTENTS.index(intent) for intent in intents]] = 1.0
+
+        n_features = len(vocab)
+        for _ in range(EPOCHS):
+            # 희소 행렬 곱을 intent별 np.bincount(가중 합)로 계산
+            products = vals * model.weights[cols]
+            logits = model.bias + np.stack(
+                [np.bincount(rows, products[:, k], n) for k in range(len(INTENTS))],
+                axis=1,
+            )
+            logits = np.exp(logits - logits.max(axis=1, keepdims=True))
+            proba = logits / logits.sum(axis=1, keepdims=True)
+            grad = (proba - y) / n
+            products = vals * grad[rows]
+            grad_weights = np.stack(
+                [
+                    np.bincount(cols, products[:, k], n_features)
+                    for k in range(len(INTENTS))
+                ],
+                axis=1,
+            )
+            model.weights -= LEARNING_RATE * (grad_weights + L2 * model.weights)
+            model.bias -= LEARNING_RATE * grad.sum(axis=0)
+        return model
+
+    def save(self, path):
+        """압축 npz로 저장 (임시 파일 → 교체)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                vocab=np.array(list(self.vocab)),
+                idf=self.idf,
+                weights=self.weights.astype(np.float16),
+                bias=self.bias,
+                intents=np.array(self.intents),
+                meta=np.array(json.dumps(self.meta, ensure_ascii=False)),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as saved:
+            vocab = {gram: i for i, gram in enumerate(saved["vocab"].tolist())}
+            return cls(
+                vocab,
+                saved["idf"],
+                saved["weights"].astype(np.float32),
+                saved["bias"],
+                saved["intents"].tolist(),
+                json.loads(str(saved["meta"])),
+            )
+
+
+# 로드된 모델 캐시 (파일 수정 시각, DistilledClassifier)
+_model = None
+
+
+def get_model(path=MODEL_PATH):
+    """
+    승격된 모델 (파일이 바뀌면 다시 로드, 없으면 None)
+    """
+    global _model
+    if not Path(path).exists():
+        return None
+    mtime = os.stat(path).st_mtime_ns
+    if _model is None or _model[0] != mtime:
+        _model = (mtime, DistilledClassifier.load(path))
+    return _model[1]
+
+
+def router_version():
+    """승격된 모델 버전 (재학습 / 승격 시 바뀜, 모델이 없으면 LLM router 버전)"""
+    model = get_model()
+    if model is None:
+        return f"llm:{router_llm.router_version()}"
+    return f"{model.meta.get('version')}:{MIN_CONFIDENCE}"
+
+
+def run(client, user_message):
+    """
+    학습된 로컬 분류기로 사용자 메시지의 인텐트를 분류합니다.
+
+    분류 전략:
+    1. 승격된 모델이 없으면 LLM router 사용
+    2. 문자 n-gram TF-IDF → 선형 모델로 intent 확률 계산
+    3. 확신도가 MIN_CONFIDENCE 미만이면 LLM router로 대체
+
+    Args:
+        client: OpenAI 클라이언트 (LLM 대체 시에만 사용)
+        user_message: 사용자 입력 메시지
+
+    Returns:
+        str: JSON 문자열 {"intent": "faq"|"order"|"human"}
+    """
+    model = get_model()
+    if model is None:
+        return router_llm.run(client, user_message)
+
+    intent, confidence = model.predict(user_message)
+    if confidence < MIN_CONFIDENCE:
+        return router_llm.run(client, user_message)
+    return json.dumps({"intent": intent}, ensure_ascii=False)
+
+
+def load_training_pairs(log_path=DEFAULT_LOG_PATH, extra_paths=()):
+    """
+    학습용 (메시지, LLM intent) 쌍 (정규화 메시지 기준 중복 제거, 최신 결정 우선)
+
+    Returns:
+        list[tuple]: (메시지, intent)
+    """
+    pairs = {}
+    if Path(log_path).exists():
+        records = sorted(load_records(log_path), key=lambda r: r["ts"])
+        for record in records:
+            if (
+                record["router"] == "llm"
+                and record["error"] is None
+                and record["intent"] in INTENTS
+            ):
+                pairs[normalize_message(record["message"])] = (
+                    record["message"],
+                    record["intent"],
+                )
+    for path in extra_paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    item = json.loads(line)
+                    if item.get("intent") not in INTENTS:
+                        print(
+                            f"⚠️ {path}: 알 수 없는 intent {item.get('intent')!r} 건너뜀"
+                        )
+                        continue
+                    pairs[normalize_message(item["message"])] = (
+                        item["message"],
+                        item["intent"],
+                    )
+    return list(pairs.values())
+
+
+def is_holdout(user_message):
+    """정규화 메시지 해시로 고정 분할 (재학습해도 같은 메시지는 같은 쪽)"""
+    digest = hashlib.sha256(normalize_message(user_message).encode("utf-8")).digest()
+    return digest[0] < 256 * HOLDOUT_RATIO
+
+
+def agreement(model, pairs):
+    """
+    LLM 결정과의 일치율 (전체 + intent별)
+
+    Returns:
+        dict: {"accuracy", "per_intent": {intent: 일치율}, "fallback_rate"}
+    """
+    hits = Counter()
+    totals = Counter()
+    fallbacks = 0
+    for message, expected in pairs:
+        intent, confidence = model.predict(message)
+        totals[expected] += 1
+        hits[expected] += intent == expected
+        fallbacks += confidence < MIN_CONFIDENCE
+    total = sum(totals.values())
+    return {
+        "accuracy": sum(hits.values()) / total if total else 0.0,
+        "per_intent": {i: hits[i] / totals[i] for i in INTENTS if totals[i]},
+        "fallback_rate": fallbacks / total if total else 0.0,
+    }
+
+
+def train_and_gate(log_path=DEFAULT_LOG_PATH, extra_paths=()):
+    """
+    학습 → holdout 평가 → 승격 판단 (보고서 저장)
+
+    Returns:
+        dict: 보고서 (promoted: 승격 여부, reason: 판단 이유)
+    """
+    pairs = load_training_pairs(log_path, extra_paths)
+    train = [pair for pair in pairs if not is_holdout(pair[0])]
+    holdout = [pair for pair in pairs if is_holdout(pair[0])]
+    report = {
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "samples": len(pairs),
+        "train": len(train),
+        "holdout": len(holdout),
+        "labels": dict(Counter(intent for _, intent in pairs)),
+        "promoted": False,
+    }
+    if len(pairs) < MIN_SAMPLES or not holdout or len(set(i for _, i in train)) < 2:
+        report["reason"] = f"학습 데이터 부족 (최소 {MIN_SAMPLES}개, intent 2종 이상)"
+        save_report(report)
+        return report
+
+    start = time.perf_counter()
+    candidate = DistilledClassifier.train(*zip(*train))
+    report["train_seconds"] = time.perf_counter() - start
+    version = hashlib.sha256(
+        json.dumps(sorted(train), ensure_ascii=False).encode("utf-8")
+    ).hexdigest()[:12]
+    candidate.meta = {
+        "version": version,
+        "trained_at": report["trained_at"],
+        "samples": len(train),
+        "features": len(candidate.vocab),
+    }
+    candidate.save(CANDIDATE_PATH)
+    report["candidate"] = {
+        **candidate.meta,
+        **agreement(candidate, holdout),
+        "artifact_kb": CANDIDATE_PATH.stat().st_size / 1024,
+    }
+    start = time.perf_counter()
+    for message, _ in holdout:
+        candidate.predict(message)
+    report["candidate"]["latency_ms"] = (
+        (time.perf_counter() - start) * 1000 / len(holdout)
+    )
+
+    # 현재 모델과 같은 holdout에서 비교
+    current = get_model()
+    if current is not None:
+        report["current"] = {**current.meta, **agreement(current, holdout)}
+
+    accuracy = report["candidate"]["accuracy"]
+    if accuracy < PROMOTION_ACCURACY:
+        report["reason"] = f"LLM 일치율 {accuracy:.1%} < {PROMOTION_ACCURACY:.0%}"
+    elif current is not None and accuracy < report["current"]["accuracy"]:
+        report["reason"] = (
+            f"현재 모델보다 낮음 ({accuracy:.1%} < {report['current']['accuracy']:.1%})"
+        )
+    else:
+        os.replace(CANDIDATE_PATH, MODEL_PATH)
+        report["promoted"] = True
+        report["reason"] = f"LLM 일치율 {accuracy:.1%} ≥ {PROMOTION_ACCURACY:.0%}"
+
+    save_report(report)
+    return report
+
+
+def save_report(report):
+    REPORT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    REPORT_PATH.write_text(
+        json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+
+
+def print_report(report):
+    print(
+        f"\n📚 학습 데이터 {report['samples']}개 "
+        f"(train {report['train']} / holdout {report['holdout']}) {report['labels']}"
+    )
+    candidate = report.get("candidate")
+    if candidate:
+        per_intent = " / ".join(
+            f"{intent} {rate:.0%}" for intent, rate in candidate["per_intent"].items()
+        )
+        print(
+            f"   🧪 candidate {candidate['version']}: LLM 일치율 {candidate['accuracy']:.1%} "
+            f"({per_intent}), LLM 대체 {candidate['fallback_rate']:.0%}, "
+            f"{candidate['latency_ms']:.3f}ms/건, {candidate['artifact_kb']:.0f}KB"
+        )
+    if "current" in report:
+        print(
+            f"   📦 현재 모델 {report['current']['version']}: "
+            f"LLM 일치율 {report['current']['accuracy']:.1%}"
+        )
+    mark = "✅ 승격" if report["promoted"] else "⏸️ 승격 보류"
+    print(f"   {mark}: {report['reason']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="LLM 라우팅 결정으로 학습한 로컬 분류기"
+    )
+    parser.add_argument("messages", nargs="*", help="분류할 메시지")
+    parser.add_argument("--train", action="store_true", help="학습 + 승격 판단")
+    parser.add_argument("--log", default=str(DEFAULT_LOG_PATH), help="shadow 기록")
+    parser.add_argument("--extra", nargs="*", default=[], help="추가 학습 JSONL")
+    parser.add_argument("--every", type=float, help="재학습 주기 (분)")
+    args = parser.parse_args()
+
+    if args.train:
+        while True:
+            print_report(train_and_gate(args.log, args.extra))
+            if not args.every:
+                break
+            time.sleep(args.every * 60)
+
+    if args.messages:
+        model = get_model()
+        if model is None:
+            print("❌ 승격된 모델이 없습니다. --train으로 먼저 학습하세요.")
+            return
+        for message in args.messages:
+            intent, confidence = model.predict(message)
+            print(f"💬 {message} → {intent} ({confidence:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -28,6 +28,10 @@ LLM(GPT-5.1)에게 사용자 입력을 분석하여 intent 분류를 위임합
 - 정확도: 명확한 프롬프트 시 ~95%+
 """
 
+import hashlib
+
+MODEL = "gpt-5.1"
+
 SYSTEM_PROMPT = """
 [역할]
 당신은 고객 문의를 분류하는 인텐트 분류기입니다.
@@ -63,6 +67,17 @@ JSON 형식: {"intent": "faq"|"order"|"human"}
 """
 
 
+def router_version():
+    """
+    라우팅 결과에 영향을 주는 설정(모델 + 프롬프트)의 버전 해시
+
+    Returns:
+        str: sha256 hex 앞 12자리 (프롬프트를 고치면 바뀜)
+    """
+    payload = f"{MODEL}\n{SYSTEM_PROMPT}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
 def run(client, user_message):
     """
     LLM을 사용하여 사용자 메시지를 분석하고 인텐트를 분류합니다.
@@ -75,7 +90,7 @@ def run(client, user_message):
         str: JSON 문자열 {"intent": "faq"|"order"|"human"}
     """
     response = client.responses.create(
-        model="gpt-5.1",
+        model=MODEL,
         instructions=SYSTEM_PROMPT,
         input=[
             {
@@ -14,7 +14,7 @@ LLM 호출 없이 순수 로직으로 동작합니다.
 
 [단점]
 ❌ 유연성 부족: 새로운 표현, 동의어 처리 어려움
-❌ 유지보수 부담: 새 패턴 추가 시 코드 수정 필요
+❌ 유지보수 부담: 규칙 파일 관리 필요 (코드 수정은 불필요)
 ❌ 확장성 제한: intent 증가 시 규칙 복잡도 급증
 ❌ Edge case 처리: 애매한 케이스는 놓치기 쉬움
 
@@ -28,50 +28,215 @@ LLM 호출 없이 순수 로직으로 동작합니다.
 - API 비용: $0 (로컬 처리)
 - 응답 속도: ~1ms
 - 정확도: 명확한 패턴 시 100%, 애매한 경우 낮음
+
+[규칙 파일] (routing_rules.json)
+- keywords: {intent: ["키워드", ...]} 또는 {intent: {"키워드": 가중치}} (리스트는 가중치 1)
+- patterns: [{"intent", "regex"}] (위에서부터 먼저 매칭된 규칙 사용)
+- 파일 수정 시각이 바뀌면 다음 호출에서 자동으로 다시 로드 (오류가 있으면 이전 규칙 유지)
+  → 수정 시각 확인은 RULES_CHECK_INTERVAL초에 1번 (메시지마다 os.stat 하지 않음)
+
+[매칭 방식]
+- 키워드: Aho-Corasick 오토마톤으로 메시지를 1회 순회하며 모든 Intent 점수 계산
+  → 키워드 수가 수천 개로 늘어도 비용은 메시지 길이에 비례
+- 패턴: 로드 시 1회 컴파일
+- 벤치마크: python chapter_3-2/bench_rule_router.py
 """
 
-import re
+import hashlib
 import json
+import os
+import re
+import time
+from collections import deque
+from pathlib import Path
+
+RULES_PATH = Path(__file__).parent / "routing_rules.json"
+# 규칙 파일 수정 시각 확인 주기 (초)
+RULES_CHECK_INTERVAL = 1.0
+
+# 점수가 같을 때 우선순위 (안전한 순서)
+INTENT_PRIORITY = ("human", "order", "faq")
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick 다중 키워드 매처
+
+    키워드 trie에 실패 링크를 더한 오토마톤으로, 메시지를 한 번 훑어
+    포함된 모든 키워드를 찾습니다. (키워드마다 `in` 검사를 반복하지 않음)
+    """
+
+    def __init__(self, keywords):
+        self.keywords = keywords
+        goto = [{}]
+        outputs = [[]]
+        for keyword_id, keyword in enumerate(keywords):
+            state = 0
+            for ch in keyword:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(keyword_id)
+
+        # 실패 링크 (BFS): 현재까지 읽은 문자열의 가장 긴 접미사 상태
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                link = fail[state]
+                while link and ch not in goto[link]:
+                    link = fail[link]
+                fail[next_state] = goto[link].get(ch, 0)
+                # 접미사 상태에서 끝나는 키워드도 함께 출력
+                outputs[next_state] = outputs[next_state] + outputs[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = outputs
+
+    def find(self, text):
+        """
+        text에 포함된 키워드 번호 집합 (같은 키워드는 여러 번 나와도 1번)
+
+        Returns:
+            set[int]: self.keywords의 인덱스
+        """
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+
+class RuleSet:
+    """
+    컴파일된 라우팅 규칙 (키워드 매처 + 정규표현식 패턴)
+
+    Attributes:
+        version: 규칙 내용의 해시 (규칙이 바뀌면 바뀜)
+        intents: 키워드가 정의된 intent 목록
+        matcher: 전체 키워드의 KeywordMatcher
+        patterns: [(컴파일된 정규식, intent)] (파일 순서)
+    """
 
+    def __init__(self, keywords, patterns):
+        payload = json.dumps([keywords, patterns], ensure_ascii=False, sort_keys=True)
+        self.version = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+        self.intents = list(keywords)
+        weights = {}
+        for intent, entries in keywords.items():
+            if isinstance(entries, list):
+                entries = dict.fromkeys(entries, 1)
+            for keyword, weight in entries.items():
+                if keyword:
+                    weights.setdefault(keyword, []).append((intent, weight))
 
-# Intent별 키워드 정의
-FAQ_KEYWORDS = [
-    "반품", "교환", "배송", "기간", "정책", "사양", "스펙",
-    "기능", "가격", "할인", "이벤트", "사용법", "설치",
-    "호환", "보증", "품질", "크기", "색상", "재고"
-]
+        self.matcher = KeywordMatcher(list(weights))
+        self._weights = [weights[keyword] for keyword in self.matcher.keywords]
+        self.patterns = [
+            (re.compile(rule["regex"]), rule["intent"]) for rule in patterns
+        ]
 
-ORDER_KEYWORDS = [
-    "주문", "조회", "확인", "배송", "추적", "상태",
-    "언제", "도착", "발송", "배송지", "수령"
-]
+    @classmethod
+    def load(cls, path=RULES_PATH):
+        """규칙 파일(JSON) 로드 + 컴파일"""
+        rules = json.loads(Path(path).read_text(encoding="utf-8"))
+        return cls(rules.get("keywords", {}), rules.get("patterns", []))
 
-HUMAN_KEYWORDS = [
-    "환불", "거부", "불만", "긴급", "상담사", "통화",
-    "항의", "보상", "클레임", "문제", "해결", "답변 없"
-]
+    def match_pattern(self, text):
+        """처음으로 매칭된 패턴의 intent (없으면 None)"""
+        for regex, intent in self.patterns:
+            if regex.search(text):
+                return intent
+        return None
+
+    def score(self, text):
+        """메시지 1회 순회로 모든 intent의 키워드 가중치 합 계산"""
+        scores = dict.fromkeys(self.intents, 0)
+        for keyword_id in self.matcher.find(text):
+            for intent, weight in self._weights[keyword_id]:
+                scores[intent] += weight
+        return scores
+
+
+# 로드된 규칙 캐시 (path, 파일 수정 시각, RuleSet) + 마지막 수정 시각 확인 시각
+_rules = None
+_rules_checked_at = 0.0
+
+
+def get_rules(path=RULES_PATH):
+    """
+    규칙 파일이 바뀌었으면 다시 로드 (hot reload)
+
+    수정 시각은 RULES_CHECK_INTERVAL초에 1번만 확인합니다.
+    새 규칙 파일에 오류가 있으면 (형식 오류, 파일 없음 포함) 경고 후 이전 규칙을 계속 사용합니다.
+
+    Returns:
+        RuleSet: 현재 규칙
+    """
+    global _rules, _rules_checked_at
+    now = time.monotonic()
+    if (
+        _rules is not None
+        and _rules[0] == path
+        and now - _rules_checked_at < RULES_CHECK_INTERVAL
+    ):
+        return _rules[2]
+    _rules_checked_at = now
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError as e:
+        if _rules is None:
+            raise
+        print(f"⚠️ 규칙 파일 확인 실패, 이전 규칙 유지: {e}")
+        return _rules[2]
+    if _rules is None or _rules[:2] != (path, mtime):
+        try:
+            _rules = (path, mtime, RuleSet.load(path))
+        except Exception as e:  # 형식 오류 (JSON / 타입 / 정규식 등)
+            if _rules is None:
+                raise
+            print(f"⚠️ 규칙 파일 로드 실패, 이전 규칙 유지: {e}")
+            _rules = (path, mtime, _rules[2])
+    return _rules[2]
+
+
+def router_version():
+    """현재 규칙 파일 내용의 버전 해시 (hot reload로 규칙이 바뀌면 바뀜)"""
+    return get_rules().version
 
 
 def classify_by_pattern(user_message):
     """
     정규표현식 패턴으로 명확한 케이스 먼저 분류
 
+    예: 주문번호(ORD-숫자) → order, "상담사" + "연결/통화" → human
+
     Returns:
         str or None: intent 또는 None (패턴 매칭 실패)
     """
-    # 패턴 1: 주문번호 포함 (ORD-로 시작하는 패턴)
-    if re.search(r'ORD-\d+', user_message):
-        return "order"
+    return get_rules().match_pattern(user_message)
 
-    # 패턴 2: "상담사"와 "연결/통화" 조합
-    if re.search(r'상담사.*(연결|통화|전화)', user_message):
-        return "human"
 
-    # 패턴 3: "환불" + "거부/안 됨" 조합
-    if re.search(r'환불.*(거부|안.?됨|불가)', user_message):
-        return "human"
+def keyword_scores(user_message):
+    """
+    Intent별 키워드 매칭 점수 (메시지 1회 순회)
 
-    return None
+    Returns:
+        dict: {"faq": 점수, "order": 점수, "human": 점수}
+    """
+    return get_rules().score(user_message)
 
 
 def classify_by_keywords(user_message):
@@ -82,24 +247,18 @@ def classify_by_keywords(user_message):
         str: intent ("faq", "order", "human")
     """
     # 각 intent별 키워드 매칭 점수 계산
-    faq_score = sum(1 for kw in FAQ_KEYWORDS if kw in user_message)
-    order_score = sum(1 for kw in ORDER_KEYWORDS if kw in user_message)
-    human_score = sum(1 for kw in HUMAN_KEYWORDS if kw in user_message)
-
-    # 가장 높은 점수의 intent 선택
-    max_score = max(faq_score, order_score, human_score)
+    scores = keyword_scores(user_message)
 
     # 점수가 0이면 (아무 키워드도 매칭 안됨) → human (안전한 선택)
+    max_score = max(scores.values(), default=0)
     if max_score == 0:
         return "human"
 
-    # 점수가 같으면 우선순위: human > order > faq (안전한 순서)
-    if human_score == max_score:
-        return "human"
-    elif order_score == max_score:
-        return "order"
-    else:
-        return "faq"
+    # 가장 높은 점수의 intent 선택, 점수가 같으면 우선순위: human > order > faq
+    for intent in INTENT_PRIORITY:
+        if scores.get(intent) == max_score:
+            return intent
+    return max(scores, key=scores.get)
 
 
 def run(client, user_message):
@@ -28,11 +28,27 @@ Intent별 예시 문장들과 사용자 입력의 코사인 유사도를 비교
 - API 비용: ~$0.00002/request (text-embedding-3-small 기준)
 - 응답 속도: ~50-100ms
 - 정확도: 예시 품질에 따라 80-95%
+
+[예시 임베딩 행렬]
+- 예시 문장은 1회 배치 임베딩 → L2 정규화 → (예시 수, d) 행렬로 .cache/에 저장
+- 버전 해시 = sha256(임베딩 모델 + INTENT_EXAMPLES): 예시를 바꾸면 자동 재생성
+- 라우팅 = 쿼리 임베딩 1회 + 행렬 곱 1회 → Intent별 집계 (mean / max / topk)
+
+[쿼리 임베딩 캐시]
+- .cache/query_embeddings.sqlite에 (모델, sha256(text)) → float32 벡터 저장
+- 재시작 후에도 이미 본 질문은 API를 호출하지 않음 (module_faq도 같은 캐시 사용)
+- MAX_CACHED_EMBEDDINGS 초과 시 가장 오래 사용하지 않은 항목부터 삭제 (LRU)
 """
 
+import hashlib
 import json
-import numpy as np
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
 
+import numpy as np
 
 # Intent별 대표 예시 문장 정의
 INTENT_EXAMPLES = {
@@ -65,9 +81,112 @@ INTENT_EXAMPLES = {
 }
 
 
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# 쿼리 임베딩 캐시 (model, sha256(text)) → 벡터, 항목 수 기준 LRU
+EMBEDDING_CACHE_PATH = Path(__file__).parent / ".cache" / "query_embeddings.sqlite"
+MAX_CACHED_EMBEDDINGS = 10_000
+
+# Intent 점수 집계 방식: "mean"(예시 평균) / "max"(가장 가까운 예시) / "topk"(상위 TOP_K 평균)
+AGGREGATION = "mean"
+TOP_K = 3
+SIMILARITY_THRESHOLD = 0.7
+
+EXAMPLE_MATRIX_PATH = Path(__file__).parent / ".cache" / "intent_examples.npz"
+
+# 프로세스 내 예시 행렬 (version, intents, offsets, matrix)
+# 여러 스레드(shadow 실행 등)가 동시에 처음 호출해도 행렬은 1번만 생성
+_example_matrix = None
+_example_matrix_lock = threading.Lock()
+
+
+class EmbeddingCache:
+    """
+    SQLite 쿼리 임베딩 캐시 (재시작 후에도 유지, 크기 제한 LRU)
+
+    여러 스레드에서 호출할 수 있으며, 여러 프로세스가 같은 파일을 써도 됩니다.
+    path=":memory:"이면 프로세스 안에서만 유지됩니다. (벤치마크용)
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH, max_size=MAX_CACHED_EMBEDDINGS):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(model TEXT, key TEXT, vector BLOB, used REAL, PRIMARY KEY (model, key))"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_used ON embeddings (used)"
+        )
+        self._db.commit()
+
+    def get(self, model, text):
+        """캐시된 벡터 (없으면 None, 있으면 사용 시각 갱신)"""
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT vector FROM embeddings WHERE model = ? AND key = ?",
+                (model, key),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE embeddings SET used = ? WHERE model = ? AND key = ?",
+                (time.time(), model, key),
+            )
+            self._db.commit()
+        return np.frombuffer(row[0], dtype=np.float32).tolist()
+
+    def put(self, model, text, vector):
+        """벡터 저장 후 max_size 초과분을 오래된 순으로 삭제"""
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        blob = np.asarray(vector, dtype=np.float32).tobytes()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)",
+                (model, key, blob, time.time()),
+            )
+            (count,) = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            if count > self.max_size:
+                self._db.execute(
+                    "DELETE FROM embeddings WHERE rowid IN "
+                    "(SELECT rowid FROM embeddings ORDER BY used LIMIT ?)",
+                    (count - self.max_size,),
+                )
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+# 프로세스 공용 캐시 (첫 호출 시 생성 - import만으로 파일을 만들지 않음)
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """프로세스 공용 쿼리 임베딩 캐시"""
+    global _embedding_cache
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache()
+        return _embedding_cache
+
+
+def set_embedding_cache(cache):
+    """공용 캐시 교체 (벤치마크에서 빈 캐시로 콜드 지연을 잴 때 사용)"""
+    global _embedding_cache
+    with _embedding_cache_lock:
+        _embedding_cache = cache
+
+
 def get_embedding(client, text):
     """
-    텍스트의 임베딩 벡터를 생성합니다.
+    텍스트의 임베딩 벡터를 생성합니다. (캐시 히트 시 API 호출 생략)
 
     Args:
         client: OpenAI 클라이언트
@@ -76,35 +195,155 @@ def get_embedding(client, text):
     Returns:
         list[float]: 임베딩 벡터
     """
-    response = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=text,
+    cache = get_embedding_cache()
+    embedding = cache.get(EMBEDDING_MODEL, text)
+    if embedding is None:
+        response = client.embeddings.create(
+            model=EMBEDDING_MODEL,
+            input=text,
+        )
+        embedding = response.data[0].embedding
+        cache.put(EMBEDDING_MODEL, text, embedding)
+    return embedding
+
+
+def normalize(vectors):
+    """
+    L2 정규화 (정규화된 벡터끼리의 내적 = 코사인 유사도)
+
+    Args:
+        vectors: 벡터 (d,) 또는 행렬 (n, d)
+
+    Returns:
+        np.ndarray: 정규화된 float32 배열
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def examples_version():
+    """
+    예시 행렬 버전 해시 (임베딩 모델 + INTENT_EXAMPLES)
+
+    Returns:
+        str: sha256 hex
+    """
+    payload = json.dumps(
+        {"model": EMBEDDING_MODEL, "examples": INTENT_EXAMPLES},
+        ensure_ascii=False,
+        sort_keys=True,
     )
-    return response.data[0].embedding
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def router_version():
+    """
+    라우팅 결과에 영향을 주는 설정(예시 행렬 버전 + 집계 방식 + threshold)의 버전 해시
+
+    Returns:
+        str: sha256 hex 앞 12자리
+    """
+    payload = f"{examples_version()}:{AGGREGATION}:{TOP_K}:{SIMILARITY_THRESHOLD}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def _intent_layout():
+    """Intent 순서와 행렬에서 각 Intent 예시가 시작하는 행 번호"""
+    intents = list(INTENT_EXAMPLES)
+    counts = [len(INTENT_EXAMPLES[intent]) for intent in intents]
+    offsets = np.cumsum([0] + counts[:-1])
+    return intents, offsets
+
+
+def build_example_matrix(client):
+    """
+    모든 예시 문장을 1회 배치 호출로 임베딩하여 정규화 행렬 생성 후 저장
+
+    Args:
+        client: OpenAI 클라이언트
+
+    Returns:
+        np.ndarray: (예시 수, d) 정규화 행렬 (INTENT_EXAMPLES 순서)
+    """
+    texts = [example for examples in INTENT_EXAMPLES.values() for example in examples]
+    response = client.embeddings.create(model=EMBEDDING_MODEL, input=texts)
+    matrix = normalize([item.embedding for item in response.data])
+
+    EXAMPLE_MATRIX_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = EXAMPLE_MATRIX_PATH.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(f, matrix=matrix, version=np.array(examples_version()))
+    os.replace(tmp_path, EXAMPLE_MATRIX_PATH)
+    return matrix
 
 
-def cosine_similarity(vec1, vec2):
+def load_example_matrix(client):
     """
-    두 벡터 간 코사인 유사도를 계산합니다.
+    예시 행렬 로드 (메모리 → 파일 → 재생성 순)
+
+    파일의 버전 해시가 현재 예시와 다르면 다시 임베딩합니다.
 
     Args:
-        vec1: 벡터 1
-        vec2: 벡터 2
+        client: OpenAI 클라이언트 (재생성 시에만 사용)
 
     Returns:
-        float: 코사인 유사도 (0~1, 높을수록 유사)
+        tuple: (intents, offsets, matrix)
+    """
+    global _example_matrix
+    version = examples_version()
+    cached = _example_matrix
+    if cached is not None and cached[0] == version:
+        return cached[1:]
+
+    with _example_matrix_lock:
+        if _example_matrix is not None and _example_matrix[0] == version:
+            return _example_matrix[1:]
+
+        matrix = None
+        if EXAMPLE_MATRIX_PATH.exists():
+            with np.load(EXAMPLE_MATRIX_PATH) as saved:
+                if str(saved["version"]) == version:
+                    matrix = saved["matrix"]
+        if matrix is None:
+            matrix = build_example_matrix(client)
+
+        intents, offsets = _intent_layout()
+        _example_matrix = (version, intents, offsets, matrix)
+        return intents, offsets, matrix
+
+
+def score_intents(client, user_message, aggregation=AGGREGATION, top_k=TOP_K):
     """
-    vec1 = np.array(vec1)
-    vec2 = np.array(vec2)
+    Intent별 유사도 점수 (쿼리 임베딩 1회 + 행렬 곱 1회)
 
-    dot_product = np.dot(vec1, vec2)
-    norm1 = np.linalg.norm(vec1)
-    norm2 = np.linalg.norm(vec2)
+    Args:
+        client: OpenAI 클라이언트
+        user_message: 사용자 입력 메시지
+        aggregation: "mean" | "max" | "topk"
+        top_k: aggregation="topk"일 때 평균낼 상위 예시 수
 
-    if norm1 == 0 or norm2 == 0:
-        return 0.0
+    Returns:
+        dict: {intent: 점수} (코사인 유사도 집계값)
+    """
+    intents, offsets, matrix = load_example_matrix(client)
+    query = normalize(get_embedding(client, user_message))
+    similarities = matrix @ query
 
-    return dot_product / (norm1 * norm2)
+    if aggregation == "mean":
+        counts = np.diff(np.append(offsets, len(similarities)))
+        scores = np.add.reduceat(similarities, offsets) / counts
+    elif aggregation == "max":
+        scores = np.maximum.reduceat(similarities, offsets)
+    elif aggregation == "topk":
+        scores = [
+            np.sort(group)[-top_k:].mean()
+            for group in np.split(similarities, offsets[1:])
+        ]
+    else:
+        raise ValueError(f"지원하지 않는 집계 방식: {aggregation}")
+    return {intent: float(score) for intent, score in zip(intents, scores)}
 
 
 def run(client, user_message):
@@ -112,10 +351,10 @@ def run(client, user_message):
     의미적 유사도를 사용하여 사용자 메시지를 분석하고 인텐트를 분류합니다.
 
     분류 전략:
-    1. 사용자 입력의 임베딩 생성
-    2. 각 Intent별 예시 문장들과 코사인 유사도 계산
-    3. Intent별 평균 유사도 계산
-    4. 가장 높은 평균 유사도의 Intent 선택
+    1. 사용자 입력의 임베딩 생성 (예시 행렬은 미리 계산된 것 사용)
+    2. 예시 행렬과 행렬 곱 1회로 모든 예시와의 코사인 유사도 계산
+    3. Intent별 점수 집계 (AGGREGATION: 평균 / 최대 / 상위 k 평균)
+    4. 가장 높은 점수의 Intent 선택
     5. Threshold (0.7) 이하면 "human" fallback
 
     Args:
@@ -125,29 +364,14 @@ def run(client, user_message):
     Returns:
         str: JSON 문자열 {"intent": "faq"|"order"|"human"}
     """
-    # STEP 1: 사용자 입력 임베딩 생성
-    user_embedding = get_embedding(client, user_message)
-
-    # STEP 2: 각 Intent별로 예시들과 유사도 계산
-    intent_scores = {}
-
-    for intent, examples in INTENT_EXAMPLES.items():
-        # 각 예시와 유사도 계산
-        similarities = []
-        for example in examples:
-            example_embedding = get_embedding(client, example)
-            similarity = cosine_similarity(user_embedding, example_embedding)
-            similarities.append(similarity)
-
-        # Intent별 평균 유사도 (또는 최대값 사용 가능)
-        intent_scores[intent] = np.mean(similarities)
+    # STEP 1~3: Intent별 유사도 점수
+    intent_scores = score_intents(client, user_message)
 
-    # STEP 3: 가장 높은 점수의 intent 선택
+    # STEP 4: 가장 높은 점수의 intent 선택
     best_intent = max(intent_scores, key=intent_scores.get)
     best_score = intent_scores[best_intent]
 
-    # STEP 4: Threshold 체크 (신뢰도가 낮으면 human으로 fallback)
-    SIMILARITY_THRESHOLD = 0.7
+    # STEP 5: Threshold 체크 (신뢰도가 낮으면 human으로 fallback)
     if best_score < SIMILARITY_THRESHOLD:
         best_intent = "human"
 
@@ -0,0 +1,295 @@
+"""
+Chapter 3-2: Intent Routing - Shadow 평가 (요청 경로 밖에서 router 비교)
+
+선택한 router(primary)만 요청 경로에서 실행하고, 나머지 router(shadow)는
+백그라운드 스레드 풀에서 동시에 실행하여 결과와 지연을 기록합니다.
+사용자 응답 지연은 primary router 1개 분량만 늘어납니다.
+
+[기록] (SQLite 또는 JSONL, 경로 확장자로 선택)
+- 요청마다 primary 1건 + shadow router별 1건
+- request_id, ts, message, router, role(primary|shadow), intent, time_ms, error
+- 기록도 백그라운드에서 수행 (primary 결과 기록 포함)
+
+[비차단]
+- 대기 작업이 max_pending을 넘으면 그 요청의 기록 / shadow는 건너뜀 (dropped로 집계)
+- close() 시 남은 작업을 마저 처리하고 저장소를 닫음
+
+[불일치 분석]
+python chapter_3-2/router_shadow.py .cache/shadow_routing.sqlite
+→ shadow router별 primary 일치율, 지연 p50/p95, (primary intent → shadow intent) 불일치 쌍
+"""
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_LOG_PATH = Path(__file__).parent / ".cache" / "shadow_routing.sqlite"
+MAX_WORKERS = 4
+MAX_PENDING = 100
+
+COLUMNS = (
+    "request_id",
+    "ts",
+    "message",
+    "router",
+    "role",
+    "intent",
+    "time_ms",
+    "error",
+)
+
+
+class ShadowLog:
+    """
+    라우팅 결과 저장소 (.jsonl → JSONL 추가 쓰기, 그 외 → SQLite)
+
+    여러 스레드에서 write()를 호출할 수 있습니다.
+    """
+
+    def __init__(self, path=DEFAULT_LOG_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        if self.path.suffix == ".jsonl":
+            self._file = open(self.path, "a", encoding="utf-8")
+            self._db = None
+        else:
+            self._file = None
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS decisions ({', '.join(COLUMNS)})"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS decisions_request ON decisions (request_id)"
+            )
+            self._db.commit()
+
+    def write(self, record):
+        with self._lock:
+            if self._db is not None:
+                self._db.execute(
+                    f"INSERT INTO decisions VALUES ({', '.join('?' * len(COLUMNS))})",
+                    [record.get(column) for column in COLUMNS],
+                )
+                self._db.commit()
+            else:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+            else:
+                self._file.close()
+
+
+def load_records(path):
+    """저장소의 모든 기록 (JSONL / SQLite)"""
+    path = Path(path)
+    if path.suffix == ".jsonl":
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    db = sqlite3.connect(path)
+    try:
+        rows = db.execute(f"SELECT {', '.join(COLUMNS)} FROM decisions").fetchall()
+    finally:
+        db.close()
+    return [dict(zip(COLUMNS, row)) for row in rows]
+
+
+def timed_run(router, client, user_message):
+    """
+    router.run() 실행 + 소요 시간 측정
+
+    Returns:
+        tuple: (intent 또는 None, time_ms, error 메시지 또는 None)
+    """
+    start = time.perf_counter()
+    try:
+        intent = json.loads(router.run(client, user_message))["intent"]
+        error = None
+    except Exception as e:  # shadow 실패가 요청 처리에 영향을 주지 않도록 기록만 함
+        intent, error = None, f"{type(e).__name__}: {e}"
+    return intent, (time.perf_counter() - start) * 1000, error
+
+
+class ShadowRunner:
+    """
+    primary router는 요청 경로에서, 나머지 router는 백그라운드에서 실행
+
+    Args:
+        client: OpenAI 클라이언트
+        routers: {이름: router 모듈} (run(client, user_message) 인터페이스)
+        log: ShadowLog
+    """
+
+    def __init__(
+        self, client, routers, log, max_workers=MAX_WORKERS, max_pending=MAX_PENDING
+    ):
+        self.client = client
+        self.routers = routers
+        self.log = log
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="shadow"
+        )
+
+    def _submit_all(self, tasks):
+        """
+        요청 1건의 작업(기록 + shadow)을 한꺼번에 제출
+
+        대기 작업이 max_pending을 넘게 되면 요청 전체를 건너뜁니다. (False)
+        primary 기록만 남고 shadow가 빠지는 식의 불완전한 비교 데이터를 만들지 않습니다.
+        """
+        with self._lock:
+            if self._pending + len(tasks) > self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending += len(tasks)
+
+        def task(fn, args):
+            try:
+                fn(*args)
+            finally:
+                with self._lock:
+                    self._pending -= 1
+
+        for fn, *args in tasks:
+            self._executor.submit(task, fn, args)
+        return True
+
+    def _run_shadow(self, name, base_record, user_message):
+        intent, time_ms, error = timed_run(
+            self.routers[name], self.client, user_message
+        )
+        self.log.write(
+            {
+                **base_record,
+                "router": name,
+                "role": "shadow",
+                "intent": intent,
+                "time_ms": time_ms,
+                "error": error,
+            }
+        )
+
+    def route(self, router_type, user_message):
+        """
+        primary router 결과를 바로 반환하고 shadow 실행은 백그라운드로 넘김
+
+        Returns:
+            tuple: (intent, time_ms) - primary router 결과
+        """
+        base_record = {
+            "request_id": uuid.uuid4().hex,
+            "ts": time.time(),
+            "message": user_message,
+        }
+
+        # STEP 1: primary router (요청 경로, 실패 시 예외 그대로 전달)
+        start = time.perf_counter()
+        result = self.routers[router_type].run(self.client, user_message)
+        intent = json.loads(result)["intent"]
+        time_ms = (time.perf_counter() - start) * 1000
+
+        # STEP 2: primary 기록 + shadow 실행은 백그라운드
+        primary_record = {
+            **base_record,
+            "router": router_type,
+            "role": "primary",
+            "intent": intent,
+            "time_ms": time_ms,
+            "error": None,
+        }
+        tasks = [(self.log.write, primary_record)]
+        tasks += [
+            (self._run_shadow, name, base_record, user_message)
+            for name in self.routers
+            if name != router_type
+        ]
+        self._submit_all(tasks)
+        return intent, time_ms
+
+    def close(self, wait=True):
+        """남은 shadow 작업 처리 후 저장소 닫기"""
+        self._executor.shutdown(wait=wait)
+        self.log.close()
+
+
+def summarize(records):
+    """
+    shadow router별 primary 일치율 / 지연 / 불일치 쌍
+
+    Returns:
+        dict: {router: {"count", "agreement", "errors", "p50_ms", "p95_ms", "disagreements"}}
+    """
+    primary = {r["request_id"]: r for r in records if r["role"] == "primary"}
+    shadows = {}
+    for record in records:
+        if record["role"] != "shadow" or record["request_id"] not in primary:
+            continue
+        shadows.setdefault(record["router"], []).append(
+            (primary[record["request_id"]], record)
+        )
+
+    summary = {}
+    for name, pairs in sorted(shadows.items()):
+        ok = [(p, s) for p, s in pairs if s["error"] is None]
+        times = [s["time_ms"] for _, s in ok] or [0.0]
+        disagreements = Counter(
+            (p["router"], p["intent"], s["intent"])
+            for p, s in ok
+            if p["intent"] != s["intent"]
+        )
+        summary[name] = {
+            "count": len(pairs),
+            "agreement": (
+                (len(ok) - sum(disagreements.values())) / len(ok) if ok else 0.0
+            ),
+            "errors": len(pairs) - len(ok),
+            "p50_ms": float(np.percentile(times, 50)),
+            "p95_ms": float(np.percentile(times, 95)),
+            "disagreements": disagreements.most_common(),
+        }
+    return summary
+
+
+def print_summary(summary):
+    print(
+        f"\n{'shadow':>10} {'건수':>5} {'일치율':>7} {'오류':>4} "
+        f"{'p50(ms)':>8} {'p95(ms)':>8}"
+    )
+    print("-" * 50)
+    for name, s in summary.items():
+        print(
+            f"{name:>10} {s['count']:>5} {s['agreement']:>7.1%} {s['errors']:>4} "
+            f"{s['p50_ms']:>8.0f} {s['p95_ms']:>8.0f}"
+        )
+        for (primary, expected, actual), count in s["disagreements"]:
+            print(f"{'':>12}↳ {primary}={expected} / {name}={actual}: {count}건")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shadow 라우팅 기록 불일치 분석")
+    parser.add_argument("path", nargs="?", default=str(DEFAULT_LOG_PATH))
+    args = parser.parse_args()
+
+    records = load_records(args.path)
+    print(f"📂 {args.path}: 기록 {len(records)}건")
+    print_summary(summarize(records))
+
+
+if __name__ == "__main__":
+    main()
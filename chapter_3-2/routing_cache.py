@@ -0,0 +1,137 @@
+"""
+Chapter 3-2: Intent Routing - 라우팅 결과 캐시 (정규화된 메시지 기준)
+
+띄어쓰기 / 문장부호 / 주문번호만 다른 메시지는 같은 intent로 라우팅되므로
+router 앞에서 정규화된 메시지로 결과를 재사용합니다.
+
+[정규화] (normalize_message)
+1. Unicode NFKC (전각 문자, 호환 문자 통일)
+2. 주문번호 마스킹: ORD-12345 → ORD-*
+3. 문장부호 제거 (Unicode P* 범주)
+4. 공백 정리 (연속 공백 → 1칸, 앞뒤 제거)
+예: "반품  정책이 어떻게 되나요?!" → "반품 정책이 어떻게 되나요"
+
+[만료 / 무효화]
+- LRU: max_size 초과 시 가장 오래 사용하지 않은 항목 제거
+- TTL: 저장 후 ttl초가 지나면 만료
+- router 버전(router_version(): 프롬프트 / 예시 / 규칙 / 임계값 해시)이 바뀌면 전체 무효화
+
+[사용]
+cached = CachedRouter(router_llm)
+cached.run(client, user_message)  # router와 같은 인터페이스
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+MAX_SIZE = 10_000
+TTL_SECONDS = 3600
+
+ORDER_ID_PATTERN = re.compile(r"ORD-\d+")
+ORDER_ID_MASK = "ORD-*"
+
+
+def _strip_punctuation(text):
+    return "".join(ch for ch in text if not unicodedata.category(ch).startswith("P"))
+
+
+def normalize_message(user_message):
+    """
+    캐시 키용 메시지 정규화 (NFKC → 주문번호 마스킹 → 문장부호 제거 → 공백 정리)
+
+    Returns:
+        str: 정규화된 메시지
+    """
+    text = unicodedata.normalize("NFKC", user_message)
+    # 주문번호 사이 텍스트만 문장부호 제거 (마스크의 "-"는 유지)
+    parts = [_strip_punctuation(part) for part in ORDER_ID_PATTERN.split(text)]
+    return " ".join(ORDER_ID_MASK.join(parts).split())
+
+
+def router_version(router):
+    """router 모듈의 router_version() (없으면 모듈 이름 → 버전 변경 감지 없음)"""
+    version = getattr(router, "router_version", None)
+    return version() if version else getattr(router, "__name__", repr(router))
+
+
+class CachedRouter:
+    """
+    라우팅 결과 캐시를 앞에 둔 router (run(client, user_message) 인터페이스 유지)
+
+    여러 스레드(shadow 실행 등)에서 호출할 수 있습니다.
+
+    Attributes:
+        hits / misses: 캐시 적중 / 미적중 수
+        invalidations: router 버전 변경으로 캐시를 비운 횟수
+    """
+
+    def __init__(self, router, max_size=MAX_SIZE, ttl=TTL_SECONDS):
+        self.router = router
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = self.misses = self.invalidations = 0
+        self._entries = OrderedDict()  # 정규화 메시지 → (저장 시각, 결과 JSON)
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _check_version(self):
+        """router 버전이 바뀌었으면 캐시 비우기"""
+        version = router_version(self.router)
+        if version != self._version:
+            if self._version is not None:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+        return version
+
+    def run(self, client, user_message):
+        """
+        캐시 적중 시 저장된 결과, 아니면 router 실행 후 저장
+
+        Returns:
+            str: router.run()과 같은 JSON 문자열
+        """
+        key = normalize_message(user_message)
+        now = time.monotonic()
+        with self._lock:
+            version = self._check_version()
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # router 실행은 lock 밖에서 (느린 LLM 호출이 다른 요청을 막지 않도록)
+        result = self.router.run(client, user_message)
+
+        with self._lock:
+            # 실행 중 버전이 바뀌었으면 이전 버전 결과는 저장하지 않음
+            if self._check_version() == version:
+                self._entries[key] = (time.monotonic(), result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Returns:
+            dict: size, hits, misses, hit_rate, invalidations
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "invalidations": self.invalidations,
+            }
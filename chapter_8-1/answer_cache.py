@@ -0,0 +1,157 @@
+"""
+Chapter 8-1: RAG Pipeline - 시맨틱 답변 캐시
+
+표현만 다른 같은 질문("나루토 스태미나는?" / "나루토의 스태미나 수치 알려줘")에
+검색 + 답변 생성을 반복하지 않도록, 질문 임베딩이 충분히 가까우면 저장된 답변을 재사용합니다.
+
+[재사용 조건]
+- 질문 임베딩 cosine 유사도 >= threshold
+- 같은 검색 설정 (limit, num_candidates 등)
+- 같은 코퍼스 버전 (수집으로 청크가 바뀌면 이전 답변은 모두 무효)
+
+[코퍼스 버전]
+- Atlas: ingest가 bulk_write 후 <컬렉션>_meta 컬렉션의 카운터를 증가 (bump_corpus_version)
+- 로컬 인덱스: 인덱스 문서 _id(내용 해시) 목록의 해시 (local_corpus_version)
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from pymongo.collection import Collection
+
+DEFAULT_THRESHOLD = 0.95
+DEFAULT_MAX_ENTRIES = 1_000
+
+CORPUS_VERSION_ID = "corpus_version"
+
+
+def _meta_collection(collection: Collection) -> Collection:
+    return collection.database[f"{collection.name}_meta"]
+
+
+def corpus_version(collection: Collection) -> str:
+    """컬렉션의 코퍼스 버전 (수집 이력이 없으면 "0")"""
+    doc = _meta_collection(collection).find_one({"_id": CORPUS_VERSION_ID})
+    return str(doc["version"]) if doc else "0"
+
+
+def bump_corpus_version(collection: Collection) -> None:
+    """청크가 바뀐 뒤 호출: 코퍼스 버전 증가 (이전 버전의 캐시된 답변 무효화)"""
+    _meta_collection(collection).update_one(
+        {"_id": CORPUS_VERSION_ID}, {"$inc": {"version": 1}}, upsert=True
+    )
+
+
+def local_corpus_version(documents: list[dict]) -> str:
+    """로컬 인덱스 코퍼스 버전 (청크 _id는 내용 해시이므로 내용이 같으면 버전도 같음)"""
+    digest = hashlib.sha256()
+    for _id in sorted(str(doc["_id"]) for doc in documents):
+        digest.update(_id.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class SemanticAnswerCache:
+    """
+    질문 임베딩 유사도 기반 답변 캐시 (프로세스 메모리, 스레드 안전)
+
+    항목은 정규화된 임베딩 행렬에 쌓이므로 조회는 행렬곱 1번입니다.
+    max_entries를 넘으면 가장 오래 사용하지 않은 항목부터 제거합니다. (LRU)
+
+    Attributes:
+        threshold: 재사용 최소 cosine 유사도
+        max_entries: 최대 항목 수
+        version: 현재 항목들이 속한 코퍼스 버전
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.version: str | None = None
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[int, dict] = OrderedDict()
+        self._vectors: dict[int, np.ndarray] = {}
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _sync_version(self, version: str) -> None:
+        """코퍼스 버전이 바뀌었으면 전체 무효화 (lock 안에서 호출)"""
+        if version != self.version:
+            self._entries.clear()
+            self._vectors.clear()
+            self.version = version
+
+    def get(
+        self, query_embedding: list[float], version: str, scope: str = ""
+    ) -> tuple[dict, float] | None:
+        """
+        가장 가까운 이전 질문의 답변 조회
+
+        Args:
+            query_embedding: 질문 임베딩
+            version: 현재 코퍼스 버전
+            scope: 검색 설정 등 재사용 범위를 나누는 키
+
+        Returns:
+            (저장된 항목, 유사도) 또는 None
+        """
+        query = _normalize(query_embedding)
+        with self._lock:
+            self._sync_version(version)
+            keys = [k for k, entry in self._entries.items() if entry["scope"] == scope]
+            if not keys:
+                self.misses += 1
+                return None
+            scores = np.stack([self._vectors[k] for k in keys]) @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            key = keys[best]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key], float(scores[best])
+
+    def put(
+        self,
+        query: str,
+        query_embedding: list[float],
+        result: dict,
+        version: str,
+        scope: str = "",
+    ) -> None:
+        """답변 저장 (저장 도중 코퍼스 버전이 바뀐 답변은 버림)"""
+        with self._lock:
+            if self.version is None:
+                self._sync_version(version)
+            if version != self.version:
+                return
+            key = self._next_key
+            self._next_key += 1
+            self._entries[key] = {"query": query, "scope": scope, **result}
+            self._vectors[key] = _normalize(query_embedding)
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                del self._vectors[old_key]
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "version": self.version,
+        }
+
+
+def _normalize(vector: list[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    return array / (np.linalg.norm(array) or 1.0)
@@ -0,0 +1,112 @@
+"""
+Chapter 8-1: RAG Pipeline - 로컬 벡터 인덱스 벤치마크
+
+exact(행렬곱) 검색 결과를 정답으로 두고 ivfpq 설정별 recall@k와 검색 지연을 측정합니다.
+
+[데이터]
+- 기본: 클러스터 구조를 가진 합성 벡터 (--count, --dimensions)
+- --index-dir 지정 시: ingest.py가 만든 인덱스의 실제 벡터 사용
+
+실행: python chapter_8-1/bench_index.py --count 100000 --dimensions 512
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from vector_index import LocalVectorIndex
+
+
+def synthetic_vectors(count: int, dimensions: int, seed: int = 0) -> np.ndarray:
+    """문서 임베딩처럼 주제별로 뭉친 합성 벡터"""
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((max(16, count // 500), dimensions))
+    assign = rng.integers(len(topics), size=count)
+    return (topics[assign] + 0.6 * rng.standard_normal((count, dimensions))).astype(
+        np.float32
+    )
+
+
+def measure(
+    index: LocalVectorIndex,
+    queries: np.ndarray,
+    truth: list[set[int]],
+    k: int,
+    **search_kwargs,
+) -> dict:
+    """쿼리 전체에 대해 recall@k와 p50/p95 지연(ms) 측정"""
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        t0 = time.perf_counter()
+        hits = index.search(query, limit=k, **search_kwargs)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        recalls.append(len({row for row, _ in hits} & expected) / k)
+    return {
+        "recall": float(np.mean(recalls)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="로컬 벡터 인덱스 recall/지연 벤치마크"
+    )
+    parser.add_argument("--index-dir", help="ingest.py가 생성한 인덱스 디렉토리")
+    parser.add_argument("--count", type=int, default=50_000)
+    parser.add_argument("--dimensions", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--n-subspaces", type=int, default=64)
+    args = parser.parse_args()
+
+    # STEP 1: 데이터 준비
+    if args.index_dir:
+        vectors = np.asarray(LocalVectorIndex.load(args.index_dir).vectors)
+        print(f"📦 인덱스 벡터 로드: {vectors.shape}")
+    else:
+        vectors = synthetic_vectors(args.count, args.dimensions)
+        print(f"🧪 합성 벡터 생성: {vectors.shape}")
+
+    rng = np.random.default_rng(1)
+    # 쿼리: 기존 벡터에 잡음을 더한 "비슷한 질문"
+    picks = vectors[rng.integers(len(vectors), size=args.queries)]
+    queries = picks + 0.3 * picks.std() * rng.standard_normal(picks.shape)
+    documents = [{"_id": i} for i in range(len(vectors))]
+
+    # STEP 2: 정답 (exact)
+    exact = LocalVectorIndex.build(documents, vectors, kind="exact")
+    truth = [{row for row, _ in exact.search(q, limit=args.k)} for q in queries]
+
+    t0 = time.perf_counter()
+    ivfpq = LocalVectorIndex.build(
+        documents, vectors, kind="ivfpq", n_subspaces=args.n_subspaces
+    )
+    print(f"🔨 ivfpq 빌드: {time.perf_counter() - t0:.1f}초 {ivfpq.params}")
+
+    # STEP 3: 설정별 측정
+    rows = [("exact", measure(exact, queries, truth, args.k))]
+    for n_probe in (4, 8, 16, 32):
+        for num_candidates in (40, 100, 200):
+            result = measure(
+                ivfpq,
+                queries,
+                truth,
+                args.k,
+                n_probe=n_probe,
+                num_candidates=num_candidates,
+            )
+            rows.append((f"ivfpq probe={n_probe} cand={num_candidates}", result))
+
+    print(f"\n{'설정':<32} {'recall@' + str(args.k):>10} {'p50(ms)':>9} {'p95(ms)':>9}")
+    print("-" * 64)
+    for name, result in rows:
+        print(
+            f"{name:<32} {result['recall']:>10.3f} "
+            f"{result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
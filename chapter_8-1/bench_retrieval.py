@@ -0,0 +1,285 @@
+"""
+Chapter 8-1: RAG Pipeline - 검색 벤치마크 (청크 분할 / 검색 설정 스윕)
+
+split_document()의 chunk_size / chunk_overlap / 헤더 깊이와
+검색의 numCandidates / limit 조합을 로컬 인덱스로 비교합니다.
+
+[평가 방식]
+- 청크 분할 설정마다: 문서 분할 → 청크 임베딩 (캐시 사용, 같은 청크는 재임베딩 없음) → 로컬 인덱스 생성
+- 질문은 1회만 임베딩 → 검색 설정마다 검색 지연만 측정 (쿼리 임베딩 시간 제외)
+- recall@k: gold 문자열을 포함한 청크가 상위 k(= limit)개 안에 있는 질문 비율
+- MRR: 첫 정답 청크 순위의 역수 평균
+- 컨텍스트 토큰: 질문당 검색된 청크 본문의 추정 토큰 수 (패킹 전, format_context 입력)
+- p50 / p95: 검색 지연 (ms)
+
+[질문 세트 형식] (JSONL, eval_dimensions.py와 동일)
+{"question": "...", "gold": ["정답 청크에 포함된 문자열", ...]}
+→ chunk_size가 작아 gold 문자열이 청크 경계에서 잘리면 정답을 찾지 못한 것으로 처리
+
+[검색 모드]
+- vector: 로컬 벡터 인덱스만 사용
+- hybrid: BM25 어휘 검색과 RRF 결합 (query.py 하이브리드 검색과 동일)
+
+실행: python chapter_8-1/bench_retrieval.py --chunk-sizes 300 500 800 --limits 3 5 --json results.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+from openai import OpenAI
+
+from embedder import EMBEDDING_MODEL, embed_texts, estimate_tokens
+from embedding_cache import EmbeddingCache
+from eval_dimensions import DEFAULT_QUESTIONS_PATH, load_questions, relevant_rows
+from ingest import (
+    CHUNK_OVERLAP,
+    CHUNK_SIZE,
+    COLLECTION_DIMENSIONS,
+    HEADER_LEVELS,
+    SAMPLE_MD_PATH,
+    split_document,
+)
+from lexical_index import LexicalIndex
+from query import (
+    HYBRID_FETCH_FACTOR,
+    LIMIT,
+    NUM_CANDIDATES,
+    reciprocal_rank_fusion,
+    search_lexical,
+    search_local,
+)
+from vector_index import LocalVectorIndex
+
+load_dotenv()
+
+SEARCH_MODES = ("vector", "hybrid")
+
+
+def split_corpus(
+    texts: dict[str, str], chunk_size: int, chunk_overlap: int, header_levels: int
+) -> list[dict]:
+    """
+    여러 문서를 같은 설정으로 분할
+
+    Returns:
+        list[dict]: _id(행 번호), content, metadata(source 포함) 청크 리스트
+    """
+    chunks = []
+    for source, text in texts.items():
+        for chunk in split_document(text, chunk_size, chunk_overlap, header_levels):
+            metadata = {**chunk["metadata"], "source": source}
+            chunks.append({"content": chunk["content"], "metadata": metadata})
+    for row, chunk in enumerate(chunks):
+        chunk["_id"] = row
+    return chunks
+
+
+def evaluate(
+    index: LocalVectorIndex,
+    lexical: LexicalIndex | None,
+    questions: list[dict],
+    query_vectors: list[list[float]],
+    relevant: list[set[int]],
+    num_candidates: int,
+    limit: int,
+) -> dict:
+    """검색 설정 1개의 recall@limit, MRR, 질문당 컨텍스트 토큰, 검색 지연(p50/p95 ms) 측정"""
+    hits, reciprocal_ranks, tokens, latencies = [], [], [], []
+    for question, query, expected in zip(questions, query_vectors, relevant):
+        t0 = time.perf_counter()
+        if lexical is None:
+            documents = search_local(index, query, num_candidates, limit)
+        else:
+            fetch_limit = limit * HYBRID_FETCH_FACTOR
+            lexical_documents, _ = search_lexical(
+                lexical, question["question"], fetch_limit
+            )
+            vector_documents = search_local(index, query, num_candidates, fetch_limit)
+            documents = reciprocal_rank_fusion(
+                [vector_documents, lexical_documents], limit
+            )
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+        rows = [doc["_id"] for doc in documents]
+        rank = next((r for r, row in enumerate(rows, 1) if row in expected), None)
+        hits.append(rank is not None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+        tokens.append(sum(estimate_tokens(doc["content"]) for doc in documents))
+
+    return {
+        "recall": float(np.mean(hits)),
+        "mrr": float(np.mean(reciprocal_ranks)),
+        "context_tokens": float(np.mean(tokens)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def print_table(results: list[dict]) -> None:
+    print(
+        f"\n{'size':>5} {'overlap':>7} {'헤더':>4} {'청크':>5} {'모드':>7} "
+        f"{'후보':>5} {'k':>3} {'recall@k':>9} {'MRR':>6} {'토큰/질문':>9} "
+        f"{'p50(ms)':>8} {'p95(ms)':>8}"
+    )
+    print("-" * 96)
+    for r in results:
+        print(
+            f"{r['chunk_size']:>5} {r['chunk_overlap']:>7} {r['header_levels']:>4} "
+            f"{r['chunks']:>5} {r['mode']:>7} {r['num_candidates']:>5} {r['limit']:>3} "
+            f"{r['recall']:>9.3f} {r['mrr']:>6.3f} {r['context_tokens']:>9.0f} "
+            f"{r['p50_ms']:>8.3f} {r['p95_ms']:>8.3f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="청크 분할 / 검색 설정별 검색 품질 벤치마크"
+    )
+    parser.add_argument(
+        "--sources",
+        nargs="+",
+        default=[str(SAMPLE_MD_PATH)],
+        help="Markdown 문서 (여러 개 가능)",
+    )
+    parser.add_argument("--questions", default=str(DEFAULT_QUESTIONS_PATH))
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[CHUNK_SIZE])
+    parser.add_argument("--overlaps", type=int, nargs="+", default=[CHUNK_OVERLAP])
+    parser.add_argument("--header-levels", type=int, nargs="+", default=[HEADER_LEVELS])
+    parser.add_argument(
+        "--num-candidates", type=int, nargs="+", default=[NUM_CANDIDATES]
+    )
+    parser.add_argument("--limits", type=int, nargs="+", default=[LIMIT])
+    parser.add_argument(
+        "--modes", nargs="+", choices=SEARCH_MODES, default=list(SEARCH_MODES)
+    )
+    parser.add_argument(
+        "--kind",
+        choices=["auto", "exact", "ivfpq"],
+        help="로컬 인덱스 종류 (기본: --num-candidates가 여러 개면 ivfpq, 아니면 exact)",
+    )
+    parser.add_argument("--dimensions", type=int, default=COLLECTION_DIMENSIONS)
+    parser.add_argument("--json", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+    # exact 인덱스는 numCandidates를 쓰지 않으므로 스윕해도 같은 결과
+    sweep = len(set(args.num_candidates)) > 1
+    if args.kind is None:
+        args.kind = "ivfpq" if sweep else "exact"
+    elif args.kind == "exact" and sweep:
+        parser.error(
+            "--kind exact는 numCandidates를 무시합니다: --kind ivfpq로 스윕하세요"
+        )
+
+    openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    cache = EmbeddingCache()
+
+    # STEP 1: 문서 / 질문 준비 (질문은 1회만 임베딩)
+    texts = {
+        Path(path).name: Path(path).read_text(encoding="utf-8") for path in args.sources
+    }
+    questions = load_questions(Path(args.questions))
+    question_vectors = embed_texts(
+        openai_client,
+        [q["question"] for q in questions],
+        model=EMBEDDING_MODEL,
+        dimensions=args.dimensions,
+        show_progress=False,
+        cache=cache,
+    )
+    print(f"📚 문서 {len(texts)}개 / 질문 {len(questions)}개 / {args.dimensions}차원")
+
+    # STEP 2: 청크 분할 설정별 인덱스 생성 → 검색 설정별 평가
+    results = []
+    for chunk_size, chunk_overlap, header_levels in itertools.product(
+        args.chunk_sizes, args.overlaps, args.header_levels
+    ):
+        if chunk_overlap >= chunk_size:
+            print(f"   ⏭️ 건너뜀: overlap {chunk_overlap} >= chunk_size {chunk_size}")
+            continue
+        chunks = split_corpus(texts, chunk_size, chunk_overlap, header_levels)
+        vectors = embed_texts(
+            openai_client,
+            [chunk["content"] for chunk in chunks],
+            model=EMBEDDING_MODEL,
+            dimensions=args.dimensions,
+            show_progress=False,
+            cache=cache,
+        )
+        index = LocalVectorIndex.build(chunks, vectors, kind=args.kind)
+        if sweep and index.kind == "exact":
+            print(
+                "   ⚠️ exact 인덱스로 생성됨: numCandidates 스윕 결과는 모두 같습니다"
+            )
+        lexical = LexicalIndex.build(chunks) if "hybrid" in args.modes else None
+        relevant = [relevant_rows(chunks, q["gold"]) for q in questions]
+        unlabeled = sum(1 for rows in relevant if not rows)
+        print(
+            f"   🔪 size={chunk_size} overlap={chunk_overlap} 헤더={header_levels}: "
+            f"청크 {len(chunks)}개 (정답 청크 없는 질문 {unlabeled}개)"
+        )
+
+        for mode, num_candidates, limit in itertools.product(
+            args.modes, args.num_candidates, args.limits
+        ):
+            result = evaluate(
+                index,
+                lexical if mode == "hybrid" else None,
+                questions,
+                question_vectors,
+                relevant,
+                num_candidates,
+                limit,
+            )
+            results.append(
+                {
+                    "chunk_size": chunk_size,
+                    "chunk_overlap": chunk_overlap,
+                    "header_levels": header_levels,
+                    "chunks": len(chunks),
+                    "unlabeled": unlabeled,
+                    "mode": mode,
+                    "num_candidates": num_candidates,
+                    "limit": limit,
+                    **result,
+                }
+            )
+
+    if not results:
+        print("❌ 평가할 설정이 없습니다.")
+        return
+
+    # STEP 3: 결과 출력 (표 + JSON)
+    print_table(results)
+
+    # 최고 recall → 최고 MRR → 가장 적은 컨텍스트 토큰 순으로 선택
+    best = max(results, key=lambda r: (r["recall"], r["mrr"], -r["context_tokens"]))
+    print(
+        f"\n✅ 추천: chunk_size={best['chunk_size']} overlap={best['chunk_overlap']} "
+        f"헤더={best['header_levels']} / {best['mode']} numCandidates={best['num_candidates']} "
+        f"limit={best['limit']} (recall {best['recall']:.3f}, MRR {best['mrr']:.3f}, "
+        f"{best['context_tokens']:.0f}토큰/질문)"
+    )
+
+    if args.json:
+        report = {
+            "sources": list(texts),
+            "questions": len(questions),
+            "model": EMBEDDING_MODEL,
+            "dimensions": args.dimensions,
+            "index_kind": args.kind,
+            "results": results,
+            "best": best,
+        }
+        Path(args.json).write_text(
+            json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        print(f"   💾 JSON 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Chapter 8-1: RAG Pipeline - Markdown 분할기 동일성 검증 / 처리량 벤치마크
+
+md_splitter.py가 langchain splitter와 같은 청크를 만드는지 확인하고 처리량을 비교합니다.
+
+[동일성 검증] (golden)
+- fixtures/split_golden.json: langchain splitter로 만든 기대 결과 (문서 × 분할 설정)
+- split_document() 결과의 content / metadata(키 순서 포함)가 모두 같아야 통과
+- langchain이 설치되어 있으면 --sources 문서로 실시간 비교도 수행
+
+[처리량]
+- --repeat 배로 이어 붙인 큰 문서를 --runs 번 분할하여 MB/s 비교 (최솟값 기준)
+- import 시간: langchain_text_splitters vs md_splitter (별도 프로세스에서 측정)
+
+실행:
+  python chapter_8-1/bench_splitter.py
+  python chapter_8-1/bench_splitter.py --update-golden  # langchain 결과로 fixture 재생성
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from ingest import HEADER_KEYS, SAMPLE_MD_PATH, split_document
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+GOLDEN_PATH = FIXTURE_DIR / "split_golden.json"
+GOLDEN_SOURCES = [SAMPLE_MD_PATH, FIXTURE_DIR / "splitter_edge_cases.md"]
+
+# (chunk_size, chunk_overlap, header_levels)
+GOLDEN_CONFIGS = [(500, 50, 3), (200, 20, 2), (1000, 0, 1), (60, 10, 3)]
+
+
+def langchain_split(
+    text: str, chunk_size: int, chunk_overlap: int, header_levels: int
+) -> list[dict]:
+    """기준 구현: 이전 split_document()와 같은 langchain splitter 조합"""
+    from langchain_text_splitters import (
+        MarkdownHeaderTextSplitter,
+        RecursiveCharacterTextSplitter,
+    )
+
+    header_splitter = MarkdownHeaderTextSplitter(
+        headers_to_split_on=[
+            ("#" * level, key)
+            for level, key in enumerate(HEADER_KEYS[:header_levels], start=1)
+        ]
+    )
+    char_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    )
+    return [
+        {"content": sub_chunk, "metadata": section.metadata}
+        for section in header_splitter.split_text(text)
+        for sub_chunk in char_splitter.split_text(section.page_content)
+    ]
+
+
+def has_langchain() -> bool:
+    try:
+        import langchain_text_splitters  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def same_chunks(expected: list[dict], actual: list[dict]) -> bool:
+    """content + metadata가 같고 metadata 키 순서까지 같으면 True"""
+    return expected == actual and all(
+        list(a["metadata"]) == list(b["metadata"]) for a, b in zip(expected, actual)
+    )
+
+
+def update_golden() -> None:
+    cases = []
+    for path in GOLDEN_SOURCES:
+        text = path.read_text(encoding="utf-8")
+        for chunk_size, chunk_overlap, header_levels in GOLDEN_CONFIGS:
+            cases.append(
+                {
+                    "source": path.name,
+                    "chunk_size": chunk_size,
+                    "chunk_overlap": chunk_overlap,
+                    "header_levels": header_levels,
+                    "chunks": langchain_split(
+                        text, chunk_size, chunk_overlap, header_levels
+                    ),
+                }
+            )
+    GOLDEN_PATH.write_text(
+        json.dumps(cases, ensure_ascii=False, indent=1) + "\n", encoding="utf-8"
+    )
+    print(f"💾 golden 저장: {GOLDEN_PATH} ({len(cases)}개 케이스)")
+
+
+def check_golden() -> bool:
+    """fixture와 split_document() 결과 비교"""
+    cases = json.loads(GOLDEN_PATH.read_text(encoding="utf-8"))
+    sources = {path.name: path.read_text(encoding="utf-8") for path in GOLDEN_SOURCES}
+    failures = 0
+    for case in cases:
+        actual = split_document(
+            sources[case["source"]],
+            case["chunk_size"],
+            case["chunk_overlap"],
+            case["header_levels"],
+        )
+        if not same_chunks(case["chunks"], actual):
+            failures += 1
+            print(
+                f"   ❌ {case['source']} size={case['chunk_size']} "
+                f"overlap={case['chunk_overlap']} 헤더={case['header_levels']}: "
+                f"기대 {len(case['chunks'])}개 / 실제 {len(actual)}개"
+            )
+    print(f"✅ golden {len(cases) - failures}/{len(cases)} 통과")
+    return failures == 0
+
+
+def check_live(paths: list[Path]) -> bool:
+    """langchain과 실시간 비교 (기본 분할 설정)"""
+    failures = 0
+    for path in paths:
+        text = path.read_text(encoding="utf-8")
+        if not same_chunks(langchain_split(text, 500, 50, 3), split_document(text)):
+            failures += 1
+            print(f"   ❌ {path}")
+    print(f"✅ langchain 실시간 비교 {len(paths) - failures}/{len(paths)} 통과")
+    return failures == 0
+
+
+def throughput(split, text: str, runs: int) -> float:
+    """MB/s (runs번 중 가장 빠른 실행 기준)"""
+    best = float("inf")
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        split(text, 500, 50, 3)
+        best = min(best, time.perf_counter() - t0)
+    return len(text.encode("utf-8")) / 2**20 / best
+
+
+def import_ms(module: str) -> float:
+    """새 프로세스에서 모듈 import 시간 (ms)"""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).parent,
+    ).stdout
+    return float(output) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Markdown 분할기 동일성 검증 / 벤치마크"
+    )
+    parser.add_argument(
+        "--sources",
+        nargs="+",
+        default=[str(SAMPLE_MD_PATH)],
+        help="비교할 Markdown 문서",
+    )
+    parser.add_argument("--repeat", type=int, default=100, help="벤치마크 문서 배수")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--update-golden", action="store_true")
+    args = parser.parse_args()
+
+    langchain = has_langchain()
+    if args.update_golden:
+        if not langchain:
+            sys.exit("❌ golden 재생성에는 langchain-text-splitters가 필요합니다")
+        update_golden()
+
+    # STEP 1: 동일성 검증
+    ok = check_golden()
+    if langchain:
+        ok = check_live([Path(path) for path in args.sources]) and ok
+    else:
+        print("   ⏭️ langchain 미설치: 실시간 비교 / 처리량 비교 생략")
+
+    # STEP 2: 처리량
+    text = "\n".join(Path(path).read_text(encoding="utf-8") for path in args.sources)
+    text = "\n".join([text] * args.repeat)
+    size_mb = len(text.encode("utf-8")) / 2**20
+    print(f"\n📄 벤치마크 문서: {size_mb:.1f}MB (× {args.repeat})")
+    fast = throughput(split_document, text, args.runs)
+    print(f"   md_splitter: {fast:8.2f} MB/s / import {import_ms('md_splitter'):.1f}ms")
+    if langchain:
+        slow = throughput(langchain_split, text, args.runs)
+        print(
+            f"   langchain:   {slow:8.2f} MB/s / "
+            f"import {import_ms('langchain_text_splitters'):.1f}ms"
+        )
+        print(f"   → 처리량 {fast / slow:.1f}배")
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
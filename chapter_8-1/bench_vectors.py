@@ -0,0 +1,125 @@
+"""
+Chapter 8-1: RAG Pipeline - content_vector 인코딩 벤치마크
+
+인코딩 모드(list / float32 / int8 / binary)별로 다음을 비교합니다.
+- 저장 크기: content_vector 필드의 BSON 바이트 (binary는 재채점용 int8 사본 포함/제외 모두)
+- 디코딩 비용: BSON 문서 → NumPy 벡터 변환 시간
+- recall@k: float 전수 검색 대비 해당 표현으로 전수 검색한 결과
+- 검색 지연: 해당 표현으로의 전수 검색 p50 (binary는 해밍 검색 + int8 사본 재채점)
+
+실행: python chapter_8-1/bench_vectors.py --count 20000
+"""
+
+import argparse
+import time
+
+import bson
+import numpy as np
+
+from bench_index import synthetic_vectors
+from vector_codec import ENCODINGS, RESCORE_VECTOR_FIELD, decode_raw, encode_vector
+from vector_index import LocalVectorIndex
+
+# 바이트별 1비트 개수 (해밍 거리 계산용)
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+
+def search_fn(encoding: str, matrix: np.ndarray, k: int, rescore_factor: int):
+    """인코딩별 전수 검색 함수 (query → 상위 k개 행 번호)"""
+    if encoding in ("list", "float32"):
+        return lambda q: _top_k(matrix @ q, k)
+
+    # int8 (binary의 재채점용 사본과 같은 양자화)
+    scale = np.abs(matrix).max(axis=1, keepdims=True)
+    scale[scale == 0] = 1.0
+    quantized = np.round(matrix * (127.0 / scale)).astype(np.int8)
+    norms = np.linalg.norm(quantized.astype(np.float32), axis=1)
+    norms[norms == 0] = 1.0
+    as_float = quantized.astype(np.float32)
+    if encoding == "int8":
+        return lambda q: _top_k((as_float @ q) / norms, k)
+
+    # binary: 해밍 거리로 후보 → int8 사본 재채점
+    bits = np.packbits(matrix > 0, axis=1)
+
+    def search(q: np.ndarray) -> np.ndarray:
+        distance = POPCOUNT[np.bitwise_xor(bits, np.packbits(q > 0))].sum(axis=1)
+        candidates = _top_k(-distance.astype(np.float32), k * rescore_factor)
+        rescored = (as_float[candidates] @ q) / norms[candidates]
+        return candidates[_top_k(rescored, k)]
+
+    return search
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="content_vector 인코딩 벤치마크")
+    parser.add_argument("--index-dir", help="ingest.py가 생성한 인덱스 디렉토리")
+    parser.add_argument("--count", type=int, default=20_000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rescore-factor", type=int, default=10)
+    args = parser.parse_args()
+
+    # STEP 1: 데이터 준비 (정규화된 float32)
+    if args.index_dir:
+        matrix = np.asarray(LocalVectorIndex.load(args.index_dir).vectors)
+    else:
+        matrix = synthetic_vectors(args.count, args.dimensions)
+    matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = matrix.astype(np.float32)
+    print(f"🧪 벡터: {matrix.shape}")
+
+    rng = np.random.default_rng(1)
+    picks = matrix[rng.integers(len(matrix), size=args.queries)]
+    queries = picks + 0.3 * picks.std() * rng.standard_normal(picks.shape)
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(
+        np.float32
+    )
+    truth = [set(_top_k(matrix @ q, args.k)) for q in queries]
+
+    # STEP 2: 인코딩별 측정
+    print(
+        f"\n{'인코딩':<10} {'바이트/청크':>12} {'(검색 필드)':>12} "
+        f"{'디코딩(µs)':>11} {'recall@' + str(args.k):>10} {'p50(ms)':>9}"
+    )
+    print("-" * 70)
+    sample = matrix[:200]
+    for encoding in ENCODINGS:
+        encoded = [bson.encode(encode_vector(v, encoding)) for v in sample]
+        total_bytes = np.mean([len(raw) for raw in encoded])
+        search_bytes = np.mean(
+            [
+                len(bson.encode({"content_vector": bson.decode(raw)["content_vector"]}))
+                for raw in encoded
+            ]
+        )
+
+        t0 = time.perf_counter()
+        for raw in encoded:
+            doc = bson.decode(raw)
+            decode_raw(doc.get(RESCORE_VECTOR_FIELD, doc["content_vector"]))
+        decode_us = (time.perf_counter() - t0) / len(encoded) * 1e6
+
+        search = search_fn(encoding, matrix, args.k, args.rescore_factor)
+        latencies, recalls = [], []
+        for q, expected in zip(queries, truth):
+            t0 = time.perf_counter()
+            hits = search(q)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            recalls.append(len(set(hits) & expected) / args.k)
+
+        print(
+            f"{encoding:<10} {total_bytes:>12,.0f} {search_bytes:>12,.0f} "
+            f"{decode_us:>11.1f} {np.mean(recalls):>10.3f} "
+            f"{np.percentile(latencies, 50):>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Chapter 8-1: RAG Pipeline - 컨텍스트 패킹
+
+검색된 청크를 그대로 이어 붙이면 인접 청크 사이의 chunk_overlap(50자)이 반복되고,
+청크 크기와 상관없이 상위 k개가 모두 프롬프트에 들어갑니다.
+pack_context()는 토큰 예산 안에서 점수가 높은 청크부터 담고, 같은 섹션의 청크를 병합합니다.
+
+[병합 규칙] (같은 source + 같은 h1/h2/h3 경로)
+- 인접: metadata.chunk_index가 연속 (ingest가 섹션 내 순서를 기록)
+- 겹침: 앞 청크의 접미사 == 뒤 청크의 접두사 (chunk_index가 없는 이전 데이터도 병합)
+- 병합 시 겹친 부분은 한 번만 포함, 다른 청크에 포함된 청크는 제거
+
+[순서]
+- 블록: 블록 내 최고 점수 내림차순 (→ [1]이 가장 관련 높은 블록)
+- 블록 안: 원문 순서
+
+[예산]
+- 점수 내림차순으로 청크를 추가했을 때 병합 후 토큰 수가 예산 이하이면 채택 (greedy)
+- 1순위 청크만으로 예산을 넘으면 예산에 맞춰 잘라서 포함
+"""
+
+from embedder import estimate_tokens
+
+DEFAULT_TOKEN_BUDGET = 2000
+
+# split_document()의 chunk_overlap / 우연한 일치로 보지 않을 최소 겹침 길이
+MAX_OVERLAP = 50
+MIN_OVERLAP = 8
+
+# 겹침 없이 인접한 청크 사이 구분자 (splitter가 나눈 문단 경계)
+JOIN_SEPARATOR = "\n\n"
+
+
+def overlap_length(head: str, tail: str, max_overlap: int = MAX_OVERLAP) -> int:
+    """head의 접미사와 tail의 접두사가 같은 최대 길이 (MIN_OVERLAP 미만이면 0)"""
+    for size in range(min(len(head), len(tail), max_overlap), MIN_OVERLAP - 1, -1):
+        if head.endswith(tail[:size]):
+            return size
+    return 0
+
+
+def _section_key(doc: dict) -> tuple:
+    metadata = doc.get("metadata", {})
+    return (
+        metadata.get("source"),
+        tuple(metadata.get(key) for key in ("h1", "h2", "h3")),
+    )
+
+
+def _chain_section(docs: list[dict]) -> list[list[dict]]:
+    """같은 섹션 청크들을 원문 순서의 연속 구간(chain)으로 묶음"""
+    if all("chunk_index" in doc.get("metadata", {}) for doc in docs):
+        docs = sorted(docs, key=lambda doc: doc["metadata"]["chunk_index"])
+        chains = [[docs[0]]]
+        for prev, doc in zip(docs, docs[1:]):
+            adjacent = (
+                doc["metadata"]["chunk_index"] == prev["metadata"]["chunk_index"] + 1
+            )
+            if adjacent or overlap_length(prev["content"], doc["content"]):
+                chains[-1].append(doc)
+            else:
+                chains.append([doc])
+        return chains
+
+    # 순서 정보가 없으면 겹침으로만 연결 (tail → head)
+    chains = [[doc] for doc in docs]
+    merged = True
+    while merged:
+        merged = False
+        for a in chains:
+            for b in chains:
+                if a is b:
+                    continue
+                if overlap_length(a[-1]["content"], b[0]["content"]):
+                    a.extend(b)
+                    chains.remove(b)
+                    merged = True
+                    break
+            if merged:
+                break
+    return chains
+
+
+def _merge_chain(chain: list[dict]) -> dict:
+    """연속 구간 → 블록 1개 (겹침 제거, 포함된 청크 제거)"""
+    text = chain[0]["content"]
+    for doc in chain[1:]:
+        content = doc["content"]
+        if content in text:
+            continue
+        size = overlap_length(text, content)
+        text += content[size:] if size else JOIN_SEPARATOR + content
+    best = max(chain, key=lambda doc: doc.get("score", 0.0))
+    return {
+        "content": text,
+        "metadata": best.get("metadata", {}),
+        "score": best.get("score", 0.0),
+        "chunk_ids": [doc.get("_id") for doc in chain],
+    }
+
+
+def merge_chunks(documents: list[dict]) -> list[dict]:
+    """
+    같은 섹션의 인접/겹치는 청크를 병합한 블록 목록 (점수 내림차순)
+
+    Returns:
+        list[dict]: {"content", "metadata", "score", "chunk_ids"} 블록
+    """
+    sections: dict[tuple, list[dict]] = {}
+    for doc in documents:
+        sections.setdefault(_section_key(doc), []).append(doc)
+
+    blocks = []
+    for docs in sections.values():
+        blocks.extend(_merge_chain(chain) for chain in _chain_section(docs))
+    return sorted(blocks, key=lambda block: block["score"], reverse=True)
+
+
+def _truncate(text: str, token_budget: int) -> str:
+    """estimate_tokens 기준으로 예산에 맞게 자르기"""
+    data = text.encode("utf-8")[: token_budget * 3]
+    return data.decode("utf-8", errors="ignore")
+
+
+def pack_context(
+    documents: list[dict], token_budget: int = DEFAULT_TOKEN_BUDGET
+) -> list[dict]:
+    """
+    토큰 예산 안에서 점수 순으로 청크를 채우고 같은 섹션끼리 병합
+
+    Args:
+        documents: 검색 결과 (content, metadata, score)
+        token_budget: 컨텍스트 본문 최대 추정 토큰 수 (estimate_tokens 기준)
+
+    Returns:
+        list[dict]: format_context()에 그대로 넣을 수 있는 블록 (점수 내림차순)
+    """
+    ranked = sorted(documents, key=lambda doc: doc.get("score", 0.0), reverse=True)
+    selected: list[dict] = []
+    blocks: list[dict] = []
+    for doc in ranked:
+        trial = merge_chunks(selected + [doc])
+        if sum(estimate_tokens(block["content"]) for block in trial) <= token_budget:
+            selected.append(doc)
+            blocks = trial
+
+    if not blocks and ranked:
+        top = ranked[0]
+        blocks = merge_chunks(
+            [{**top, "content": _truncate(top["content"], token_budget)}]
+        )
+    return blocks
+
+
+def context_tokens(documents: list[dict]) -> int:
+    """컨텍스트 본문 추정 토큰 수"""
+    return sum(estimate_tokens(doc.get("content", "")) for doc in documents)
@@ -0,0 +1,329 @@
+"""
+Chapter 8-1: RAG Pipeline - 배치 임베딩 생성기
+
+청크마다 embeddings.create를 1회씩 호출하면 N개 청크 = N번의 직렬 왕복이 됩니다.
+이 모듈은 여러 청크를 하나의 요청으로 묶고, 여러 요청을 동시에 실행합니다.
+
+- 토큰 예산 기반 배치 구성 (요청당 입력 수 / 추정 토큰 수 제한)
+- 여러 배치 동시 실행 (ThreadPoolExecutor) + Rate Limiter (RPM/TPM)
+- 배치 단위 재시도 (Exponential Backoff) - 실패한 배치만, 429 / 연결 오류 / 5xx만 다시 요청
+- 입력당 토큰 한도(MAX_TOKENS_PER_INPUT) 초과 텍스트는 잘라서 요청
+- 진행률 출력
+- 로컬 임베딩 캐시 연동 (embedding_cache.py) - 캐시 히트는 요청하지 않음
+- Matryoshka 차원 축소 (dimensions 파라미터 / truncate_embeddings)
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+from openai import APIConnectionError, APIStatusError, OpenAI, RateLimitError
+
+from embedding_cache import EmbeddingCache
+from vector_codec import RESCORE_FIELDS, decode_vector
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 1536  # text-embedding-3-small 최대 차원
+
+# 차원 축소 평가 후보 (text-embedding-3는 앞쪽 차원일수록 정보가 많도록 학습됨)
+DIMENSION_CANDIDATES = (256, 512, 1024, 1536)
+
+# OpenAI Embeddings API 제한 (요청당 최대 2048개 입력, 입력당 8191 토큰)
+MAX_INPUTS_PER_REQUEST = 2048
+MAX_TOKENS_PER_INPUT = 8191
+
+# 기본 배치/동시성 설정
+DEFAULT_BATCH_TOKENS = 50_000
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RPM = 3_000  # requests per minute
+DEFAULT_TPM = 1_000_000  # tokens per minute
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토큰 수 보수적 추정 (tokenizer 없이)
+
+    cl100k 기준 한글은 1자 ≈ 1토큰(UTF-8 3바이트), 영문은 ~4자/토큰이므로
+    UTF-8 바이트 수 / 3은 실제 토큰 수보다 작게 나오지 않는 근사값입니다.
+    """
+    return max(1, len(text.encode("utf-8")) // 3)
+
+
+def truncate_to_token_limit(text: str, max_tokens: int = MAX_TOKENS_PER_INPUT) -> str:
+    """
+    추정 토큰 수가 max_tokens를 넘으면 앞부분만 남기기
+
+    estimate_tokens와 같은 기준(UTF-8 3바이트 ≈ 1토큰)으로 자르며,
+    잘린 멀티바이트 문자는 버립니다.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    return text.encode("utf-8")[: max_tokens * 3].decode("utf-8", errors="ignore")
+
+
+def _is_retryable(error: Exception) -> bool:
+    """일시적 오류만 재시도 (429, 연결/타임아웃, 5xx) - 400 등 요청 오류는 즉시 실패"""
+    if isinstance(error, (RateLimitError, APIConnectionError)):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+
+def truncate_embeddings(
+    vectors: list[list[float]] | np.ndarray, dimensions: int
+) -> np.ndarray:
+    """
+    Matryoshka 차원 축소: 앞쪽 dimensions개만 남기고 다시 L2 정규화
+
+    API의 dimensions 파라미터와 같은 결과이므로, 전체 차원 임베딩 하나로
+    여러 차원 설정을 API 재호출 없이 비교할 수 있습니다.
+    """
+    array = np.asarray(vectors, dtype=np.float32)[..., :dimensions]
+    norms = np.linalg.norm(array, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return array / norms
+
+
+def collection_embedding_config(collection) -> dict | None:
+    """
+    컬렉션에 기록된 임베딩 설정 조회 (청크 metadata.embedding)
+
+    metadata.embedding이 없는 이전 버전 청크가 있으면 그 청크의 저장된 벡터 길이를
+    차원으로 봅니다. (_id에 차원이 없어 재수집 시 "유지"로 분류되므로, 기록된 설정만
+    보면 다른 차원의 신규 청크가 섞일 수 있음)
+
+    Returns:
+        {"model": ..., "dimensions": ...} 또는 None (빈 컬렉션)
+    """
+    legacy = collection.find_one(
+        {"metadata.embedding": {"$exists": False}},
+        {"content_vector": 1, **{field: 1 for field in RESCORE_FIELDS}},
+    )
+    if legacy:
+        return {"model": EMBEDDING_MODEL, "dimensions": len(decode_vector(legacy))}
+    doc = collection.find_one(
+        {"metadata.embedding": {"$exists": True}}, {"metadata.embedding": 1}
+    )
+    return doc["metadata"]["embedding"] if doc else None
+
+
+def make_batches(
+    texts: list[str],
+    max_tokens: int = DEFAULT_BATCH_TOKENS,
+    max_inputs: int = MAX_INPUTS_PER_REQUEST,
+) -> list[list[int]]:
+    """
+    텍스트를 토큰 예산 이하의 배치로 묶기 (순서 유지)
+
+    Args:
+        texts: 임베딩할 텍스트 리스트
+        max_tokens: 배치당 최대 추정 토큰 수
+        max_inputs: 배치당 최대 입력 수
+
+    Returns:
+        list[list[int]]: 배치별 텍스트 인덱스 리스트
+    """
+    batches: list[list[int]] = []
+    current: list[int] = []
+    current_tokens = 0
+
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (
+            current_tokens + tokens > max_tokens or len(current) >= max_inputs
+        ):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+class RateLimiter:
+    """
+    분당 요청 수(RPM)와 토큰 수(TPM)를 함께 제한하는 Token Bucket
+
+    여러 스레드가 공유하며, acquire()는 예산이 찰 때까지 대기합니다.
+    """
+
+    def __init__(self, rpm: int = DEFAULT_RPM, tpm: int = DEFAULT_TPM) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> None:
+        """요청 1회 + tokens만큼의 예산 확보 (부족하면 대기)"""
+        tokens = min(tokens, self.tpm)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed = now - self._updated
+                self._updated = now
+                self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+                self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+
+                # 부족한 예산이 채워질 때까지 필요한 시간
+                wait = max(
+                    (1 - self._requests) * 60 / self.rpm,
+                    (tokens - self._tokens) * 60 / self.tpm,
+                )
+            time.sleep(max(wait, 0.01))
+
+
+def _embed_batch(
+    client: OpenAI,
+    texts: list[str],
+    model: str,
+    dimensions: int,
+    limiter: RateLimiter,
+    max_retries: int,
+    base_delay: float,
+) -> list[list[float]]:
+    """배치 1개 임베딩 (실패 시 이 배치만 Exponential Backoff 재시도)"""
+    tokens = sum(estimate_tokens(text) for text in texts)
+
+    for attempt in range(max_retries):
+        limiter.acquire(tokens)
+        try:
+            response = client.embeddings.create(
+                model=model, input=texts, dimensions=dimensions
+            )
+            # 응답 순서는 index 기준으로 정렬하여 입력 순서와 맞춤
+            data = sorted(response.data, key=lambda d: d.index)
+            return [d.embedding for d in data]
+        except (RateLimitError, APIConnectionError, APIStatusError) as e:
+            if not _is_retryable(e) or attempt == max_retries - 1:
+                raise
+            delay = base_delay * (2**attempt)
+            print(
+                f"\n   ⚠️ 배치 임베딩 실패 ({type(e).__name__}). {delay}초 후 재시도..."
+            )
+            time.sleep(delay)
+
+    raise RuntimeError("unreachable")
+
+
+def embed_texts(
+    client: OpenAI,
+    texts: list[str],
+    model: str = EMBEDDING_MODEL,
+    dimensions: int = EMBEDDING_DIMENSIONS,
+    batch_tokens: int = DEFAULT_BATCH_TOKENS,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    limiter: RateLimiter | None = None,
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    show_progress: bool = True,
+    cache: EmbeddingCache | None = None,
+) -> list[list[float]]:
+    """
+    텍스트 리스트를 배치 + 동시 요청으로 임베딩
+
+    Args:
+        client: OpenAI 클라이언트
+        texts: 임베딩할 텍스트 리스트
+        model: 임베딩 모델
+        dimensions: 임베딩 차원 (Matryoshka 축소, 최대 EMBEDDING_DIMENSIONS)
+        batch_tokens: 배치당 최대 추정 토큰 수
+        concurrency: 동시에 실행할 배치 요청 수
+        limiter: 공유 Rate Limiter (None이면 기본값으로 생성)
+        max_retries: 배치당 최대 시도 횟수
+        base_delay: 재시도 기본 대기 시간 (초)
+        show_progress: 진행률 출력 여부
+        cache: 로컬 임베딩 캐시 (히트한 텍스트는 API 호출 생략, 새 결과는 저장)
+
+    Returns:
+        list[list[float]]: 입력 순서와 동일한 임베딩 리스트
+
+    Raises:
+        RuntimeError: 재시도 후에도 실패한 배치가 있는 경우
+            (성공한 배치는 모두 완료된 뒤 발생)
+    """
+    if not texts:
+        return []
+
+    # 입력당 토큰 한도 초과 텍스트는 잘라서 요청 (한도 초과 입력은 배치 전체가 400)
+    truncated = [truncate_to_token_limit(text) for text in texts]
+    over_limit = sum(a is not b for a, b in zip(truncated, texts))
+    if over_limit and show_progress:
+        print(
+            f"   ✂️ 토큰 한도({MAX_TOKENS_PER_INPUT}) 초과 입력 {over_limit}개를 잘라서 임베딩"
+        )
+    texts = truncated
+
+    # 캐시 조회: 미스만 API로 요청
+    embeddings: list[list[float] | None] = [None] * len(texts)
+    todo = list(range(len(texts)))
+    if cache is not None:
+        embeddings = cache.get_many(model, dimensions, texts)
+        todo = [i for i, vector in enumerate(embeddings) if vector is None]
+        if show_progress and len(todo) < len(texts):
+            print(f"   💾 임베딩 캐시 히트: {len(texts) - len(todo)}/{len(texts)}")
+        if not todo:
+            return embeddings  # type: ignore[return-value]
+
+    todo_texts = [texts[i] for i in todo]
+    limiter = limiter or RateLimiter()
+    batches = make_batches(todo_texts, max_tokens=batch_tokens)
+    errors: list[Exception] = []
+    done = 0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {
+            executor.submit(
+                _embed_batch,
+                client,
+                [todo_texts[j] for j in batch],
+                model,
+                dimensions,
+                limiter,
+                max_retries,
+                base_delay,
+            ): batch
+            for batch in batches
+        }
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                errors.append(e)
+            else:
+                # 완료된 배치는 즉시 캐시에 저장 (일부 배치가 실패해도 재실행 시 재사용)
+                if cache is not None:
+                    cache.put_many(
+                        model,
+                        dimensions,
+                        [todo_texts[j] for j in batch],
+                        result,
+                    )
+                for j, embedding in zip(batch, result):
+                    embeddings[todo[j]] = embedding
+            done += len(batch)
+            if show_progress:
+                print(
+                    f"   🧠 임베딩 생성 중... ({done}/{len(todo)}, "
+                    f"배치 {len(batches)}개 × 동시 {concurrency})",
+                    end="\r",
+                )
+
+    if show_progress:
+        print()  # 줄바꿈
+
+    if errors:
+        raise RuntimeError(
+            f"{len(errors)}/{len(batches)}개 배치 임베딩 실패. Last error: {errors[-1]}"
+        )
+
+    return embeddings  # type: ignore[return-value]
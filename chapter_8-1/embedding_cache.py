@@ -0,0 +1,314 @@
+"""
+Chapter 8-1: RAG Pipeline - 로컬 임베딩 캐시
+
+한 번 계산한 임베딩을 디스크에 보관하여 재수집/반복 질의 시 네트워크 호출을 건너뜁니다.
+
+[저장 구조]
+- 키: (model, dimensions, sha256(text))
+- 벡터: 차원별 float32 arena 파일 (numpy.memmap, 행 단위 slot)
+- 인덱스: SQLite (키 → slot, 마지막 사용 시각)
+
+[정책]
+- 배치 조회/저장 (get_many / put_many)
+- 크기 제한 LRU: 전체 벡터 바이트가 max_bytes를 넘으면 가장 오래 사용하지 않은 항목부터 제거
+  (제거된 slot은 재사용되므로 arena 파일은 max_bytes 근처에서 더 커지지 않음)
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = Path(
+    os.getenv("EMBEDDING_CACHE_DIR", Path(__file__).parent / ".cache" / "embeddings")
+)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512MB (1536차원 기준 약 8.7만 개)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    model TEXT NOT NULL,
+    dimensions INTEGER NOT NULL,
+    text_hash TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, dimensions, text_hash)
+);
+CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_used);
+CREATE TABLE IF NOT EXISTS arenas (
+    dimensions INTEGER PRIMARY KEY,
+    next_slot INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS free_slots (
+    dimensions INTEGER NOT NULL,
+    slot INTEGER NOT NULL,
+    PRIMARY KEY (dimensions, slot)
+);
+"""
+
+
+def text_hash(text: str) -> str:
+    """캐시 키용 텍스트 해시 (sha256)"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class _Arena:
+    """
+    차원 1종의 float32 벡터 arena (memmap, 필요 시 2배씩 확장)
+
+    다른 EmbeddingCache 인스턴스 / 프로세스가 파일을 확장할 수 있으므로
+    읽기 / 쓰기 전에 파일 크기를 다시 확인하고 커졌으면 다시 매핑합니다.
+    """
+
+    GROW_MIN_ROWS = 1024
+
+    def __init__(self, path: Path, dimensions: int) -> None:
+        self.path = path
+        self.dimensions = dimensions
+        self.row_bytes = dimensions * 4
+        self.path.touch(exist_ok=True)
+        self._open()
+
+    def _open(self) -> None:
+        self.capacity = self.path.stat().st_size // self.row_bytes
+        self.map = (
+            np.memmap(
+                self.path,
+                dtype=np.float32,
+                mode="r+",
+                shape=(self.capacity, self.dimensions),
+            )
+            if self.capacity
+            else None
+        )
+
+    def refresh(self) -> None:
+        """파일이 (다른 인스턴스에 의해) 커졌으면 다시 매핑"""
+        if self.path.stat().st_size // self.row_bytes != self.capacity:
+            if self.map is not None:
+                self.map.flush()
+                self.map = None
+            self._open()
+
+    def ensure(self, rows: int) -> None:
+        """
+        최소 rows 행을 담을 수 있도록 파일 확장
+
+        호출자가 인덱스 쓰기 트랜잭션(BEGIN IMMEDIATE)을 잡은 상태에서 호출하므로
+        여러 프로세스가 동시에 확장하지 않습니다.
+        """
+        self.refresh()
+        if rows <= self.capacity:
+            return
+        new_capacity = max(rows, self.capacity * 2, self.GROW_MIN_ROWS)
+        if self.map is not None:
+            self.map.flush()
+            self.map = None
+        with open(self.path, "r+b") as f:
+            f.truncate(new_capacity * self.row_bytes)
+        self._open()
+
+    def read(self, slots: list[int]) -> np.ndarray:
+        if max(slots) >= self.capacity:
+            self.refresh()
+        return np.array(self.map[slots])
+
+    def write(self, slots: list[int], vectors: np.ndarray) -> None:
+        self.map[slots] = vectors
+        self.map.flush()
+
+
+class EmbeddingCache:
+    """
+    디스크 기반 임베딩 캐시 (ingest / query 공용)
+
+    Attributes:
+        cache_dir: 캐시 디렉토리 (index.sqlite + arena_<dim>.f32)
+        max_bytes: 벡터 저장 용량 상한 (LRU 제거 기준)
+    """
+
+    def __init__(
+        self, cache_dir: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._db = sqlite3.connect(
+            self.cache_dir / "index.sqlite", check_same_thread=False
+        )
+        self._db.executescript(SCHEMA)
+        self._arenas: dict[int, _Arena] = {}
+        self._lock = threading.Lock()
+
+    def _arena(self, dimensions: int) -> _Arena:
+        if dimensions not in self._arenas:
+            self._arenas[dimensions] = _Arena(
+                self.cache_dir / f"arena_{dimensions}.f32", dimensions
+            )
+        return self._arenas[dimensions]
+
+    # =========================================================================
+    # 조회 / 저장
+    # =========================================================================
+
+    def get_many(
+        self, model: str, dimensions: int, texts: list[str]
+    ) -> list[list[float] | None]:
+        """
+        배치 조회
+
+        Returns:
+            입력 순서와 동일한 리스트 (캐시 미스는 None)
+        """
+        if not texts:
+            return []
+        hashes = [text_hash(text) for text in texts]
+
+        with self._lock:
+            # slot 조회 ~ arena 읽기를 하나의 읽기 트랜잭션으로
+            # (SHARED 잠금을 쥔 동안 다른 프로세스가 제거 / slot 재사용을 커밋하지 못함)
+            if self._db.in_transaction:
+                self._db.commit()
+            self._db.execute("BEGIN")
+            try:
+                found: dict[str, int] = {}
+                for start in range(0, len(hashes), 500):
+                    part = hashes[start : start + 500]
+                    rows = self._db.execute(
+                        f"SELECT text_hash, slot FROM entries WHERE model = ? AND dimensions = ? "
+                        f"AND text_hash IN ({','.join('?' * len(part))})",
+                        [model, dimensions, *part],
+                    ).fetchall()
+                    found.update(rows)
+                keys = list(found)
+                if keys:
+                    vectors = self._arena(dimensions).read([found[h] for h in keys])
+            finally:
+                self._db.commit()
+            if not found:
+                return [None] * len(texts)
+
+            # LRU 갱신 (벡터는 이미 복사했으므로 별도 트랜잭션)
+            now = time.time()
+            self._db.executemany(
+                "UPDATE entries SET last_used = ? WHERE model = ? AND dimensions = ? AND text_hash = ?",
+                [(now, model, dimensions, h) for h in found],
+            )
+            self._db.commit()
+
+        by_hash = dict(zip(keys, vectors))
+        return [by_hash[h].tolist() if h in by_hash else None for h in hashes]
+
+    def put_many(
+        self, model: str, dimensions: int, texts: list[str], vectors: list[list[float]]
+    ) -> None:
+        """배치 저장 (이미 있는 키는 덮어씀)"""
+        if not texts:
+            return
+        # 중복 텍스트는 마지막 벡터만 저장
+        items = dict(zip((text_hash(text) for text in texts), vectors))
+        array = np.asarray(list(items.values()), dtype=np.float32)
+
+        with self._lock:
+            arena = self._arena(dimensions)
+            # slot 할당 ~ 인덱스 커밋을 하나의 쓰기 트랜잭션으로 (다른 프로세스와 slot 중복 방지)
+            if self._db.in_transaction:
+                self._db.commit()
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                slots = [self._allocate_slot(model, dimensions, h) for h in items]
+                arena.ensure(max(slots) + 1)
+                # 벡터를 먼저 쓰고 인덱스를 나중에 커밋 (중단 시 인덱스가 빈 slot을 가리키지 않음)
+                arena.write(slots, array)
+
+                now = time.time()
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO entries (model, dimensions, text_hash, slot, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (model, dimensions, h, slot, now)
+                        for h, slot in zip(items, slots)
+                    ],
+                )
+                self._evict()
+            except BaseException:
+                self._db.rollback()
+                raise
+            self._db.commit()
+
+    def _allocate_slot(self, model: str, dimensions: int, h: str) -> int:
+        """
+        기존 slot 재사용 → free slot → arena 끝 순서로 할당
+
+        put_many()의 BEGIN IMMEDIATE 트랜잭션 안에서만 호출 (조회 후 갱신이 원자적)
+        """
+        row = self._db.execute(
+            "SELECT slot FROM entries WHERE model = ? AND dimensions = ? AND text_hash = ?",
+            (model, dimensions, h),
+        ).fetchone()
+        if row:
+            return row[0]
+
+        row = self._db.execute(
+            "SELECT slot FROM free_slots WHERE dimensions = ? LIMIT 1", (dimensions,)
+        ).fetchone()
+        if row:
+            self._db.execute(
+                "DELETE FROM free_slots WHERE dimensions = ? AND slot = ?",
+                (dimensions, row[0]),
+            )
+            return row[0]
+
+        row = self._db.execute(
+            "SELECT next_slot FROM arenas WHERE dimensions = ?", (dimensions,)
+        ).fetchone()
+        slot = row[0] if row else 0
+        self._db.execute(
+            "INSERT OR REPLACE INTO arenas (dimensions, next_slot) VALUES (?, ?)",
+            (dimensions, slot + 1),
+        )
+        return slot
+
+    def _evict(self) -> None:
+        """용량 초과 시 LRU 순으로 제거하고 slot을 free list로 반환"""
+        total = self.size_bytes()
+        if total <= self.max_bytes:
+            return
+
+        evicted = []
+        for model, dimensions, h, slot in self._db.execute(
+            "SELECT model, dimensions, text_hash, slot FROM entries ORDER BY last_used"
+        ):
+            if total <= self.max_bytes:
+                break
+            evicted.append((model, dimensions, h, slot))
+            total -= dimensions * 4
+
+        self._db.executemany(
+            "DELETE FROM entries WHERE model = ? AND dimensions = ? AND text_hash = ?",
+            [(m, d, h) for m, d, h, _ in evicted],
+        )
+        self._db.executemany(
+            "INSERT OR IGNORE INTO free_slots (dimensions, slot) VALUES (?, ?)",
+            [(d, slot) for _, d, _, slot in evicted],
+        )
+
+    # =========================================================================
+    # Utility
+    # =========================================================================
+
+    def size_bytes(self) -> int:
+        """캐시된 벡터의 총 바이트 수"""
+        row = self._db.execute(
+            "SELECT COALESCE(SUM(dimensions * 4), 0) FROM entries"
+        ).fetchone()
+        return row[0]
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self) -> None:
+        self._db.close()
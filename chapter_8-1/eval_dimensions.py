@@ -0,0 +1,168 @@
+"""
+Chapter 8-1: RAG Pipeline - 임베딩 차원(Matryoshka) 평가
+
+라벨링된 질문 세트로 차원별 검색 품질과 비용을 비교하여,
+답변 품질을 유지하는 가장 작은 차원을 선택합니다.
+
+[평가 방식]
+- 문서를 split_document()로 분할 → 청크/질문을 전체 차원(1536)으로 1회만 임베딩 (캐시 사용)
+- 차원별로 truncate_embeddings()로 축소 (API dimensions 파라미터와 동일한 결과)
+- exact 로컬 인덱스로 검색하여 recall@k, MRR, 인덱스 크기, 검색 지연 측정
+
+[질문 세트 형식] (JSONL)
+{"question": "...", "gold": ["정답 청크에 포함된 문자열", ...]}
+→ gold 문자열을 포함한 청크가 상위 k개 안에 있으면 정답
+
+실행: python chapter_8-1/eval_dimensions.py --k 5
+"""
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+from openai import OpenAI
+
+from embedder import (
+    DIMENSION_CANDIDATES,
+    EMBEDDING_DIMENSIONS,
+    EMBEDDING_MODEL,
+    embed_texts,
+    truncate_embeddings,
+)
+from embedding_cache import EmbeddingCache
+from ingest import SAMPLE_MD_PATH, split_document
+from vector_index import LocalVectorIndex
+
+load_dotenv()
+
+DEFAULT_QUESTIONS_PATH = Path(__file__).parent / "eval_questions.jsonl"
+
+
+def load_questions(path: Path) -> list[dict]:
+    """라벨링된 질문 세트 로드 (JSONL)"""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def relevant_rows(chunks: list[dict], gold: list[str]) -> set[int]:
+    """gold 문자열을 포함한 청크 행 번호"""
+    return {
+        i
+        for i, chunk in enumerate(chunks)
+        if any(text in chunk["content"] for text in gold)
+    }
+
+
+def evaluate(
+    index: LocalVectorIndex,
+    query_vectors: np.ndarray,
+    relevant: list[set[int]],
+    k: int,
+) -> dict:
+    """recall@k, MRR@k, 검색 지연(p50/p95 ms) 측정"""
+    hits, reciprocal_ranks, latencies = [], [], []
+    for query, expected in zip(query_vectors, relevant):
+        t0 = time.perf_counter()
+        results = index.search(query, limit=k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+        rows = [row for row, _ in results]
+        rank = next((r for r, row in enumerate(rows, 1) if row in expected), None)
+        hits.append(rank is not None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+    return {
+        "recall": float(np.mean(hits)),
+        "mrr": float(np.mean(reciprocal_ranks)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="임베딩 차원별 검색 품질 평가")
+    parser.add_argument("--source", default=str(SAMPLE_MD_PATH), help="Markdown 문서")
+    parser.add_argument("--questions", default=str(DEFAULT_QUESTIONS_PATH))
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument(
+        "--dimensions", type=int, nargs="+", default=list(DIMENSION_CANDIDATES)
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.0,
+        help="최고 recall 대비 허용 손실 (추천 차원 선택 기준)",
+    )
+    args = parser.parse_args()
+
+    openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    cache = EmbeddingCache()
+
+    # STEP 1: 코퍼스 / 질문 준비
+    chunks = split_document(Path(args.source).read_text(encoding="utf-8"))
+    questions = load_questions(Path(args.questions))
+    relevant = [relevant_rows(chunks, q["gold"]) for q in questions]
+    unlabeled = sum(1 for rows in relevant if not rows)
+    print(f"📚 청크 {len(chunks)}개 / 질문 {len(questions)}개")
+    if unlabeled:
+        print(
+            f"   ⚠️ 정답 청크를 찾지 못한 질문 {unlabeled}개 (recall 계산에서 오답 처리)"
+        )
+
+    # STEP 2: 전체 차원으로 1회 임베딩
+    chunk_vectors = embed_texts(
+        openai_client,
+        [chunk["content"] for chunk in chunks],
+        model=EMBEDDING_MODEL,
+        dimensions=EMBEDDING_DIMENSIONS,
+        cache=cache,
+    )
+    question_vectors = embed_texts(
+        openai_client,
+        [q["question"] for q in questions],
+        model=EMBEDDING_MODEL,
+        dimensions=EMBEDDING_DIMENSIONS,
+        show_progress=False,
+        cache=cache,
+    )
+
+    # STEP 3: 차원별 평가
+    documents = [{"_id": i} for i in range(len(chunks))]
+    results = []
+    for dimensions in sorted(args.dimensions):
+        index = LocalVectorIndex.build(
+            documents, truncate_embeddings(chunk_vectors, dimensions), kind="exact"
+        )
+        queries = truncate_embeddings(question_vectors, dimensions)
+        result = evaluate(index, queries, relevant, args.k)
+        result["dimensions"] = dimensions
+        result["bytes_per_chunk"] = dimensions * 4  # float32 기준
+        results.append(result)
+
+    print(
+        f"\n{'차원':>6} {'recall@' + str(args.k):>10} {'MRR':>7} "
+        f"{'바이트/청크':>12} {'10만 청크':>10} {'p50(ms)':>9} {'p95(ms)':>9}"
+    )
+    print("-" * 72)
+    for r in results:
+        print(
+            f"{r['dimensions']:>6} {r['recall']:>10.3f} {r['mrr']:>7.3f} "
+            f"{r['bytes_per_chunk']:>12,} {r['bytes_per_chunk'] * 100_000 / 2**20:>8.0f}MB "
+            f"{r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f}"
+        )
+
+    # STEP 4: 추천 (최고 recall - tolerance 이상인 가장 작은 차원)
+    best = max(r["recall"] for r in results)
+    pick = next(r for r in results if r["recall"] >= best - args.tolerance)
+    print(
+        f"\n✅ 추천 차원: {pick['dimensions']} "
+        f"(recall {pick['recall']:.3f} / 최고 {best:.3f}) → EMBEDDING_DIMENSIONS={pick['dimensions']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
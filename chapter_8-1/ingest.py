@@ -3,115 +3,338 @@ Chapter 8-1: RAG Pipeline - 수집 엔드포인트 (Ingest)
 
 Markdown 문서를 로드하고, 청크로 분할한 후, 임베딩을 생성하여 MongoDB에 저장합니다.
 
-[Langchain 사용 범위]
-- MarkdownHeaderTextSplitter: 헤더 기준 섹션 분할
-- RecursiveCharacterTextSplitter: 세부 청크 분할
+[증분 수집 (Incremental Ingest)]
+- 청크 키: (source, header path, content hash) → 문서 _id
+- 저장된 키와 비교하여 신규/변경 청크만 임베딩
+- bulk_write: 신규 청크 upsert 후 고아(orphan) 청크 삭제
+  → 같은 문서를 다시 수집해도 결과가 동일하고(idempotent), 수집 중에도 컬렉션이 비지 않음
+- metadata.chunk_index: 섹션 안에서의 순서 (위치만 바뀐 청크는 재임베딩 없이 갱신)
+
+[문서 분할] (md_splitter.py, langchain splitter와 동일한 결과)
+- split_sections(): 헤더 기준 섹션 분할 (MarkdownHeaderTextSplitter 대체)
+- split_recursive(): 세부 청크 분할 (RecursiveCharacterTextSplitter 대체)
 
 [OpenAI SDK 직접 사용]
-- 임베딩 생성: client.embeddings.create()
+- 임베딩 생성: client.embeddings.create() - 토큰 예산 기반 배치 + 동시 요청 (embedder.py)
+
+[로컬 인덱스]
+- 벡터 인덱스 (vector_index.py) + BM25 어휘 인덱스 (lexical_index.py, 하이브리드 검색용)
+
+[디렉토리 / 대량 수집]
+- ingest_corpus.py: 여러 Markdown 파일을 스트리밍 파이프라인으로 수집 (재개 가능)
 
 실행: python chapter_8-1/ingest.py
 """
 
+import hashlib
 import os
 from pathlib import Path
 
 from dotenv import load_dotenv
-from langchain_text_splitters import (
-    MarkdownHeaderTextSplitter,
-    RecursiveCharacterTextSplitter,
-)
 from openai import OpenAI
-from pymongo import MongoClient
+from pymongo import DeleteMany, MongoClient, ReplaceOne, UpdateOne
 from pymongo.collection import Collection
 
+from answer_cache import bump_corpus_version
+from embedder import (
+    EMBEDDING_DIMENSIONS,
+    EMBEDDING_MODEL,
+    RateLimiter,
+    collection_embedding_config,
+    embed_texts,
+)
+from embedding_cache import EmbeddingCache
+from lexical_index import LexicalIndex
+from md_splitter import split_recursive, split_sections
+from vector_codec import RESCORE_FIELDS, decode_vector, encode_vector
+from vector_index import DEFAULT_INDEX_DIR, LocalVectorIndex, staged_index_dir
+
 load_dotenv()
 
 # 샘플 데이터 경로
 SAMPLE_MD_PATH = Path(__file__).parent.parent / "assets" / "sample.md"
 
+# 컬렉션 임베딩 차원 (256 / 512 / 1024 / 1536)
+COLLECTION_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", EMBEDDING_DIMENSIONS))
+
+# content_vector 저장 인코딩 ("list" | "float32" | "int8" | "binary", vector_codec.py 참고)
+VECTOR_ENCODING = os.getenv("VECTOR_ENCODING", "float32")
+
+# 로컬 벡터 인덱스 경로 / 종류 ("auto" | "exact" | "ivfpq")
+LOCAL_INDEX_DIR = Path(os.getenv("LOCAL_INDEX_DIR", DEFAULT_INDEX_DIR))
+LOCAL_INDEX_KIND = os.getenv("LOCAL_INDEX_KIND", "auto")
+
+# 헤더 메타데이터 키 (split_document의 headers_to_split_on 순서)
+HEADER_KEYS = ("h1", "h2", "h3")
 
-def split_document(text: str) -> list[dict]:
+# 청크 분할 기본 설정 (bench_retrieval.py로 비교 가능)
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+HEADER_LEVELS = len(HEADER_KEYS)
+
+
+def split_document(
+    text: str,
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP,
+    header_levels: int = HEADER_LEVELS,
+) -> list[dict]:
     """
     Markdown 문서를 청크로 분할합니다.
 
-    1단계: MarkdownHeaderTextSplitter로 헤더 기준 섹션 분할
-    2단계: RecursiveCharacterTextSplitter로 세부 청크 분할
+    1단계: split_sections()로 헤더 기준 섹션 분할
+    2단계: split_recursive()로 세부 청크 분할
 
     Args:
         text: Markdown 문서 텍스트
+        chunk_size: 청크 최대 길이 (문자)
+        chunk_overlap: 인접 청크 사이 겹침 길이 (문자)
+        header_levels: 섹션을 나눌 헤더 깊이 (1 = "#"만, 3 = "#" ~ "###")
 
     Returns:
         list[dict]: 청크 리스트 [{"content": ..., "metadata": ...}, ...]
     """
     # STEP 1: 헤더 기준 분할
-    header_splitter = MarkdownHeaderTextSplitter(
-        headers_to_split_on=[
-            ("#", "h1"),
-            ("##", "h2"),
-            ("###", "h3"),
-        ]
-    )
-    sections = header_splitter.split_text(text)
+    headers = [
+        ("#" * level, key)
+        for level, key in enumerate(HEADER_KEYS[:header_levels], start=1)
+    ]
+    sections = split_sections(text, headers)
 
     # STEP 2: 세부 청크 분할
-    char_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500,
-        chunk_overlap=50,
-    )
-
     chunks = []
-    for section in sections:
+    for content, metadata in sections:
         # 섹션별로 세부 분할
-        sub_chunks = char_splitter.split_text(section.page_content)
-        for sub_chunk in sub_chunks:
+        for sub_chunk in split_recursive(content, chunk_size, chunk_overlap):
             chunks.append(
                 {
                     "content": sub_chunk,
-                    "metadata": section.metadata,
+                    "metadata": metadata,
                 }
             )
 
     return chunks
 
 
-def store_chunks(
+def header_path(metadata: dict) -> str:
+    """청크의 헤더 경로 (예: "나루토 vs. 사스케 > 서론")"""
+    return " > ".join(metadata[key] for key in HEADER_KEYS if metadata.get(key))
+
+
+def content_hash(content: str) -> str:
+    """청크 본문 해시 (sha256)"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def chunk_id(source_name: str, metadata: dict, content: str) -> str:
+    """
+    청크 키 (source, header path, content hash) → 결정적 문서 _id
+
+    같은 섹션의 같은 내용은 항상 같은 _id를 가지므로
+    재수집 시 변경되지 않은 청크를 식별할 수 있습니다.
+    """
+    key = "\x1f".join([source_name, header_path(metadata), content_hash(content)])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def build_operations(
     collection: Collection,
     client: OpenAI,
-    chunks: list[dict],
-    source_name: str = "sample.md",
-) -> int:
-    documents = []
-    total = len(chunks)
+    sources: dict[str, list[dict]],
+    cache: EmbeddingCache | None = None,
+    encoding: str = VECTOR_ENCODING,
+    dimensions: int = COLLECTION_DIMENSIONS,
+    limiter: RateLimiter | None = None,
+    show_progress: bool = True,
+) -> tuple[list, dict[str, int]]:
+    """
+    여러 source의 청크를 저장된 상태와 비교하여 bulk_write 연산을 만듭니다.
+
+    1. 청크별 _id 계산 (source, header path, content hash)
+    2. 같은 source들의 저장된 _id 조회 → 신규 / 유지 / 고아 분류
+    3. 신규 청크만 임베딩 생성
+    4. 연산 순서: 신규 upsert → 위치 갱신 → 고아 삭제 (ordered bulk_write로 실행)
+
+    Args:
+        collection: 저장할 MongoDB 컬렉션
+        client: OpenAI 클라이언트
+        sources: {source 이름: split_document()의 결과}
+        cache: 로컬 임베딩 캐시 (이전에 본 텍스트는 API 호출 생략)
+        encoding: content_vector 저장 인코딩
+        dimensions: 임베딩 차원 (컬렉션에 기록된 설정과 같아야 함)
+        limiter: 공유 Rate Limiter (여러 번 호출할 때 예산을 함께 사용)
+        show_progress: 임베딩 진행률 출력 여부
 
-    for i, chunk in enumerate(chunks, 1):
-        print(f"   🧠 임베딩 생성 중... ({i}/{total})", end="\r")
+    Returns:
+        tuple: (bulk_write 연산 리스트, {"added", "unchanged", "deleted"} 청크 수)
 
-        # 임베딩 생성
-        response = client.embeddings.create(
-            model="text-embedding-3-small",
-            input=chunk["content"],
+    Raises:
+        ValueError: 컬렉션의 임베딩 설정(model, dimensions)과 다른 경우
+    """
+    # STEP 0: 컬렉션 임베딩 설정 확인 (한 컬렉션에 여러 차원이 섞이면 검색 불가)
+    embedding_config = {"model": EMBEDDING_MODEL, "dimensions": dimensions}
+    stored_config = collection_embedding_config(collection)
+    if stored_config and stored_config != embedding_config:
+        raise ValueError(
+            f"컬렉션 임베딩 설정 {stored_config}와 요청 설정 {embedding_config}가 다릅니다. "
+            "새 컬렉션에 수집하거나 기존 청크를 삭제한 뒤 다시 수집하세요."
         )
-        embedding = response.data[0].embedding
 
-        # 문서 구성
+    # STEP 1: 목표 상태 (중복 청크는 하나로 합쳐짐)
+    # chunk_index: 섹션(source + header path) 안에서의 순서 (context_packer의 인접 판단용)
+    desired: dict[str, tuple[str, dict, int]] = {}
+    for source_name, chunks in sources.items():
+        positions: dict[str, int] = {}
+        for chunk in chunks:
+            path = header_path(chunk["metadata"])
+            index = positions[path] = positions.get(path, -1) + 1
+            _id = chunk_id(source_name, chunk["metadata"], chunk["content"])
+            desired[_id] = (source_name, chunk, index)
+
+    # STEP 2: 저장된 상태와 비교
+    stored_index = {
+        doc["_id"]: doc.get("metadata", {}).get("chunk_index")
+        for doc in collection.find(
+            {"metadata.source": {"$in": list(sources)}},
+            {"_id": 1, "metadata.chunk_index": 1},
+        )
+    }
+    new_ids = [_id for _id in desired if _id not in stored_index]
+    orphan_ids = [_id for _id in stored_index if _id not in desired]
+    # 내용은 그대로지만 섹션 안의 위치가 바뀐 청크 (앞 청크 추가/삭제)
+    moved_ids = [
+        _id
+        for _id in desired
+        if _id in stored_index and stored_index[_id] != desired[_id][2]
+    ]
+
+    # STEP 3: 신규/변경 청크만 임베딩 생성 (토큰 예산 기반 배치 + 동시 요청)
+    embeddings = embed_texts(
+        client,
+        [desired[_id][1]["content"] for _id in new_ids],
+        model=EMBEDDING_MODEL,
+        dimensions=dimensions,
+        limiter=limiter,
+        show_progress=show_progress,
+        cache=cache,
+    )
+
+    # STEP 4: upsert 먼저, 삭제는 나중에 (질의가 항상 완전한 결과를 보도록)
+    operations: list = []
+    for _id, embedding in zip(new_ids, embeddings):
+        source_name, chunk, index = desired[_id]
         doc = {
+            "_id": _id,
             "content": chunk["content"],
+            "content_hash": content_hash(chunk["content"]),
             "metadata": {
                 **chunk["metadata"],
+                "header_path": header_path(chunk["metadata"]),
                 "source": source_name,
+                "chunk_index": index,
+                "embedding": embedding_config,
             },
-            "content_vector": embedding,
+            **encode_vector(embedding, encoding),
         }
-        documents.append(doc)
+        operations.append(ReplaceOne({"_id": _id}, doc, upsert=True))
+    for _id in moved_ids:
+        operations.append(
+            UpdateOne({"_id": _id}, {"$set": {"metadata.chunk_index": desired[_id][2]}})
+        )
+    if orphan_ids:
+        operations.append(DeleteMany({"_id": {"$in": orphan_ids}}))
 
-    print()  # 줄바꿈
+    return operations, {
+        "added": len(new_ids),
+        "unchanged": len(desired) - len(new_ids),
+        "deleted": len(orphan_ids),
+    }
 
-    # 기존 데이터 삭제 후 새로 삽입 (데모용)
-    collection.delete_many({})
-    collection.insert_many(documents)
 
-    return len(documents)
+def store_chunks(
+    collection: Collection,
+    client: OpenAI,
+    chunks: list[dict],
+    source_name: str = "sample.md",
+    cache: EmbeddingCache | None = None,
+    encoding: str = VECTOR_ENCODING,
+    dimensions: int = COLLECTION_DIMENSIONS,
+) -> dict[str, int]:
+    """
+    청크를 저장된 상태와 비교하여 변경분만 반영합니다. (증분 수집)
+
+    build_operations()로 만든 연산을 ordered bulk_write로 실행합니다.
+    (upsert 후 고아 삭제 → 컬렉션이 비는 순간 없음)
+
+    Args:
+        collection: 저장할 MongoDB 컬렉션
+        client: OpenAI 클라이언트
+        chunks: split_document()의 결과
+        source_name: 원본 문서 이름 (metadata.source)
+        cache: 로컬 임베딩 캐시 (이전에 본 텍스트는 API 호출 생략)
+        encoding: content_vector 저장 인코딩
+        dimensions: 임베딩 차원 (컬렉션에 기록된 설정과 같아야 함)
+
+    Returns:
+        dict: {"added": 신규, "unchanged": 유지, "deleted": 삭제} 청크 수
+
+    Raises:
+        ValueError: 컬렉션의 임베딩 설정(model, dimensions)과 다른 경우
+    """
+    operations, stats = build_operations(
+        collection,
+        client,
+        {source_name: chunks},
+        cache=cache,
+        encoding=encoding,
+        dimensions=dimensions,
+    )
+    if operations:
+        collection.bulk_write(operations, ordered=True)
+        bump_corpus_version(collection)
+    return stats
+
+
+def build_local_index(
+    collection: Collection,
+    index_dir: Path = LOCAL_INDEX_DIR,
+    kind: str = LOCAL_INDEX_KIND,
+) -> LocalVectorIndex:
+    """
+    컬렉션 전체 청크로 로컬 벡터 인덱스 + BM25 어휘 인덱스를 생성하여 저장합니다.
+
+    두 인덱스는 같은 버전 디렉토리에 저장되며 행 번호(documents.json)를 공유합니다.
+    둘 다 기록한 뒤 한 번에 교체하므로 읽는 쪽은 항상 짝이 맞는 인덱스를 봅니다.
+
+    Args:
+        collection: 청크가 저장된 MongoDB 컬렉션
+        index_dir: 인덱스 저장 디렉토리
+        kind: 인덱스 종류 ("auto"는 문서 수에 따라 exact / ivfpq 선택)
+
+    Returns:
+        LocalVectorIndex: 생성된 인덱스
+    """
+    documents, vectors = [], []
+    projection = {
+        "content": 1,
+        "metadata": 1,
+        "content_vector": 1,
+        **{field: 1 for field in RESCORE_FIELDS},
+    }
+    for doc in collection.find({}, projection):
+        vectors.append(decode_vector(doc))
+        doc.pop("content_vector")
+        for field in RESCORE_FIELDS:
+            doc.pop(field, None)
+        documents.append(doc)
+
+    index = LocalVectorIndex.build(
+        documents, vectors, kind=kind, dimensions=COLLECTION_DIMENSIONS
+    )
+    with staged_index_dir(index_dir) as staging:
+        index.write_files(staging)
+        LexicalIndex.build(documents).save(staging)
+    return index
 
 
 # ============================================================
@@ -124,6 +347,7 @@ def main():
     openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
     mongo_client = MongoClient(os.getenv("MONGODB_URI"))
     collection = mongo_client["hackers"]["rag_demo"]
+    cache = EmbeddingCache()
 
     # STEP 1: 문서 로드
     raw_text = SAMPLE_MD_PATH.read_text(encoding="utf-8")
@@ -133,14 +357,22 @@ def main():
     chunks = split_document(raw_text)
     print(f"   🔪 청크 분할 완료: {len(chunks)}개")
 
-    # STEP 3: 임베딩 생성 + MongoDB 저장
-    stored_count = store_chunks(
+    # STEP 3: 변경분 임베딩 생성 + MongoDB 반영
+    stats = store_chunks(
         collection,
         openai_client,
         chunks,
         source_name=SAMPLE_MD_PATH.name,
+        cache=cache,
     )
-    print(f"\n✅ 수집 완료! ({stored_count}개 청크)")
+    print(
+        f"\n✅ 수집 완료! (신규 {stats['added']}개 / 유지 {stats['unchanged']}개 / "
+        f"삭제 {stats['deleted']}개)"
+    )
+
+    # STEP 4: 로컬 벡터 인덱스 생성
+    index = build_local_index(collection)
+    print(f"   📦 로컬 인덱스 생성: {index.kind} ({len(index)}개) → {LOCAL_INDEX_DIR}")
 
 
 if __name__ == "__main__":
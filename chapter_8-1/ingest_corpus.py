@@ -0,0 +1,455 @@
+"""
+Chapter 8-1: RAG Pipeline - 코퍼스 수집 (디렉토리 / glob 스트리밍)
+
+디렉토리 아래의 Markdown 파일들을 스트리밍 파이프라인으로 수집합니다.
+
+    파일 탐색 → 읽기 + 분할 (프로세스 풀) → 임베딩 (배치 + 동시 요청) → upsert (bulk_write)
+
+[메모리 / 백프레셔]
+- 파일 탐색: 목록을 미리 만들지 않고 generator로 순회
+- 분할: 동시에 처리 중인 파일 수를 --max-pending개로 제한 (결과를 소비해야 다음 파일 제출)
+- 임베딩: 파일 단위로 청크를 --batch-chunks개 이상 모아 한 번에 임베딩
+- upsert: 별도 스레드에서 실행, 대기 배치가 UPSERT_QUEUE_SIZE개를 넘으면 임베딩 단계가 대기
+→ 전체 파일 수와 관계없이 메모리 사용량은 배치 크기에 비례
+
+[재개 (checkpoint)]
+- 반영이 끝난 파일의 (source, 크기, 수정 시각)을 SQLite에 기록 (bulk_write 성공 후)
+- 다시 실행하면 변경되지 않은 파일은 읽지 않고 건너뜀
+- 청크 _id가 결정적이므로 중단 직전 배치가 다시 반영되어도 결과는 동일
+
+[삭제된 파일 정리]
+- 탐색한 source를 checkpoint의 임시 테이블에 기록 (파일 목록을 메모리에 올리지 않음)
+- 탐색이 끝까지 완료되면 checkpoint에는 있지만 이번에 보이지 않은 source의 청크를 삭제하고
+  checkpoint 기록도 제거 → 같은 트리를 다시 수집하면 컬렉션이 트리 내용과 같아짐
+- root가 단일 파일이거나 파일을 하나도 찾지 못했으면 정리하지 않음 (--keep-deleted로 끄기)
+
+실행: python chapter_8-1/ingest_corpus.py docs/ --glob "**/*.md"
+"""
+
+import argparse
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from dotenv import load_dotenv
+from openai import OpenAI
+from pymongo import DeleteMany, MongoClient
+from pymongo.collection import Collection
+
+from answer_cache import bump_corpus_version
+from embedder import RateLimiter
+from embedding_cache import EmbeddingCache
+from ingest import (
+    COLLECTION_DIMENSIONS,
+    LOCAL_INDEX_DIR,
+    VECTOR_ENCODING,
+    build_local_index,
+    build_operations,
+    split_document,
+)
+
+load_dotenv()
+
+CHECKPOINT_DIR = Path(__file__).parent / ".cache" / "ingest_checkpoints"
+
+DEFAULT_BATCH_CHUNKS = 512
+# 삭제된 파일 정리 시 DeleteMany 1회당 source 수
+PRUNE_BATCH_SOURCES = 1000
+DEFAULT_WORKERS = os.cpu_count() or 4
+UPSERT_QUEUE_SIZE = 2
+
+# upsert 스레드 종료 신호
+_STOP = object()
+
+
+class Checkpoint:
+    """
+    수집 완료 파일 기록 (SQLite)
+
+    source별 시그니처(크기:수정 시각)를 저장하고, 같은 시그니처의 파일은 건너뜁니다.
+    파일 수만큼 메모리에 올리지 않도록 조회는 파일마다 SQLite에서 수행합니다.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files "
+            "(source TEXT PRIMARY KEY, signature TEXT NOT NULL)"
+        )
+        # 이번 실행에서 탐색한 source (연결이 닫히면 사라짐)
+        self._db.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS seen (source TEXT PRIMARY KEY)"
+        )
+        self._lock = threading.Lock()
+
+    def is_done(self, source: str, signature: str) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT signature FROM files WHERE source = ?", (source,)
+            ).fetchone()
+        return row is not None and row[0] == signature
+
+    def mark_done(self, entries: list[tuple[str, str]]) -> None:
+        """(source, signature) 목록을 완료로 기록"""
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO files (source, signature) VALUES (?, ?)",
+                entries,
+            )
+
+    def mark_seen(self, source: str) -> None:
+        """이번 실행의 탐색에서 찾은 source로 기록 (삭제된 파일 판별용)"""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR IGNORE INTO seen (source) VALUES (?)", (source,)
+            )
+
+    def missing_sources(self) -> list[str]:
+        """완료 기록은 있지만 이번 탐색에서 찾지 못한 source (삭제된 파일)"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT source FROM files WHERE source NOT IN (SELECT source FROM seen)"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def forget(self, sources: list[str]) -> None:
+        """source들의 완료 기록 제거"""
+        with self._lock, self._db:
+            self._db.executemany(
+                "DELETE FROM files WHERE source = ?", [(source,) for source in sources]
+            )
+
+    def reset(self) -> None:
+        """
+        모든 파일을 다시 수집하도록 시그니처만 비움
+
+        source 목록은 유지합니다. (다시 수집하는 동안 삭제된 파일도 정리할 수 있도록)
+        """
+        with self._lock, self._db:
+            self._db.execute("UPDATE files SET signature = ''")
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class _NullCheckpoint:
+    """checkpoint 없이 실행할 때 사용하는 빈 구현"""
+
+    def mark_done(self, entries: list[tuple[str, str]]) -> None:
+        pass
+
+
+def file_signature(path: Path) -> str:
+    """변경 감지용 파일 시그니처 (크기:수정 시각 ns)"""
+    stat = path.stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def iter_files(root: Path, pattern: str) -> Iterator[tuple[str, Path]]:
+    """
+    수집 대상 파일 순회 (generator)
+
+    Args:
+        root: 디렉토리 또는 단일 파일
+        pattern: root가 디렉토리일 때 사용할 glob 패턴 (예: "**/*.md")
+
+    Yields:
+        tuple: (source 이름 = root 기준 상대 경로, 파일 경로)
+    """
+    if root.is_file():
+        yield root.name, root
+        return
+    for path in root.glob(pattern):
+        if path.is_file():
+            yield path.relative_to(root).as_posix(), path
+
+
+def _split_file(path: str) -> list[dict]:
+    """프로세스 풀 작업: 파일 읽기 + 분할 (본문은 워커 안에서만 읽음)"""
+    return split_document(Path(path).read_text(encoding="utf-8"))
+
+
+def split_files(
+    files: Iterable[tuple[str, Path, str]], workers: int, max_pending: int
+) -> Iterator[tuple[str, str, list[dict]]]:
+    """
+    파일을 프로세스 풀에서 분할 (입력 순서 유지, 동시 처리 파일 수 제한)
+
+    Yields:
+        tuple: (source, signature, chunks)
+    """
+
+    def result(source: str, signature: str, future) -> tuple | None:
+        try:
+            return source, signature, future.result()
+        except (OSError, UnicodeDecodeError) as e:
+            # checkpoint에 기록되지 않으므로 다음 실행에서 다시 시도
+            print(f"\n   ⚠️ {source} 건너뜀: {e}")
+            return None
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque()
+        for source, path, signature in files:
+            pending.append((source, signature, pool.submit(_split_file, str(path))))
+            if len(pending) >= max_pending:
+                item = result(*pending.popleft())
+                if item:
+                    yield item
+        while pending:
+            item = result(*pending.popleft())
+            if item:
+                yield item
+
+
+def batch_files(
+    split_stream: Iterable[tuple[str, str, list[dict]]], batch_chunks: int
+) -> Iterator[list[tuple[str, str, list[dict]]]]:
+    """분할 결과를 파일 단위로 묶어 청크가 batch_chunks개 이상이 되면 배출"""
+    batch, size = [], 0
+    for item in split_stream:
+        batch.append(item)
+        size += len(item[2])
+        if size >= batch_chunks:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def upsert_loop(
+    collection: Collection,
+    checkpoint: Checkpoint,
+    inbox: queue.Queue,
+    errors: list[Exception],
+) -> None:
+    """upsert 스레드: bulk_write 성공 후 해당 파일들을 checkpoint에 기록"""
+    while True:
+        item = inbox.get()
+        if item is _STOP:
+            return
+        if errors:
+            continue  # 실패 이후 배치는 반영하지 않음 (다음 실행에서 재시도)
+        operations, entries = item
+        try:
+            if operations:
+                collection.bulk_write(operations, ordered=True)
+                bump_corpus_version(collection)
+            checkpoint.mark_done(entries)
+        except Exception as e:
+            errors.append(e)
+
+
+def prune_deleted(collection: Collection, checkpoint: Checkpoint) -> dict[str, int]:
+    """
+    이번 탐색에서 보이지 않은 source의 청크 삭제 + checkpoint 기록 제거
+
+    Returns:
+        dict: {"removed_files", "deleted"} (정리한 source 수, 삭제한 청크 수)
+    """
+    missing = checkpoint.missing_sources()
+    deleted = 0
+    for start in range(0, len(missing), PRUNE_BATCH_SOURCES):
+        part = missing[start : start + PRUNE_BATCH_SOURCES]
+        result = collection.bulk_write(
+            [DeleteMany({"metadata.source": {"$in": part}})], ordered=True
+        )
+        deleted += result.deleted_count
+        # 청크 삭제 후 기록 제거 (중단되면 다음 실행에서 다시 정리)
+        checkpoint.forget(part)
+    if deleted:
+        bump_corpus_version(collection)
+    return {"removed_files": len(missing), "deleted": deleted}
+
+
+def ingest_corpus(
+    collection: Collection,
+    client: OpenAI,
+    root: Path,
+    pattern: str = "**/*.md",
+    checkpoint: Checkpoint | None = None,
+    cache: EmbeddingCache | None = None,
+    encoding: str = VECTOR_ENCODING,
+    dimensions: int = COLLECTION_DIMENSIONS,
+    batch_chunks: int = DEFAULT_BATCH_CHUNKS,
+    workers: int = DEFAULT_WORKERS,
+    max_pending: int | None = None,
+    prune: bool = True,
+) -> dict[str, int]:
+    """
+    디렉토리의 Markdown 파일들을 스트리밍 파이프라인으로 수집합니다.
+
+    Args:
+        collection: 저장할 MongoDB 컬렉션
+        client: OpenAI 클라이언트
+        root: 디렉토리 또는 단일 파일
+        pattern: glob 패턴
+        checkpoint: 재개용 checkpoint (None이면 모든 파일 처리)
+        cache: 로컬 임베딩 캐시
+        encoding: content_vector 저장 인코딩
+        dimensions: 임베딩 차원
+        batch_chunks: 임베딩/upsert 배치당 최소 청크 수
+        workers: 분할 프로세스 수
+        max_pending: 동시에 분할 중인 최대 파일 수 (기본: workers * 4)
+        prune: 탐색 완료 후 사라진 파일의 청크 삭제 (checkpoint가 있고 root가 디렉토리일 때)
+
+    Returns:
+        dict: {"files", "skipped", "added", "unchanged", "deleted", "removed_files"}
+
+    Raises:
+        Exception: upsert 실패 시 (이미 반영된 배치는 checkpoint에 남음)
+    """
+    totals = {
+        "files": 0,
+        "skipped": 0,
+        "added": 0,
+        "unchanged": 0,
+        "deleted": 0,
+        "removed_files": 0,
+    }
+    limiter = RateLimiter()  # 모든 배치가 RPM/TPM 예산 공유
+    seen = 0
+
+    def pending_files() -> Iterator[tuple[str, Path, str]]:
+        nonlocal seen
+        for source, path in iter_files(root, pattern):
+            seen += 1
+            if checkpoint:
+                checkpoint.mark_seen(source)
+            signature = file_signature(path)
+            if checkpoint and checkpoint.is_done(source, signature):
+                totals["skipped"] += 1
+                continue
+            yield source, path, signature
+
+    inbox: queue.Queue = queue.Queue(maxsize=UPSERT_QUEUE_SIZE)
+    errors: list[Exception] = []
+    writer = threading.Thread(
+        target=upsert_loop,
+        args=(collection, checkpoint or _NullCheckpoint(), inbox, errors),
+        daemon=True,
+    )
+    writer.start()
+
+    started = time.perf_counter()
+    try:
+        split_stream = split_files(pending_files(), workers, max_pending or workers * 4)
+        for batch in batch_files(split_stream, batch_chunks):
+            if errors:
+                break
+            operations, stats = build_operations(
+                collection,
+                client,
+                {source: chunks for source, _, chunks in batch},
+                cache=cache,
+                encoding=encoding,
+                dimensions=dimensions,
+                limiter=limiter,
+                show_progress=False,
+            )
+            # 큐가 차 있으면 여기서 대기 (upsert → 임베딩 백프레셔)
+            inbox.put((operations, [(source, sig) for source, sig, _ in batch]))
+
+            totals["files"] += len(batch)
+            for key, value in stats.items():
+                totals[key] += value
+            elapsed = time.perf_counter() - started
+            print(
+                f"   📥 파일 {totals['files']:,}개 (건너뜀 {totals['skipped']:,}) / "
+                f"신규 청크 {totals['added']:,}개 / {totals['files'] / elapsed:.1f} files/s",
+                end="\r",
+            )
+    finally:
+        inbox.put(_STOP)
+        writer.join()
+
+    if errors:
+        raise errors[0]
+
+    # 탐색이 끝까지 완료된 경우에만 사라진 파일 정리
+    if prune and checkpoint and root.is_dir():
+        if seen:
+            for key, value in prune_deleted(collection, checkpoint).items():
+                totals[key] += value
+        else:
+            print(f"\n   ⚠️ {root}에서 파일을 찾지 못해 삭제된 파일 정리를 건너뜁니다")
+    return totals
+
+
+# ============================================================
+# 메인 실행
+# ============================================================
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Markdown 코퍼스 스트리밍 수집")
+    parser.add_argument("root", help="수집할 디렉토리 (또는 단일 파일)")
+    parser.add_argument("--glob", default="**/*.md", help="파일 glob 패턴")
+    parser.add_argument("--db", default="hackers")
+    parser.add_argument("--collection", default="rag_demo")
+    parser.add_argument("--batch-chunks", type=int, default=DEFAULT_BATCH_CHUNKS)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--max-pending", type=int, help="동시 분할 파일 수 상한")
+    parser.add_argument(
+        "--restart", action="store_true", help="모든 파일을 처음부터 다시 수집 (checkpoint 시그니처 초기화)"
+    )
+    parser.add_argument(
+        "--keep-deleted",
+        action="store_true",
+        help="트리에서 사라진 파일의 청크를 삭제하지 않음",
+    )
+    parser.add_argument(
+        "--build-index", action="store_true", help="수집 후 로컬 벡터 인덱스 생성"
+    )
+    args = parser.parse_args()
+
+    openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    mongo_client = MongoClient(os.getenv("MONGODB_URI"))
+    collection = mongo_client[args.db][args.collection]
+    cache = EmbeddingCache()
+
+    # checkpoint는 컬렉션별로 분리 (다른 컬렉션 수집 시 잘못 건너뛰지 않도록)
+    checkpoint = Checkpoint(CHECKPOINT_DIR / f"{args.db}.{args.collection}.sqlite")
+    if args.restart:
+        checkpoint.reset()
+
+    print(f"🚚 {args.root} ({args.glob}) → {args.db}.{args.collection}")
+    try:
+        totals = ingest_corpus(
+            collection,
+            openai_client,
+            Path(args.root),
+            pattern=args.glob,
+            checkpoint=checkpoint,
+            cache=cache,
+            batch_chunks=args.batch_chunks,
+            workers=args.workers,
+            max_pending=args.max_pending,
+            prune=not args.keep_deleted,
+        )
+    finally:
+        checkpoint.close()
+
+    print(
+        f"\n✅ 수집 완료! 파일 {totals['files']:,}개 (건너뜀 {totals['skipped']:,}개) / "
+        f"청크 신규 {totals['added']:,}개 · 유지 {totals['unchanged']:,}개 · "
+        f"삭제 {totals['deleted']:,}개 (사라진 파일 {totals['removed_files']:,}개)"
+    )
+
+    if args.build_index:
+        index = build_local_index(collection)
+        print(
+            f"   📦 로컬 인덱스 생성: {index.kind} ({len(index)}개) → {LOCAL_INDEX_DIR}"
+        )
+
+
+if __name__ == "__main__":
+    main()
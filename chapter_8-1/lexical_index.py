@@ -0,0 +1,200 @@
+"""
+Chapter 8-1: RAG Pipeline - 로컬 어휘(BM25) 인덱스
+
+벡터 검색은 "나루토", "린네간", "스태미나 5" 같은 고유명사/수치의 정확 일치에 약하고,
+결과를 얻기 전에 쿼리 임베딩 왕복이 필요합니다.
+ingest 시점에 청크의 역색인(inverted index)을 만들어 두면 쿼리 임베딩 없이 후보를 얻을 수 있습니다.
+
+[토큰화] (한국어 대응)
+- NFKC 정규화 + 소문자화
+- 한글/한자/가나 연속 구간: 문자 bigram ("나루토의" → 나루, 루토, 토의) → 조사가 붙어도 일치
+- 영문/숫자: 단어 단위 (3.5 같은 소수 포함)
+- 1글자 구간: 그대로 사용
+
+[저장 구조] (로컬 벡터 인덱스와 같은 디렉토리, 행 번호 공유)
+- lexical_terms.json: term → term id
+- lexical_offsets.npy / lexical_rows.npy / lexical_weights.npy: term별 posting (CSR)
+  weight는 BM25 점수 기여분을 미리 계산한 값 (질의 시 덧셈만 수행)
+"""
+
+import json
+import re
+import unicodedata
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from metadata_filter import Partitions
+from vector_index import resolve_index_dir
+
+# BM25 파라미터
+K1 = 1.2
+B = 0.75
+
+# 한글 음절 / 가나 / 한자
+_CJK = r"\uac00-\ud7a3\u3040-\u30ff\u4e00-\u9fff"
+_TOKEN_PATTERN = re.compile(rf"[{_CJK}]+|[a-z0-9]+(?:\.[0-9]+)?")
+_CJK_PATTERN = re.compile(rf"[{_CJK}]")
+
+
+def tokenize(text: str) -> list[str]:
+    """한글 구간은 문자 bigram, 영문/숫자는 단어 단위로 토큰화"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    tokens = []
+    for run in _TOKEN_PATTERN.findall(text):
+        if len(run) > 1 and _CJK_PATTERN.match(run):
+            tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+class LexicalIndex:
+    """
+    BM25 역색인 (행 번호는 documents / LocalVectorIndex와 동일)
+
+    Attributes:
+        documents: 행 번호별 문서 (_id, content, metadata)
+        terms: term → term id
+    """
+
+    def __init__(
+        self,
+        documents: list[dict],
+        terms: dict[str, int],
+        offsets: np.ndarray,
+        rows: np.ndarray,
+        weights: np.ndarray,
+    ) -> None:
+        self.documents = documents
+        self.terms = terms
+        self.offsets = offsets
+        self.rows = rows
+        self.weights = weights
+        self.partitions = Partitions(documents)
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @classmethod
+    def build(cls, documents: list[dict]) -> "LexicalIndex":
+        """문서 content로 BM25 역색인 생성"""
+        term_ids: dict[str, int] = {}
+        postings: list[list[tuple[int, int]]] = []
+        lengths = np.zeros(len(documents), dtype=np.float32)
+
+        for row, doc in enumerate(documents):
+            counts = Counter(tokenize(doc.get("content", "")))
+            lengths[row] = sum(counts.values())
+            for term, tf in counts.items():
+                term_id = term_ids.setdefault(term, len(term_ids))
+                if term_id == len(postings):
+                    postings.append([])
+                postings[term_id].append((row, tf))
+
+        n_docs = max(len(documents), 1)
+        avg_length = float(lengths.mean()) if len(documents) else 1.0
+        offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+        rows, weights = [], []
+        for term_id, posting in enumerate(postings):
+            offsets[term_id + 1] = offsets[term_id] + len(posting)
+            idf = np.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            posting_rows = np.array([row for row, _ in posting], dtype=np.int32)
+            tf = np.array([tf for _, tf in posting], dtype=np.float32)
+            norm = K1 * (1 - B + B * lengths[posting_rows] / (avg_length or 1.0))
+            rows.append(posting_rows)
+            weights.append((idf * tf * (K1 + 1) / (tf + norm)).astype(np.float32))
+
+        return cls(
+            documents,
+            term_ids,
+            offsets,
+            np.concatenate(rows) if rows else np.zeros(0, dtype=np.int32),
+            np.concatenate(weights) if weights else np.zeros(0, dtype=np.float32),
+        )
+
+    def search(
+        self, query: str, limit: int = 5, rows: np.ndarray | None = None
+    ) -> list[tuple[int, float, float]]:
+        """
+        BM25 검색
+
+        Args:
+            rows: 검색할 행 번호 (partitions.rows(필터)) / None이면 전체
+
+        Returns:
+            list[tuple]: (행 번호, BM25 점수, coverage) 점수 내림차순
+                coverage: 쿼리의 서로 다른 토큰 중 문서에 있는 비율 (정확 일치 판단용)
+        """
+        query_terms = Counter(tokenize(query))
+        if not query_terms or not len(self):
+            return []
+        scores = np.zeros(len(self), dtype=np.float32)
+        matched = np.zeros(len(self), dtype=np.int32)
+        for term, count in query_terms.items():
+            term_id = self.terms.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            posting = self.rows[start:end]
+            # term 하나의 posting 안에서 행 번호는 중복되지 않음
+            scores[posting] += self.weights[start:end] * count
+            matched[posting] += 1
+
+        hits = np.flatnonzero(scores) if rows is None else rows[scores[rows] > 0]
+        if not len(hits):
+            return []
+        k = min(limit, len(hits))
+        top = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (int(row), float(scores[row]), float(matched[row] / len(query_terms)))
+            for row in top
+        ]
+
+    def save(self, index_dir: Path) -> None:
+        """
+        로컬 벡터 인덱스 디렉토리에 저장 (documents.json은 공유)
+
+        index_dir는 staged_index_dir()의 임시 디렉토리 (벡터 인덱스와 함께 원자적으로 교체)
+        """
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        np.save(index_dir / "lexical_offsets.npy", self.offsets)
+        np.save(index_dir / "lexical_rows.npy", self.rows)
+        np.save(index_dir / "lexical_weights.npy", self.weights)
+        (index_dir / "lexical_terms.json").write_text(
+            json.dumps(self.terms, ensure_ascii=False), encoding="utf-8"
+        )
+
+    @classmethod
+    def exists(cls, index_dir: Path) -> bool:
+        return (resolve_index_dir(index_dir) / "lexical_terms.json").exists()
+
+    @classmethod
+    def load(
+        cls, index_dir: Path, documents: list[dict] | None = None
+    ) -> "LexicalIndex":
+        """
+        인덱스 로드
+
+        Args:
+            index_dir: 인덱스 디렉토리 (documents를 넘길 때는 같은 버전 디렉토리)
+            documents: 이미 로드한 LocalVectorIndex.documents (없으면 documents.json 로드)
+        """
+        index_dir = resolve_index_dir(index_dir)
+        if documents is None:
+            documents = json.loads(
+                (index_dir / "documents.json").read_text(encoding="utf-8")
+            )
+        terms = json.loads(
+            (index_dir / "lexical_terms.json").read_text(encoding="utf-8")
+        )
+        return cls(
+            documents,
+            terms,
+            np.load(index_dir / "lexical_offsets.npy"),
+            np.load(index_dir / "lexical_rows.npy"),
+            np.load(index_dir / "lexical_weights.npy"),
+        )
@@ -0,0 +1,198 @@
+"""
+Chapter 8-1: RAG Pipeline - Markdown 분할기 (langchain_text_splitters 대체)
+
+split_document()가 쓰던 두 splitter와 같은 결과(청크 문자열 + 헤더 메타데이터)를
+외부 의존성 없이 만듭니다. langchain import(콜드 스타트의 대부분)와 Document 객체 생성을 없앴습니다.
+
+[헤더 분할] (MarkdownHeaderTextSplitter(headers_to_split_on, strip_headers=True)와 동일)
+- 줄 단위 1회 순회, 헤더 줄은 본문에서 제거하고 메타데이터(h1/h2/h3)로 기록
+- 빈 줄로 나뉜 블록 중 메타데이터가 같은 연속 블록은 "  \\n"으로 이어 붙임
+- ``` / ~~~ 코드 블록 안의 "#"은 헤더로 보지 않음
+
+[세부 분할] (RecursiveCharacterTextSplitter(chunk_size, chunk_overlap)와 동일)
+- 구분자 우선순위: "\\n\\n" → "\\n" → " " → 문자 단위
+- 구분자는 뒤 조각의 앞에 유지, 청크 앞뒤 공백 제거
+- 정규식 대신 str.split, 조각 문자열 대신 길이만 계산 → 누적 길이 이분 탐색으로 병합 후 원문 슬라이스
+
+동일성 검증 / 처리량 비교: python chapter_8-1/bench_splitter.py
+"""
+
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+# 재귀 분할 구분자 (RecursiveCharacterTextSplitter 기본값)
+SEPARATORS = ("\n\n", "\n", " ", "")
+
+# aggregate_lines_to_chunks()의 블록 연결 문자열
+BLOCK_JOINER = "  \n"
+
+
+def _clean_line(line: str) -> str:
+    """앞뒤 공백 제거 + 출력 불가 문자 제거 (대부분의 줄은 검사만 하고 통과)"""
+    line = line.strip()
+    if line.isprintable():
+        return line
+    return "".join(filter(str.isprintable, line))
+
+
+def split_sections(text: str, headers: list[tuple[str, str]]) -> list[tuple[str, dict]]:
+    """
+    헤더 기준 섹션 분할
+
+    Args:
+        text: Markdown 문서 텍스트
+        headers: [("#", "h1"), ("##", "h2"), ...]
+
+    Returns:
+        list[tuple]: (섹션 본문, 헤더 메타데이터)
+    """
+    # 긴 구분자부터 검사 ("##"가 "#"로 잘못 잡히지 않도록)
+    headers = sorted(headers, key=lambda header: len(header[0]), reverse=True)
+    sections: list[tuple[str, dict]] = []
+    metadata: dict[str, str] = {}
+    levels: list[tuple[int, str]] = []  # 열린 헤더 (level, name) 스택
+    block: list[str] = []
+    in_code_block = False
+    fence = ""
+
+    def flush() -> None:
+        content = "\n".join(block)
+        block.clear()
+        if sections and sections[-1][1] == metadata:
+            sections[-1] = (sections[-1][0] + BLOCK_JOINER + content, sections[-1][1])
+        else:
+            sections.append((content, metadata.copy()))
+
+    for raw_line in text.split("\n"):
+        line = _clean_line(raw_line)
+        if not in_code_block:
+            if line.startswith("```") and line.count("```") == 1:
+                in_code_block, fence = True, "```"
+            elif line.startswith("~~~"):
+                in_code_block, fence = True, "~~~"
+        elif line.startswith(fence):
+            in_code_block, fence = False, ""
+
+        if in_code_block:
+            block.append(line)
+            continue
+
+        for sep, name in headers:
+            if line.startswith(sep) and (
+                len(line) == len(sep) or line[len(sep)] == " "
+            ):
+                # 헤더 앞까지의 블록은 이전 메타데이터로 저장
+                if block:
+                    flush()
+                level = len(sep)
+                while levels and levels[-1][0] >= level:
+                    metadata.pop(levels.pop()[1], None)
+                levels.append((level, name))
+                metadata[name] = line[len(sep) :].strip()
+                break
+        else:
+            if line:
+                block.append(line)
+            elif block:
+                flush()
+
+    if block:
+        flush()
+    return sections
+
+
+def _piece_lengths(text: str, separator: str) -> list[int]:
+    """
+    구분자로 나눈 조각 길이 (구분자는 뒤 조각의 앞에 포함, 빈 조각 제외)
+
+    조각은 text를 빈틈없이 이어 붙인 구간이므로 길이만으로 위치를 알 수 있습니다.
+    """
+    if not separator:
+        return [1] * len(text)
+    first, *rest = text.split(separator)
+    lengths = [len(first)] if first else []
+    size = len(separator)
+    lengths.extend([size + len(part) for part in rest])
+    return lengths
+
+
+def _merge(
+    text: str,
+    begin: int,
+    lengths: list[int],
+    chunk_size: int,
+    chunk_overlap: int,
+    out: list[str],
+) -> None:
+    """
+    text[begin:]에서 시작하는 작은 조각들을 chunk_size 이하 청크로 병합
+
+    누적 길이에서 이분 탐색으로 청크 끝(chunk_size 이하 최대)과
+    다음 청크 시작(끝에서 chunk_overlap 이내 + 다음 조각이 들어갈 자리)을 찾습니다.
+    """
+    offsets = list(accumulate(lengths, initial=begin))
+    count = len(lengths)
+    start = 0
+    while True:
+        end = bisect_right(offsets, offsets[start] + chunk_size, start + 1) - 1
+        chunk = text[offsets[start] : offsets[end]].strip()
+        if chunk:
+            out.append(chunk)
+        if end == count:
+            return
+        keep_from = max(offsets[end] - chunk_overlap, offsets[end + 1] - chunk_size)
+        start = bisect_left(offsets, keep_from, start, end)
+
+
+def split_recursive(
+    text: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    separators: tuple[str, ...] = SEPARATORS,
+    out: list[str] | None = None,
+) -> list[str]:
+    """
+    구분자 우선순위대로 재귀 분할
+
+    Args:
+        text: 섹션 본문
+        chunk_size: 청크 최대 길이 (문자)
+        chunk_overlap: 인접 청크 사이 겹침 길이 (문자)
+
+    Returns:
+        list[str]: 청크 문자열
+    """
+    if chunk_overlap > chunk_size:
+        raise ValueError(
+            f"chunk_overlap({chunk_overlap})은 chunk_size({chunk_size}) 이하여야 합니다"
+        )
+    if out is None:
+        out = []
+
+    # text에 들어 있는 첫 구분자 선택 ("" = 문자 단위는 항상 선택 가능)
+    for i, separator in enumerate(separators):
+        if not separator or separator in text:
+            remaining = separators[i + 1 :] if separator else ()
+            break
+
+    # chunk_size 미만 조각은 모아서 병합, 큰 조각은 다음 구분자로 재귀 분할
+    small: list[int] = []
+    small_begin = position = 0
+    for length in _piece_lengths(text, separator):
+        if length < chunk_size:
+            if not small:
+                small_begin = position
+            small.append(length)
+        else:
+            if small:
+                _merge(text, small_begin, small, chunk_size, chunk_overlap, out)
+                small = []
+            piece = text[position : position + length]
+            if remaining:
+                split_recursive(piece, chunk_size, chunk_overlap, remaining, out)
+            else:
+                out.append(piece)
+        position += length
+    if small:
+        _merge(text, small_begin, small, chunk_size, chunk_overlap, out)
+    return out
@@ -0,0 +1,274 @@
+"""
+Chapter 8-1: RAG Pipeline - 메타데이터 필터 / 섹션 라우터
+
+청크 metadata(source, h1, h2, h3)로 검색 범위를 좁힙니다.
+같은 필터 식을 Atlas $vectorSearch의 filter(사전 필터링)와 로컬 인덱스의 파티션(행 번호 집합)에 사용합니다.
+
+[필터 식] (MongoDB 쿼리 문법의 부분집합, 필드 이름은 metadata 기준)
+- {"source": "sample.md"}                   같음
+- {"h1": {"$in": ["A", "B"]}}               여러 값 중 하나 ($nin / $ne / $eq 포함)
+- {"$and": [...]}, {"$or": [...]}           조합
+- 문자열 표현 (parse_filter): "source=sample.md", "h2=서론|결론", "h2!=서론"
+
+[Atlas]
+- to_atlas_filter()가 필드에 "metadata." 접두사를 붙임
+- 인덱스 정의에 filter 필드가 있어야 함 (vector_codec.index_definition)
+- CollectionPartitions: 필터 범위의 청크 수를 count_documents로 세어 (식별 키별 캐시)
+  numCandidates를 범위 크기로 축소 → 코퍼스 버전이 바뀌면 새 인스턴스로 교체
+
+[로컬 인덱스]
+- Partitions: 필터 식 → 조건을 만족하는 행 번호 (정렬, 식별 키별 LRU 캐시)
+- 검색은 파티션 행만 점수 계산 → 코퍼스가 클수록, 파티션이 작을수록 빨라짐
+
+[섹션 라우터] (SectionRouter)
+- 섹션(source + 헤더 경로)별 청크 벡터 평균(centroid)을 미리 계산
+- 쿼리 임베딩과 centroid 유사도 상위 섹션만 검색 → 후보 수(numCandidates)도 파티션 크기로 축소
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# 필터에 사용할 수 있는 metadata 필드 (Atlas 인덱스 정의의 filter 필드)
+FILTER_FIELDS = ("source", "h1", "h2", "h3")
+
+# 라우팅 단위: source + h1 + h2
+ROUTER_KEYS = ("source", "h1", "h2")
+DEFAULT_ROUTES = 3
+
+MAX_CACHED_PARTITIONS = 256
+
+
+def parse_filter(expressions: list[str]) -> dict | None:
+    """
+    "필드=값" 문자열 목록 → 필터 식 (여러 개면 $and)
+
+    - "h2=서론|결론" → {"h2": {"$in": ["서론", "결론"]}}
+    - "h2!=서론"     → {"h2": {"$ne": "서론"}}
+
+    Raises:
+        ValueError: 형식이 잘못되었거나 FILTER_FIELDS에 없는 필드
+    """
+    clauses = []
+    for expression in expressions:
+        expression = expression.strip()
+        if not expression:
+            continue
+        negate = "!=" in expression
+        field, sep, value = expression.partition("!=" if negate else "=")
+        field = field.strip()
+        if not sep or field not in FILTER_FIELDS:
+            raise ValueError(
+                f"필터 형식 오류: {expression!r} (필드: {', '.join(FILTER_FIELDS)})"
+            )
+        values = [v.strip() for v in value.split("|")]
+        if negate:
+            condition = {"$nin": values} if len(values) > 1 else {"$ne": values[0]}
+        else:
+            condition = {"$in": values} if len(values) > 1 else values[0]
+        clauses.append({field: condition})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def combine_filters(*filters: dict | None) -> dict | None:
+    """None이 아닌 필터들의 $and"""
+    clauses = [f for f in filters if f]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def filter_key(expression: dict | None) -> str:
+    """필터 식의 식별 키 (캐시 / 답변 캐시 scope용)"""
+    if not expression:
+        return ""
+    return json.dumps(expression, ensure_ascii=False, sort_keys=True)
+
+
+def _match_condition(value, condition) -> bool:
+    if not isinstance(condition, dict):
+        return value == condition
+    for op, operand in condition.items():
+        if op == "$eq" and value != operand:
+            return False
+        if op == "$ne" and value == operand:
+            return False
+        if op == "$in" and value not in operand:
+            return False
+        if op == "$nin" and value in operand:
+            return False
+        if op not in ("$eq", "$ne", "$in", "$nin"):
+            raise ValueError(f"지원하지 않는 연산자: {op}")
+    return True
+
+
+def match_filter(metadata: dict, expression: dict | None) -> bool:
+    """metadata가 필터 식을 만족하는지 (없는 필드는 None)"""
+    if not expression:
+        return True
+    for key, condition in expression.items():
+        if key == "$and":
+            if not all(match_filter(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(match_filter(metadata, clause) for clause in condition):
+                return False
+        elif not _match_condition(metadata.get(key), condition):
+            return False
+    return True
+
+
+def to_atlas_filter(expression: dict) -> dict:
+    """필터 식 → $vectorSearch filter (필드에 "metadata." 접두사, 여러 필드는 $and)"""
+    clauses = []
+    for key, condition in expression.items():
+        if key in ("$and", "$or"):
+            clauses.append({key: [to_atlas_filter(clause) for clause in condition]})
+        else:
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            clauses.append({f"metadata.{key}": condition})
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class Partitions:
+    """
+    필터 식별 파티션(행 번호) 캐시
+
+    documents를 한 번 훑어 조건을 만족하는 행을 모으고, 같은 필터는 재사용합니다.
+    """
+
+    def __init__(self, documents: list[dict]) -> None:
+        self.documents = documents
+        self._rows: OrderedDict[str, np.ndarray] = OrderedDict()
+
+    def rows(self, expression: dict) -> np.ndarray:
+        """필터를 만족하는 행 번호 (오름차순 int64)"""
+        key = filter_key(expression)
+        rows = self._rows.get(key)
+        if rows is None:
+            rows = np.fromiter(
+                (
+                    row
+                    for row, doc in enumerate(self.documents)
+                    if match_filter(doc.get("metadata", {}), expression)
+                ),
+                dtype=np.int64,
+            )
+            self._rows[key] = rows
+            while len(self._rows) > MAX_CACHED_PARTITIONS:
+                self._rows.popitem(last=False)
+        else:
+            self._rows.move_to_end(key)
+        return rows
+
+    def count(self, expression: dict) -> int:
+        """필터를 만족하는 청크 수"""
+        return len(self.rows(expression))
+
+
+class CollectionPartitions:
+    """
+    Atlas 컬렉션의 필터별 청크 수 (count_documents, 식별 키별 LRU 캐시)
+
+    Partitions.count()와 같은 인터페이스로 numCandidates 축소에 사용합니다.
+    캐시는 만료되지 않으므로 코퍼스 버전이 바뀌면 새 인스턴스를 만들어야 합니다.
+    여러 스레드에서 호출할 수 있습니다.
+    """
+
+    def __init__(self, collection) -> None:
+        self.collection = collection
+        self._counts: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, expression: dict) -> int:
+        """필터를 만족하는 청크 수 (캐시 미스만 DB 왕복)"""
+        key = filter_key(expression)
+        with self._lock:
+            if key in self._counts:
+                self._counts.move_to_end(key)
+                return self._counts[key]
+        count = self.collection.count_documents(to_atlas_filter(expression))
+        with self._lock:
+            self._counts[key] = count
+            while len(self._counts) > MAX_CACHED_PARTITIONS:
+                self._counts.popitem(last=False)
+        return count
+
+
+class SectionRouter:
+    """
+    쿼리 → 관련 섹션 선택 (섹션 centroid와 cosine 유사도)
+
+    Attributes:
+        sections: 섹션별 {"source", "h1", "h2"} (값이 없는 키는 생략)
+        counts: 섹션별 청크 수
+        centroids: 정규화된 섹션 평균 벡터 (n_sections, d)
+    """
+
+    def __init__(
+        self, sections: list[dict], counts: np.ndarray, centroids: np.ndarray
+    ) -> None:
+        self.sections = sections
+        self.counts = counts
+        self.centroids = centroids
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    @classmethod
+    def build(cls, documents: list[dict], vectors: np.ndarray) -> "SectionRouter":
+        """로컬 인덱스 documents / vectors(정규화)로 섹션 centroid 계산"""
+        section_ids: dict[tuple, int] = {}
+        assign = np.empty(len(documents), dtype=np.int64)
+        for row, doc in enumerate(documents):
+            metadata = doc.get("metadata", {})
+            key = tuple(metadata.get(field) for field in ROUTER_KEYS)
+            assign[row] = section_ids.setdefault(key, len(section_ids))
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        sums = np.zeros((len(section_ids), vectors.shape[1]), dtype=np.float32)
+        np.add.at(sums, assign, vectors)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+
+        sections = [
+            {
+                field: value
+                for field, value in zip(ROUTER_KEYS, key)
+                if value is not None
+            }
+            for key in section_ids
+        ]
+        counts = np.bincount(assign, minlength=len(section_ids))
+        return cls(sections, counts, sums / norms)
+
+    def route(
+        self, query_embedding: list[float], top_n: int = DEFAULT_ROUTES
+    ) -> tuple[dict | None, int]:
+        """
+        유사도 상위 top_n개 섹션으로 제한하는 필터
+
+        헤더가 없는 섹션은 상위 경로 전체가 포함됩니다. (예: h2 없는 청크 → 같은 h1 전체)
+
+        Returns:
+            tuple: (필터 식, 섹션 청크 수 합) / 섹션이 top_n개 이하면 (None, 0)
+        """
+        if len(self) <= top_n:
+            return None, 0
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        scores = self.centroids @ query
+        top = np.argsort(-scores)[:top_n]
+        clauses = [self.sections[i] for i in top]
+        expression = clauses[0] if len(clauses) == 1 else {"$or": clauses}
+        return expression, int(self.counts[top].sum())
+
+
+def scoped_num_candidates(num_candidates: int, limit: int, candidates: int) -> int:
+    """파티션이 작으면 numCandidates를 파티션 크기로 축소 (최소 limit)"""
+    return max(limit, min(num_candidates, candidates))
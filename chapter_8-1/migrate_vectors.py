@@ -0,0 +1,96 @@
+"""
+Chapter 8-1: RAG Pipeline - content_vector 인코딩 마이그레이션
+
+기존 컬렉션의 content_vector를 목표 인코딩으로 일괄 변환합니다.
+- 이미 목표 인코딩인 문서는 건너뜀 (중단 후 재실행 가능)
+- 배치 단위 bulk_write (UpdateOne $set / $unset)
+- 변환 후 Atlas Vector Search 인덱스 정의 출력 (binary는 similarity가 달라 재생성 필요)
+
+[손실 주의]
+int8 / binary(int8 재채점 사본)에서 float32로 되돌리면 원래 값이 복원되지 않습니다.
+이 경우 ingest.py로 다시 임베딩하는 것을 권장합니다.
+
+[이전 버전 binary 문서]
+float32 원본(content_vector_full)이 있는 binary 문서는 binary로 다시 변환하면
+int8 재채점 사본(content_vector_rescore)으로 바뀌어 크기가 줄어듭니다.
+
+실행: python chapter_8-1/migrate_vectors.py int8
+"""
+
+import argparse
+import json
+import os
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+from vector_codec import (
+    ENCODINGS,
+    FULL_VECTOR_FIELD,
+    RESCORE_VECTOR_FIELD,
+    decode_vector,
+    detect_encoding,
+    encode_vector,
+    index_definition,
+)
+
+load_dotenv()
+
+BATCH_SIZE = 500
+
+
+def main():
+    parser = argparse.ArgumentParser(description="content_vector 인코딩 마이그레이션")
+    parser.add_argument("encoding", choices=ENCODINGS, help="목표 인코딩")
+    parser.add_argument("--db", default="hackers")
+    parser.add_argument("--collection", default="rag_demo")
+    args = parser.parse_args()
+
+    mongo_client = MongoClient(os.getenv("MONGODB_URI"))
+    collection = mongo_client[args.db][args.collection]
+
+    projection = {"content_vector": 1, FULL_VECTOR_FIELD: 1, RESCORE_VECTOR_FIELD: 1}
+    operations: list[UpdateOne] = []
+    converted = skipped = lossy = 0
+    dimensions = 0
+
+    print(f"🔄 {args.db}.{args.collection} → {args.encoding}")
+    for doc in collection.find({}, projection):
+        current = detect_encoding(doc["content_vector"])
+        vector = decode_vector(doc)
+        dimensions = len(vector)
+        if current == args.encoding and FULL_VECTOR_FIELD not in doc:
+            skipped += 1
+            continue
+        if current in ("int8", "binary") and FULL_VECTOR_FIELD not in doc:
+            lossy += 1
+
+        update = {
+            "$set": encode_vector(vector, args.encoding),
+            "$unset": {FULL_VECTOR_FIELD: ""},
+        }
+        if args.encoding != "binary":
+            update["$unset"][RESCORE_VECTOR_FIELD] = ""
+        operations.append(UpdateOne({"_id": doc["_id"]}, update))
+
+        if len(operations) >= BATCH_SIZE:
+            collection.bulk_write(operations, ordered=False)
+            converted += len(operations)
+            operations = []
+            print(f"   ✏️ 변환 중... ({converted}개)", end="\r")
+
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+        converted += len(operations)
+
+    print(f"\n✅ 변환 {converted}개 / 유지 {skipped}개")
+    if lossy:
+        print(f"   ⚠️ {lossy}개는 양자화된 값에서 변환되어 원본 정밀도가 없습니다")
+
+    if dimensions:
+        print("\n📐 Atlas Vector Search 인덱스 정의 (vector_index):")
+        print(json.dumps(index_definition(args.encoding, dimensions), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,18 +4,106 @@ Chapter 8-1: RAG Pipeline - 질의 엔드포인트 (Query)
 사용자 질문을 받아 Vector Search로 관련 문서를 검색하고,
 LLM을 사용하여 답변을 생성합니다.
 
+[임베딩 차원]
+- 컬렉션(또는 로컬 인덱스)에 기록된 {model, dimensions}로 쿼리를 임베딩하고, 차원이 다르면 중단
+
+[컨텍스트 패킹]
+- 검색 결과를 그대로 붙이지 않고, 같은 섹션의 인접/겹치는 청크를 병합하여 토큰 예산 안에서 구성
+
+[스트리밍 답변]
+- 토큰이 도착하는 대로 출력하고, [n] 인용은 등장 즉시 출처로 매핑 (CitationTracker)
+- 첫 토큰까지 시간(TTFT), 출력 속도(tokens/s), 전체 생성 시간을 따로 측정
+
+[하이브리드 검색] (환경 변수 HYBRID_SEARCH, lexical_index.py)
+- BM25 어휘 검색을 먼저 실행 (쿼리 임베딩 불필요, 1ms 미만)
+- 정확 일치가 확실하면 어휘 결과만 사용 (임베딩 호출 생략)
+- 아니면 벡터 결과와 Reciprocal Rank Fusion으로 결합
+
+[검색 범위] (metadata_filter.py)
+- SEARCH_FILTER: metadata 필터 (예: "source=sample.md;h2=서론|결론")
+  → Atlas는 $vectorSearch filter, 로컬 인덱스는 파티션(필터를 만족하는 행)만 검색
+- SECTION_ROUTING=true: 쿼리 임베딩과 가까운 섹션 SECTION_ROUTES개로 먼저 범위를 좁힘
+- 범위가 정해지면 numCandidates를 범위 안 청크 수 이하로 축소
+  (로컬: 인덱스 파티션 행 수 / Atlas: 컬렉션 count_documents, CollectionPartitions)
+
+[검색 백엔드] (환경 변수 VECTOR_SEARCH_BACKEND)
+- atlas: MongoDB Atlas $vectorSearch (기본값)
+- local: ingest.py가 생성한 로컬 벡터 인덱스 (vector_index.py, MongoDB 불필요)
+
 실행: python chapter_8-1/query.py
+(상주 서비스: server.py)
 """
 
 import os
+import re
 import time
+from collections.abc import Iterator
 
 from dotenv import load_dotenv
 from openai import OpenAI
 from pymongo import MongoClient
+from pymongo.collection import Collection
+
+from context_packer import DEFAULT_TOKEN_BUDGET, context_tokens, pack_context
+from embedder import (
+    EMBEDDING_DIMENSIONS,
+    EMBEDDING_MODEL,
+    collection_embedding_config,
+    embed_texts,
+)
+from embedding_cache import EmbeddingCache
+from lexical_index import LexicalIndex
+from metadata_filter import (
+    DEFAULT_ROUTES,
+    CollectionPartitions,
+    Partitions,
+    SectionRouter,
+    combine_filters,
+    parse_filter,
+    scoped_num_candidates,
+    to_atlas_filter,
+)
+from vector_codec import RESCORE_FIELDS, encode_query, rescore_documents
+from vector_index import (
+    DEFAULT_INDEX_DIR,
+    LocalVectorIndex,
+    index_exists,
+    resolve_index_dir,
+)
 
 load_dotenv()
 
+# 검색 설정
+VECTOR_SEARCH_BACKEND = os.getenv("VECTOR_SEARCH_BACKEND", "atlas")  # "atlas" | "local"
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", str(DEFAULT_INDEX_DIR))
+VECTOR_ENCODING = os.getenv("VECTOR_ENCODING", "float32")  # ingest.py와 동일하게 설정
+NUM_CANDIDATES = 40
+LIMIT = 5
+# binary 인코딩: 비트 검색으로 limit × RESCORE_FACTOR개 후보를 가져와 int8 사본으로 재채점
+# (비트 검색 recall이 낮으므로 후보를 넉넉히, bench_vectors.py --rescore-factor로 확인)
+RESCORE_FACTOR = int(os.getenv("RESCORE_FACTOR", "10"))
+
+# 하이브리드 검색: 로컬 인덱스 디렉토리에 BM25 어휘 인덱스가 있으면 벡터 결과와 RRF로 결합
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+HYBRID_FETCH_FACTOR = 2  # 결합 전 각 검색에서 limit × 2개씩 가져옴
+RRF_K = 60
+# 어휘 fast path: 1위 문서가 쿼리 토큰을 모두 포함하고 2위보다 점수가 충분히 높으면 임베딩 생략
+LEXICAL_FAST_COVERAGE = 1.0
+LEXICAL_FAST_MARGIN = 1.5
+
+# 검색 범위: metadata 필터 ("필드=값"을 ;로 구분) / 섹션 라우팅
+SEARCH_FILTER = parse_filter(os.getenv("SEARCH_FILTER", "").split(";"))
+SECTION_ROUTING = os.getenv("SECTION_ROUTING", "false").lower() == "true"
+SECTION_ROUTES = int(os.getenv("SECTION_ROUTES", str(DEFAULT_ROUTES)))
+
+ANSWER_MODEL = "gpt-5.1"
+
+# 컨텍스트 본문 토큰 예산 (context_packer.py: 같은 섹션 병합 + 겹침 제거 후 점수 순으로 채움)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", str(DEFAULT_TOKEN_BUDGET)))
+
+# 답변 본문의 인용 표시: [1], [2], [1, 3]
+CITATION_PATTERN = re.compile(r"\[(\d+(?:\s*,\s*\d+)*)\]")
+
 SYSTEM_PROMPT = """당신은 제공된 문서를 기반으로 질문에 답변하는 AI 어시스턴트입니다.
 
 규칙:
@@ -25,50 +113,444 @@ SYSTEM_PROMPT = """당신은 제공된 문서를 기반으로 질문에 답변
 4. 답변 시 참고한 컨텍스트 번호를 [1], [2] 형식으로 본문에 인용 표시하세요."""
 
 
+def resolve_embedding_config(
+    collection: Collection | None = None,
+    index: LocalVectorIndex | None = None,
+) -> dict:
+    """
+    검색 대상에 기록된 임베딩 설정 조회
+
+    Returns:
+        {"model": ..., "dimensions": ...} (기록이 없으면 기본 설정)
+
+    Raises:
+        ValueError: 로컬 인덱스 차원과 기록된 설정이 다른 경우
+    """
+    default = {"model": EMBEDDING_MODEL, "dimensions": EMBEDDING_DIMENSIONS}
+    if index is not None:
+        metadata = index.documents[0].get("metadata", {}) if len(index) else {}
+        fallback = {**default, "dimensions": index.dimensions}
+        config = metadata.get("embedding") or fallback
+        if config["dimensions"] != index.dimensions:
+            raise ValueError(
+                f"로컬 인덱스 차원({index.dimensions})과 청크 설정({config})이 다릅니다. "
+                "ingest.py로 인덱스를 다시 생성하세요."
+            )
+        return config
+    if collection is not None:
+        return collection_embedding_config(collection) or default
+    return default
+
+
+def check_query_embedding(query_embedding: list[float], config: dict) -> None:
+    """쿼리 임베딩 차원이 컬렉션 설정과 같은지 확인"""
+    if len(query_embedding) != config["dimensions"]:
+        raise ValueError(
+            f"쿼리 임베딩 차원({len(query_embedding)})이 "
+            f"컬렉션 설정({config['dimensions']})과 다릅니다"
+        )
+
+
+def search_atlas(
+    collection: Collection,
+    query_embedding: list[float],
+    num_candidates: int = NUM_CANDIDATES,
+    limit: int = LIMIT,
+    encoding: str = VECTOR_ENCODING,
+    search_filter: dict | None = None,
+) -> list[dict]:
+    """
+    MongoDB Atlas $vectorSearch로 검색
+
+    binary 인코딩은 비트 벡터로 후보를 넓게 가져온 뒤 int8 사본으로 재채점합니다.
+    search_filter는 $vectorSearch filter로 전달되어 후보 탐색 전에 적용됩니다. (사전 필터링)
+    """
+    rescore = encoding == "binary"
+    fetch_limit = limit * RESCORE_FACTOR if rescore else limit
+    projection = {
+        "content": 1,
+        "metadata": 1,
+        "score": {"$meta": "vectorSearchScore"},
+    }
+    if rescore:
+        projection.update({field: 1 for field in RESCORE_FIELDS})
+
+    vector_search = {
+        "index": "vector_index",
+        "path": "content_vector",
+        "queryVector": encode_query(query_embedding, encoding),
+        "numCandidates": max(num_candidates, fetch_limit),
+        "limit": fetch_limit,
+    }
+    if search_filter:
+        vector_search["filter"] = to_atlas_filter(search_filter)
+    pipeline = [{"$vectorSearch": vector_search}, {"$project": projection}]
+    documents = list(collection.aggregate(pipeline))
+
+    if rescore:
+        documents = rescore_documents(documents, query_embedding, limit)
+    return documents
+
+
+def search_local(
+    index: LocalVectorIndex,
+    query_embedding: list[float],
+    num_candidates: int = NUM_CANDIDATES,
+    limit: int = LIMIT,
+    search_filter: dict | None = None,
+) -> list[dict]:
+    """로컬 벡터 인덱스로 검색 (네트워크 왕복 없음, search_filter는 파티션 행만 검색)"""
+    rows = index.partitions.rows(search_filter) if search_filter else None
+    hits = index.search(
+        query_embedding, limit=limit, num_candidates=num_candidates, rows=rows
+    )
+    return [{**index.documents[row], "score": score} for row, score in hits]
+
+
+def search_lexical(
+    lexical: LexicalIndex,
+    query: str,
+    limit: int = LIMIT,
+    search_filter: dict | None = None,
+) -> tuple[list[dict], bool]:
+    """
+    BM25 어휘 검색 (쿼리 임베딩 불필요)
+
+    Returns:
+        tuple: (검색 결과, 정확 일치 fast path 여부)
+    """
+    rows = lexical.partitions.rows(search_filter) if search_filter else None
+    hits = lexical.search(query, limit=limit, rows=rows)
+    documents = [
+        {**lexical.documents[row], "score": score, "lexical_score": score}
+        for row, score, _ in hits
+    ]
+    confident = bool(hits) and hits[0][2] >= LEXICAL_FAST_COVERAGE
+    if confident and len(hits) > 1:
+        confident = hits[0][1] >= LEXICAL_FAST_MARGIN * hits[1][1]
+    return documents, confident
+
+
+def reciprocal_rank_fusion(
+    result_lists: list[list[dict]], limit: int = LIMIT, k: int = RRF_K
+) -> list[dict]:
+    """
+    여러 검색 결과를 순위 기반으로 결합 (점수 척도가 달라도 됨)
+
+    score = Σ 1 / (k + rank)  (문서가 나타난 결과 목록마다)
+    """
+    fused: dict[str, dict] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, 1):
+            entry = fused.setdefault(str(doc["_id"]), {**doc, "score": 0.0})
+            entry["score"] += 1.0 / (k + rank)
+            if "lexical_score" in doc:
+                entry["lexical_score"] = doc["lexical_score"]
+    return sorted(fused.values(), key=lambda doc: doc["score"], reverse=True)[:limit]
+
+
+def load_section_router(
+    index: LocalVectorIndex | None = None, index_dir: str = LOCAL_INDEX_DIR
+) -> SectionRouter | None:
+    """
+    섹션 라우터 생성 (로컬 인덱스 벡터 사용)
+
+    Atlas 백엔드도 ingest.py가 만든 로컬 인덱스가 있으면 라우팅에 사용합니다.
+    """
+    if index is None:
+        if not index_exists(index_dir):
+            return None
+        index = LocalVectorIndex.load(index_dir)
+    return SectionRouter.build(index.documents, index.vectors)
+
+
+def scope_search(
+    query_embedding: list[float],
+    search_filter: dict | None,
+    num_candidates: int,
+    limit: int,
+    router: SectionRouter | None = None,
+    partitions: Partitions | CollectionPartitions | None = None,
+) -> dict:
+    """
+    벡터 검색 범위 결정: 사용자 필터 + 섹션 라우팅
+
+    Args:
+        router: 섹션 라우터 (None이면 라우팅 생략)
+        partitions: 범위 안 청크 수를 셀 파티션 - 검색 대상과 같은 문서여야 함
+            (로컬 인덱스 Partitions / Atlas CollectionPartitions, 없으면 numCandidates 유지)
+
+    Returns:
+        dict: {"filter", "num_candidates", "candidates" (범위 안 청크 수 또는 None)}
+    """
+    routed = None
+    if router is not None:
+        routed, _ = router.route(query_embedding, SECTION_ROUTES)
+    scoped = combine_filters(search_filter, routed)
+    candidates = None
+    if scoped and partitions is not None:
+        candidates = partitions.count(scoped)
+        num_candidates = scoped_num_candidates(num_candidates, limit, candidates)
+    return {
+        "filter": scoped,
+        "num_candidates": num_candidates,
+        "candidates": candidates,
+    }
+
+
+def load_lexical_index(
+    index_dir: str = LOCAL_INDEX_DIR, documents: list[dict] | None = None
+) -> LexicalIndex | None:
+    """하이브리드 검색이 켜져 있고 어휘 인덱스가 있으면 로드"""
+    if not HYBRID_SEARCH or not LexicalIndex.exists(index_dir):
+        return None
+    return LexicalIndex.load(index_dir, documents)
+
+
+def format_context(documents: list[dict]) -> str:
+    """검색 결과를 [번호] 인용이 가능한 컨텍스트 문자열로 변환"""
+    if not documents:
+        return "관련 문서를 찾을 수 없습니다."
+    context_parts = []
+    for i, doc in enumerate(documents, 1):
+        content = doc.get("content", "")
+        score = doc.get("score", 0)
+        context_parts.append(f"[{i}] (score: {score:.4f})\n{content}")
+    return "\n\n".join(context_parts)
+
+
+def answer_messages(query: str, context: str) -> list[dict]:
+    """답변 생성 프롬프트"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"컨텍스트:\n{context}\n\n질문: {query}"},
+    ]
+
+
+def generate_answer(client: OpenAI, query: str, context: str) -> str:
+    """LLM으로 답변 생성"""
+    response = client.chat.completions.create(
+        model=ANSWER_MODEL,
+        messages=answer_messages(query, context),
+    )
+    return response.choices[0].message.content
+
+
+def to_sources(documents: list[dict]) -> list[dict]:
+    """검색 결과 → 인용 번호([n])별 출처"""
+    return [
+        {
+            "index": i,
+            "source": doc.get("metadata", {}).get("source"),
+            "header_path": doc.get("metadata", {}).get("header_path"),
+            "score": float(doc.get("score", 0.0)),
+            "preview": doc.get("content", "").replace("\n", " ")[:120],
+        }
+        for i, doc in enumerate(documents, 1)
+    ]
+
+
+class CitationTracker:
+    """
+    스트리밍 중인 답변에서 [n] 인용을 찾아 즉시 출처로 매핑
+
+    토큰 경계에서 "[1" / "]"처럼 잘린 인용은 닫는 괄호가 도착한 뒤에 인식됩니다.
+    """
+
+    def __init__(self, sources: list[dict]) -> None:
+        self.sources = sources
+        self.text = ""
+        self.cited: list[int] = []  # 처음 등장한 순서
+        self._scan_from = 0
+
+    def feed(self, delta: str) -> list[dict]:
+        """토큰 추가 → 새로 인용된 출처 목록"""
+        self.text += delta
+        found = []
+        for match in CITATION_PATTERN.finditer(self.text, self._scan_from):
+            self._scan_from = match.end()
+            for number in (int(n) for n in match.group(1).split(",")):
+                if number in self.cited or not 1 <= number <= len(self.sources):
+                    continue
+                self.cited.append(number)
+                found.append(self.sources[number - 1])
+        return found
+
+
+def stream_answer(client: OpenAI, query: str, documents: list[dict]) -> Iterator[dict]:
+    """
+    답변을 스트리밍으로 생성
+
+    Yields:
+        {"type": "token", "text": ...}: 답변 조각 (도착 즉시)
+        {"type": "citation", **source}: 처음 등장한 [n] 인용의 출처
+        {"type": "done", "answer", "sources", "cited", "metrics"}: 마지막 1회
+            metrics: ttft_ms (첫 토큰까지), generate_ms (전체), tokens, tokens_per_sec
+    """
+    sources = to_sources(documents)
+    tracker = CitationTracker(sources)
+
+    started = time.perf_counter()
+    first_token_at = None
+    deltas = 0
+    usage = None
+    stream = client.chat.completions.create(
+        model=ANSWER_MODEL,
+        messages=answer_messages(query, format_context(documents)),
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    for chunk in stream:
+        if chunk.usage:
+            usage = chunk.usage  # 마지막 청크 (choices 없음)
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        if first_token_at is None:
+            first_token_at = time.perf_counter()
+        deltas += 1
+        yield {"type": "token", "text": delta}
+        for source in tracker.feed(delta):
+            yield {"type": "citation", **source}
+    finished = time.perf_counter()
+
+    yield {
+        "type": "done",
+        "answer": tracker.text,
+        "sources": sources,
+        "cited": tracker.cited,
+        "metrics": stream_metrics(started, first_token_at, finished, usage, deltas),
+    }
+
+
+def stream_metrics(
+    started: float,
+    first_token_at: float | None,
+    finished: float,
+    usage=None,
+    deltas: int = 0,
+) -> dict:
+    """
+    스트리밍 생성 지표
+
+    - ttft_ms: 요청 → 첫 답변 토큰 (사용자가 체감하는 대기 시간)
+    - tokens_per_sec: 첫 토큰 이후 출력 속도 (reasoning 토큰 제외)
+    """
+    tokens = deltas
+    if usage is not None:
+        details = getattr(usage, "completion_tokens_details", None)
+        reasoning = getattr(details, "reasoning_tokens", 0) or 0
+        tokens = usage.completion_tokens - reasoning
+    first_token_at = first_token_at or finished
+    decode_time = finished - first_token_at
+    return {
+        "ttft_ms": (first_token_at - started) * 1000,
+        "generate_ms": (finished - started) * 1000,
+        "tokens": tokens,
+        "tokens_per_sec": tokens / decode_time if decode_time > 0 else 0.0,
+    }
+
+
 def main():
     # 클라이언트 초기화
     openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    mongo_client = MongoClient(os.getenv("MONGODB_URI"))
-    collection = mongo_client["hackers"]["rag_demo"]
+    cache = EmbeddingCache()
+    if VECTOR_SEARCH_BACKEND == "local":
+        # 벡터 / 어휘 인덱스를 같은 버전 디렉토리에서 로드
+        index_dir = resolve_index_dir(LOCAL_INDEX_DIR)
+        local_index = LocalVectorIndex.load(index_dir)
+        print(f"📦 로컬 인덱스 로드: {local_index.kind} ({len(local_index)}개 청크)")
+        embedding_config = resolve_embedding_config(index=local_index)
+        lexical = load_lexical_index(index_dir, local_index.documents)
+        router = load_section_router(local_index) if SECTION_ROUTING else None
+        partitions = local_index.partitions
+    else:
+        mongo_client = MongoClient(os.getenv("MONGODB_URI"))
+        collection = mongo_client["hackers"]["rag_demo"]
+        embedding_config = resolve_embedding_config(collection=collection)
+        lexical = load_lexical_index()
+        router = load_section_router() if SECTION_ROUTING else None
+        # 범위 크기는 검색 대상인 컬렉션에서 셈 (어휘 인덱스는 오래됐을 수 있음)
+        partitions = CollectionPartitions(collection)
+    if SEARCH_FILTER:
+        print(f"🎯 검색 필터: {SEARCH_FILTER}")
+    if router is not None:
+        print(f"🧭 섹션 라우팅: 섹션 {len(router)}개 중 {SECTION_ROUTES}개")
 
     # 하드코딩된 질문
     query = "데이터북 기준 나루토와 사스케의 스태미나 수치는 각각 얼마이며, 이 차이가 최종전에서 어떤 영향을 미쳤나요?"
     print(f"\n🙋 질문: {query}")
 
-    # STEP 1: Vector Search로 관련 문서 검색
+    # STEP 1: 관련 문서 검색 (어휘 → 벡터 → RRF 결합)
     print("\n🔍 검색 중...")
     t0 = time.perf_counter()
 
-    # 쿼리 임베딩 생성
-    embedding_response = openai_client.embeddings.create(
-        model="text-embedding-3-small",
-        input=query,
-    )
-    query_embedding = embedding_response.data[0].embedding
+    lexical_documents, confident = [], False
+    if lexical is not None:
+        lexical_documents, confident = search_lexical(
+            lexical, query, LIMIT * HYBRID_FETCH_FACTOR, SEARCH_FILTER
+        )
 
-    # MongoDB $vectorSearch
-    pipeline = [
-        {
-            "$vectorSearch": {
-                "index": "vector_index",
-                "path": "content_vector",
-                "queryVector": query_embedding,
-                "numCandidates": 40,
-                "limit": 5,
-            }
-        },
-        {
-            "$project": {
-                "content": 1,
-                "metadata": 1,
-                "score": {"$meta": "vectorSearchScore"},
-            }
-        },
-    ]
-    documents = list(collection.aggregate(pipeline))
+    if confident:
+        # 정확 일치: 임베딩 왕복 없이 어휘 결과 사용
+        documents = lexical_documents[:LIMIT]
+        mode = "어휘 (정확 일치, 임베딩 생략)"
+    else:
+        # 쿼리 임베딩 생성 (이전에 같은 질문을 했다면 로컬 캐시 사용)
+        query_embedding = embed_texts(
+            openai_client,
+            [query],
+            model=embedding_config["model"],
+            dimensions=embedding_config["dimensions"],
+            show_progress=False,
+            cache=cache,
+        )[0]
+        check_query_embedding(query_embedding, embedding_config)
+
+        # 검색 범위 (필터 + 섹션 라우팅 → numCandidates 축소)
+        fetch_limit = LIMIT * HYBRID_FETCH_FACTOR if lexical is not None else LIMIT
+        scope = scope_search(
+            query_embedding,
+            SEARCH_FILTER,
+            NUM_CANDIDATES,
+            fetch_limit,
+            router,
+            partitions,
+        )
+        if scope["candidates"] is not None:
+            print(
+                f"   🎯 검색 범위: 청크 {scope['candidates']}개 "
+                f"(numCandidates {NUM_CANDIDATES} → {scope['num_candidates']})"
+            )
+
+        # Vector Search (Atlas 또는 로컬 인덱스)
+        if VECTOR_SEARCH_BACKEND == "local":
+            documents = search_local(
+                local_index,
+                query_embedding,
+                scope["num_candidates"],
+                fetch_limit,
+                scope["filter"],
+            )
+        else:
+            documents = search_atlas(
+                collection,
+                query_embedding,
+                scope["num_candidates"],
+                fetch_limit,
+                search_filter=scope["filter"],
+            )
+
+        if lexical is not None:
+            documents = reciprocal_rank_fusion([documents, lexical_documents], LIMIT)
+            mode = "하이브리드 (BM25 + 벡터, RRF)"
+        else:
+            mode = "벡터"
 
     search_time = time.perf_counter() - t0
-    print(f"   → {len(documents)}개 문서 검색됨 ({search_time:.2f}초)")
+    print(f"   → {len(documents)}개 문서 검색됨 ({search_time:.2f}초, {mode})")
 
     # 검색된 컨텍스트 미리보기
     if documents:
@@ -79,34 +561,35 @@ def main():
             preview = content.replace("\n", " ")[:80]
             print(f"   [{i}] (score: {score:.4f}) {preview}...")
 
-    # STEP 2: 컨텍스트 포맷팅
-    if not documents:
-        context = "관련 문서를 찾을 수 없습니다."
-    else:
-        context_parts = []
-        for i, doc in enumerate(documents, 1):
-            content = doc.get("content", "")
-            score = doc.get("score", 0)
-            context_parts.append(f"[{i}] (score: {score:.4f})\n{content}")
-        context = "\n\n".join(context_parts)
+    # STEP 2: 컨텍스트 패킹 (같은 섹션 병합 + 겹침 제거 + 토큰 예산)
+    packed = pack_context(documents, CONTEXT_TOKEN_BUDGET)
+    print(
+        f"\n📦 컨텍스트 패킹: 청크 {len(documents)}개 ({context_tokens(documents)}토큰) → "
+        f"블록 {len(packed)}개 ({context_tokens(packed)}토큰, 예산 {CONTEXT_TOKEN_BUDGET})"
+    )
 
-    # STEP 3: LLM으로 답변 생성
+    # STEP 3: LLM으로 답변 생성 (스트리밍: 토큰이 도착하는 대로 출력)
     print("\n💡 답변 생성 중...")
-    t0 = time.perf_counter()
+    print("\n✅ 답변:")
+    for event in stream_answer(openai_client, query, packed):
+        if event["type"] == "token":
+            print(event["text"], end="", flush=True)
+        elif event["type"] == "done":
+            metrics = event["metrics"]
+            cited = [event["sources"][n - 1] for n in event["cited"]]
+    print()
 
-    response = openai_client.chat.completions.create(
-        model="gpt-5.1",
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": f"컨텍스트:\n{context}\n\n질문: {query}"},
-        ],
+    print(
+        f"\n   → 첫 토큰 {metrics['ttft_ms'] / 1000:.2f}초 / "
+        f"전체 {metrics['generate_ms'] / 1000:.2f}초 / "
+        f"{metrics['tokens']}토큰 ({metrics['tokens_per_sec']:.1f} tokens/s)"
     )
-    answer = response.choices[0].message.content
-
-    gen_time = time.perf_counter() - t0
-    print(f"   → 답변 생성 완료 ({gen_time:.2f}초)")
-
-    print(f"\n✅ 답변:\n{answer}")
+    if cited:
+        print("\n📚 인용된 출처 (등장 순서):")
+        for source in cited:
+            print(
+                f"   [{source['index']}] {source['source']} > {source['header_path']}"
+            )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,805 @@
+"""
+Chapter 8-1: RAG Pipeline - 질의 서비스 (FastAPI)
+
+query.py의 검색 + 답변 생성을 상주 서비스로 제공합니다.
+요청마다 클라이언트를 새로 만들지 않고 프로세스 수명 동안 재사용합니다.
+
+[상주 리소스] (lifespan에서 1회 생성)
+- OpenAI 클라이언트: HTTP 커넥션 풀 재사용 (요청마다 TLS 핸드셰이크 생략)
+- MongoClient: 커넥션 풀 (Atlas 백엔드)
+- 로컬 벡터 인덱스: 시작 시 로드 (VECTOR_SEARCH_BACKEND=local)
+  → CORPUS_VERSION_TTL초마다 현재 버전(CURRENT / manifest.json)을 확인하여 재수집 후 다시 로드
+  → 인덱스 / 어휘 인덱스 / 섹션 라우터 / 임베딩 설정 / 코퍼스 버전은 스냅샷(Artifacts) 1개로 통째 교체,
+    요청은 시작 시 스냅샷을 1번 읽어 끝까지 사용 (재로드 중에도 한 요청 안에서 버전이 섞이지 않음)
+- 임베딩 캐시: 같은 질문은 임베딩 API 호출 생략 (embedding_cache.py)
+- 시맨틱 답변 캐시: 비슷한 질문 + 같은 코퍼스 버전이면 검색/생성 생략 (answer_cache.py)
+- BM25 어휘 인덱스: 하이브리드 검색 (정확 일치 질문은 임베딩 없이 처리, lexical_index.py)
+- 섹션 라우터: 쿼리와 가까운 섹션으로 검색 범위 축소 (route_sections 옵션, metadata_filter.py)
+
+[엔드포인트]
+- POST /api/v1/query: 단일 질문
+- POST /api/v1/query/batch: 여러 질문 (임베딩 1회 배치 요청 + 검색/생성 동시 실행)
+- POST /api/v1/query/stream: 단일 질문, 답변을 Server-Sent Events로 스트리밍
+- GET /api/v1/cache: 답변 캐시 통계
+- GET /health: 헬스체크
+
+모든 응답에 단계별 소요 시간(embed / search / generate / total, ms)이 포함됩니다.
+스트리밍 응답은 첫 토큰까지 시간(ttft_ms)과 출력 속도(tokens_per_sec)를 함께 기록합니다.
+
+실행: uvicorn server:app --app-dir chapter_8-1 --port 8001
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from openai import OpenAI
+from pydantic import BaseModel, Field
+from pymongo import MongoClient
+from pymongo.collection import Collection
+
+from answer_cache import (
+    DEFAULT_THRESHOLD,
+    SemanticAnswerCache,
+    corpus_version,
+    local_corpus_version,
+)
+from embedder import embed_texts
+from embedding_cache import EmbeddingCache
+from context_packer import pack_context
+from lexical_index import LexicalIndex
+from metadata_filter import (
+    CollectionPartitions,
+    Partitions,
+    SectionRouter,
+    filter_key,
+    parse_filter,
+)
+from query import (
+    CONTEXT_TOKEN_BUDGET,
+    HYBRID_FETCH_FACTOR,
+    LIMIT,
+    LOCAL_INDEX_DIR,
+    NUM_CANDIDATES,
+    SECTION_ROUTING,
+    VECTOR_SEARCH_BACKEND,
+    check_query_embedding,
+    format_context,
+    generate_answer,
+    load_lexical_index,
+    load_section_router,
+    reciprocal_rank_fusion,
+    resolve_embedding_config,
+    scope_search,
+    search_atlas,
+    search_lexical,
+    search_local,
+    stream_answer,
+    to_sources,
+)
+from vector_index import LocalVectorIndex, resolve_index_dir
+
+load_dotenv()
+
+# 답변 캐시 설정
+ANSWER_CACHE_THRESHOLD = float(
+    os.getenv("ANSWER_CACHE_THRESHOLD", str(DEFAULT_THRESHOLD))
+)
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+# 코퍼스 버전 조회 주기 (초): 요청마다 DB 왕복 / 인덱스 확인하지 않도록 캐시
+CORPUS_VERSION_TTL = float(os.getenv("CORPUS_VERSION_TTL", "5"))
+
+# 배치 요청에서 동시에 실행할 검색 + 생성 수
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+MAX_BATCH_SIZE = 100
+
+
+@dataclass(frozen=True)
+class Artifacts:
+    """
+    검색 리소스 스냅샷 (불변, 교체는 전역 변수 1번 대입)
+
+    요청은 시작 시 current_artifacts()로 1번 읽은 스냅샷만 사용하므로
+    재로드 중에도 벡터 / 어휘 인덱스, 라우터, 코퍼스 버전이 서로 다른 버전으로 섞이지 않습니다.
+    """
+
+    embedding_config: dict
+    corpus_version: str
+    local_index: LocalVectorIndex | None = None
+    lexical_index: LexicalIndex | None = None
+    section_router: SectionRouter | None = None
+    # 범위 안 청크 수 (local: 인덱스 파티션 / atlas: 이 코퍼스 버전의 count_documents 캐시)
+    partitions: Partitions | CollectionPartitions | None = None
+    signature: tuple | None = None  # 로컬 인덱스 버전 (local_index_signature)
+
+
+# 전역 인스턴스
+openai_client: OpenAI
+mongo_client: MongoClient | None = None
+collection: Collection | None = None
+artifacts: Artifacts
+embedding_cache: EmbeddingCache
+answer_cache: SemanticAnswerCache
+batch_pool: ThreadPoolExecutor
+_checked_at = {"value": 0.0}
+_reload_lock = threading.Lock()
+
+
+def local_index_signature() -> tuple | None:
+    """로컬 인덱스 현재 버전 식별자 (버전 디렉토리 + manifest.json 수정 시각, 없으면 None)"""
+    index_dir = resolve_index_dir(LOCAL_INDEX_DIR)
+    try:
+        modified = (index_dir / "manifest.json").stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    return str(index_dir), modified
+
+
+def load_artifacts() -> Artifacts:
+    """
+    로컬 인덱스 디렉토리의 현재 버전에서 새 스냅샷 생성 (전역 인스턴스는 바꾸지 않음)
+
+    - local 백엔드: 벡터 인덱스 + 임베딩 설정 + 코퍼스 버전 + 어휘 인덱스 + 섹션 라우터
+    - atlas 백엔드: 컬렉션의 임베딩 설정 / 코퍼스 버전 + 어휘 인덱스 + 섹션 라우터 (있으면)
+    벡터 / 어휘 인덱스는 같은 버전 디렉토리에서 읽습니다.
+    """
+    signature = local_index_signature()
+    index_dir = resolve_index_dir(LOCAL_INDEX_DIR)
+    if VECTOR_SEARCH_BACKEND == "local":
+        index = LocalVectorIndex.load(index_dir)
+        return Artifacts(
+            embedding_config=resolve_embedding_config(index=index),
+            corpus_version=local_corpus_version(index.documents),
+            local_index=index,
+            lexical_index=load_lexical_index(index_dir, index.documents),
+            section_router=load_section_router(index),
+            partitions=index.partitions,
+            signature=signature,
+        )
+    return Artifacts(
+        embedding_config=resolve_embedding_config(collection=collection),
+        corpus_version=corpus_version(collection),
+        lexical_index=load_lexical_index(index_dir),
+        section_router=load_section_router(index_dir=index_dir),
+        partitions=CollectionPartitions(collection),
+        signature=signature,
+    )
+
+
+def refresh_artifacts() -> None:
+    """
+    로컬 인덱스 버전이 바뀌었으면 새 스냅샷으로 교체, Atlas는 코퍼스 버전 갱신
+
+    다른 스레드가 확인 중이면 건너뛰고, 실패하면 기존 스냅샷으로 계속 서비스합니다.
+    """
+    global artifacts
+    if not _reload_lock.acquire(blocking=False):
+        return
+    try:
+        current = artifacts
+        if local_index_signature() != current.signature:
+            artifacts = load_artifacts()
+            print(
+                f"   🔄 Local index reloaded: corpus version {artifacts.corpus_version}"
+            )
+        elif collection is not None:
+            version = corpus_version(collection)
+            if version != current.corpus_version:
+                # 청크 수 캐시는 코퍼스 버전별 (재수집 후 다시 셈)
+                artifacts = replace(
+                    current,
+                    corpus_version=version,
+                    partitions=CollectionPartitions(collection),
+                )
+    except Exception as e:  # 로드 실패 시 기존 인덱스로 계속 서비스
+        print(f"   ❌ Local index reload failed: {e}")
+    finally:
+        _reload_lock.release()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """애플리케이션 시작/종료 시 리소스 관리"""
+    global openai_client, mongo_client, collection, artifacts
+    global embedding_cache, answer_cache, batch_pool
+
+    print("🔌 Initializing connections...")
+    openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    embedding_cache = EmbeddingCache()
+    answer_cache = SemanticAnswerCache(
+        threshold=ANSWER_CACHE_THRESHOLD, max_entries=ANSWER_CACHE_MAX_ENTRIES
+    )
+    batch_pool = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY)
+
+    if VECTOR_SEARCH_BACKEND != "local":
+        mongo_client = MongoClient(os.getenv("MONGODB_URI"))
+        collection = mongo_client["hackers"]["rag_demo"]
+    artifacts = load_artifacts()
+    _checked_at["value"] = time.monotonic()
+    if artifacts.local_index is not None:
+        index = artifacts.local_index
+        print(f"   ✅ Local index: {index.kind} ({len(index)} chunks)")
+    else:
+        print(f"   ✅ MongoDB: {collection.full_name}")
+    if artifacts.lexical_index is not None:
+        terms = len(artifacts.lexical_index.terms)
+        print(f"   ✅ Lexical index: BM25 ({terms} terms, hybrid)")
+    if artifacts.section_router is not None:
+        print(f"   ✅ Section router: {len(artifacts.section_router)} sections")
+    print(f"   ✅ Embedding: {artifacts.embedding_config}")
+    print("🚀 RAG query service ready! Docs: http://localhost:8001/docs")
+
+    yield
+
+    print("\n🔌 Closing connections...")
+    batch_pool.shutdown(wait=False, cancel_futures=True)
+    embedding_cache.close()
+    if mongo_client is not None:
+        mongo_client.close()
+    openai_client.close()
+
+
+app = FastAPI(
+    title="Chapter 8-1: RAG Query API",
+    description="RAG Pipeline - 문서 검색 + 답변 생성 API",
+    version="1.0.0",
+    lifespan=lifespan,
+)
+
+
+# ============================================================
+# Models
+# ============================================================
+
+
+class QueryOptions(BaseModel):
+    """검색 / 캐시 옵션"""
+
+    limit: int = Field(LIMIT, ge=1, le=20, description="컨텍스트로 사용할 청크 수")
+    num_candidates: int = Field(NUM_CANDIDATES, ge=1, le=1000)
+    token_budget: int = Field(
+        CONTEXT_TOKEN_BUDGET, ge=100, le=100_000, description="컨텍스트 토큰 예산"
+    )
+    use_cache: bool = Field(True, description="시맨틱 답변 캐시 사용 여부")
+    filters: list[str] = Field(
+        default_factory=list,
+        description='metadata 필터 (예: "source=sample.md", "h2=서론|결론", "h2!=서론")',
+    )
+    route_sections: bool = Field(
+        SECTION_ROUTING, description="쿼리와 가까운 섹션 안에서만 벡터 검색"
+    )
+
+
+class QueryRequest(QueryOptions):
+    """단일 질문 요청"""
+
+    question: str = Field(..., min_length=1, max_length=2000)
+
+
+class BatchQueryRequest(QueryOptions):
+    """배치 질문 요청"""
+
+    questions: list[str] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class Source(BaseModel):
+    """답변의 [n] 인용에 대응하는 검색 결과"""
+
+    index: int
+    source: Optional[str] = None
+    header_path: Optional[str] = None
+    score: float
+    preview: str
+
+
+class SearchScope(BaseModel):
+    """벡터 검색 범위 (필터 / 섹션 라우팅 적용 결과)"""
+
+    filter: Optional[dict] = None
+    num_candidates: int
+    candidates: Optional[int] = Field(None, description="범위 안 청크 수")
+
+
+class Timings(BaseModel):
+    """단계별 소요 시간 (ms)"""
+
+    embed_ms: float = 0.0
+    search_ms: float = 0.0
+    generate_ms: float = 0.0
+    total_ms: float = 0.0
+    ttft_ms: Optional[float] = None  # 스트리밍: 첫 답변 토큰까지
+    tokens_per_sec: Optional[float] = None  # 스트리밍: 첫 토큰 이후 출력 속도
+
+
+class QueryResponse(BaseModel):
+    """질문 응답"""
+
+    question: str
+    answer: str
+    sources: list[Source]
+    retrieval: str = Field(..., description="lexical | hybrid | vector")
+    scope: Optional[SearchScope] = None
+    cached: bool
+    cache_similarity: Optional[float] = None
+    corpus_version: str
+    timings: Timings
+
+
+class BatchQueryResponse(BaseModel):
+    """배치 응답 (timings는 배치 전체 기준)"""
+
+    results: list[QueryResponse]
+    timings: Timings
+
+
+class HealthResponse(BaseModel):
+    """헬스체크 응답"""
+
+    status: str
+    backend: str
+
+
+# ============================================================
+# Query Pipeline
+# ============================================================
+
+
+def current_artifacts() -> Artifacts:
+    """
+    요청 시작 시 사용할 스냅샷 (요청당 1번만 호출)
+
+    CORPUS_VERSION_TTL초마다 로컬 인덱스 버전 / Atlas 코퍼스 버전을 확인하여 교체합니다.
+    """
+    now = time.monotonic()
+    if now - _checked_at["value"] >= CORPUS_VERSION_TTL:
+        _checked_at["value"] = now
+        refresh_artifacts()
+    return artifacts
+
+
+def embed_questions(snapshot: Artifacts, questions: list[str]) -> list[list[float]]:
+    """질문 임베딩 (임베딩 캐시 → 미스만 1회 배치 요청)"""
+    config = snapshot.embedding_config
+    embeddings = embed_texts(
+        openai_client,
+        questions,
+        model=config["model"],
+        dimensions=config["dimensions"],
+        show_progress=False,
+        cache=embedding_cache,
+    )
+    for embedding in embeddings:
+        check_query_embedding(embedding, config)
+    return embeddings
+
+
+def cache_scope(options: QueryOptions) -> str:
+    """답변 캐시 재사용 범위 (검색 설정이 같아야 같은 컨텍스트)"""
+    search_filter = filter_key(request_filter(options))
+    return (
+        f"{options.limit}:{options.num_candidates}:{options.token_budget}:"
+        f"{options.route_sections}:{search_filter}"
+    )
+
+
+def request_filter(options: QueryOptions) -> dict | None:
+    """요청의 filters → 필터 식 (형식 오류는 400)"""
+    try:
+        return parse_filter(options.filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def search_partitions(
+    snapshot: Artifacts,
+) -> Partitions | CollectionPartitions | None:
+    """범위 안 청크 수를 셀 파티션 (로컬 인덱스 행 / Atlas 컬렉션 count_documents)"""
+    return snapshot.partitions
+
+
+def cached_answer(
+    question: str, query_embedding: list[float], options: QueryOptions, version: str
+) -> dict | None:
+    """시맨틱 답변 캐시 조회 → QueryResponse 필드 (미스면 None)"""
+    if not options.use_cache:
+        return None
+    hit = answer_cache.get(query_embedding, version, cache_scope(options))
+    if not hit:
+        return None
+    entry, similarity = hit
+    return {
+        "question": question,
+        "answer": entry["answer"],
+        "sources": entry["sources"],
+        "cached": True,
+        "cache_similarity": similarity,
+        "corpus_version": version,
+        "timings": {},
+    }
+
+
+def lexical_lookup(snapshot: Artifacts, question: str, options: QueryOptions) -> dict:
+    """
+    BM25 어휘 검색 (임베딩 전에 실행)
+
+    Returns:
+        dict: {"documents", "confident" (정확 일치 → 임베딩 생략), "search_ms"}
+    """
+    if snapshot.lexical_index is None:
+        return {"documents": None, "confident": False, "search_ms": 0.0}
+    t0 = time.perf_counter()
+    documents, confident = search_lexical(
+        snapshot.lexical_index,
+        question,
+        options.limit * HYBRID_FETCH_FACTOR,
+        request_filter(options),
+    )
+    return {
+        "documents": documents,
+        "confident": confident,
+        "search_ms": (time.perf_counter() - t0) * 1000,
+    }
+
+
+def retrieval_mode(snapshot: Artifacts, query_embedding: list[float] | None) -> str:
+    if query_embedding is None:
+        return "lexical"
+    return "hybrid" if snapshot.lexical_index is not None else "vector"
+
+
+def search_documents(
+    snapshot: Artifacts,
+    query_embedding: list[float] | None,
+    options: QueryOptions,
+    lexical_documents: list[dict] | None = None,
+) -> tuple[list[dict], dict | None]:
+    """
+    검색 후 토큰 예산에 맞춰 컨텍스트 패킹
+
+    - query_embedding 없음: 어휘 결과만 사용 (정확 일치 fast path)
+    - 어휘 결과 있음: 벡터 결과와 RRF 결합
+    - 벡터 검색 범위: 요청 필터 + (route_sections) 섹션 라우팅
+
+    Returns:
+        tuple: (패킹된 컨텍스트 블록, 벡터 검색 범위 또는 None)
+    """
+    if query_embedding is None:
+        return (
+            pack_context(lexical_documents[: options.limit], options.token_budget),
+            None,
+        )
+
+    limit = options.limit
+    if lexical_documents is not None:
+        limit *= HYBRID_FETCH_FACTOR
+    scope = scope_search(
+        query_embedding,
+        request_filter(options),
+        options.num_candidates,
+        limit,
+        snapshot.section_router if options.route_sections else None,
+        search_partitions(snapshot),
+    )
+    if snapshot.local_index is not None:
+        documents = search_local(
+            snapshot.local_index,
+            query_embedding,
+            scope["num_candidates"],
+            limit,
+            scope["filter"],
+        )
+    else:
+        documents = search_atlas(
+            collection,
+            query_embedding,
+            scope["num_candidates"],
+            limit,
+            search_filter=scope["filter"],
+        )
+    if lexical_documents is not None:
+        documents = reciprocal_rank_fusion(
+            [documents, lexical_documents], options.limit
+        )
+    return pack_context(documents, options.token_budget), scope
+
+
+def answer_question(
+    snapshot: Artifacts,
+    question: str,
+    query_embedding: list[float] | None,
+    options: QueryOptions,
+    lexical: dict,
+) -> dict:
+    """
+    질문 1개 처리: 답변 캐시 → 검색 → 생성
+
+    Args:
+        snapshot: 요청 시작 시 읽은 스냅샷 (검색과 답변 캐시 버전이 같은 코퍼스 기준)
+        query_embedding: 질문 임베딩 (어휘 fast path면 None → 답변 캐시 생략)
+        lexical: lexical_lookup() 결과
+
+    Returns:
+        dict: QueryResponse 필드 (timings에는 search / generate만 채움)
+    """
+    version = snapshot.corpus_version
+    if query_embedding is not None:
+        cached = cached_answer(question, query_embedding, options, version)
+        if cached:
+            return {**cached, "retrieval": retrieval_mode(snapshot, query_embedding)}
+
+    t0 = time.perf_counter()
+    documents, scope = search_documents(
+        snapshot, query_embedding, options, lexical["documents"]
+    )
+    search_ms = lexical["search_ms"] + (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    answer = generate_answer(openai_client, question, format_context(documents))
+    generate_ms = (time.perf_counter() - t0) * 1000
+
+    result = {"answer": answer, "sources": to_sources(documents)}
+    if options.use_cache and query_embedding is not None:
+        answer_cache.put(
+            question, query_embedding, result, version, cache_scope(options)
+        )
+    return {
+        "question": question,
+        **result,
+        "retrieval": retrieval_mode(snapshot, query_embedding),
+        "scope": scope,
+        "cached": False,
+        "corpus_version": version,
+        "timings": {"search_ms": search_ms, "generate_ms": generate_ms},
+    }
+
+
+def sse(event: str, data: dict) -> str:
+    """Server-Sent Events 메시지 포맷"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _service_error(e: Exception) -> HTTPException:
+    print(f"   ❌ Query error: {e}")
+    return HTTPException(
+        status_code=500,
+        detail="현재 서비스에 일시적인 문제가 발생했습니다. 잠시 후 다시 시도해주세요.",
+    )
+
+
+# ============================================================
+# Health Check
+# ============================================================
+
+
+@app.get("/health", response_model=HealthResponse, tags=["System"])
+def health_check():
+    """헬스체크 엔드포인트"""
+    return HealthResponse(status="healthy", backend=VECTOR_SEARCH_BACKEND)
+
+
+@app.get("/api/v1/cache", tags=["System"])
+def cache_stats():
+    """시맨틱 답변 캐시 통계"""
+    return {**answer_cache.stats(), "threshold": answer_cache.threshold}
+
+
+# ============================================================
+# Query
+# ============================================================
+
+
+@app.post("/api/v1/query", response_model=QueryResponse, tags=["Query"])
+def query(request: QueryRequest):
+    """
+    단일 질문 처리
+
+    어휘 검색 → (정확 일치가 아니면) 질문 임베딩 → 시맨틱 답변 캐시 조회
+    → (미스) 벡터 검색 + RRF 결합 → 답변 생성
+    """
+    started = time.perf_counter()
+    request_filter(request)  # 필터 형식 오류는 400
+    try:
+        snapshot = current_artifacts()
+        lexical = lexical_lookup(snapshot, request.question, request)
+        query_embedding, embed_ms = None, 0.0
+        if not lexical["confident"]:
+            t0 = time.perf_counter()
+            query_embedding = embed_questions(snapshot, [request.question])[0]
+            embed_ms = (time.perf_counter() - t0) * 1000
+
+        result = answer_question(
+            snapshot, request.question, query_embedding, request, lexical
+        )
+    except Exception as e:
+        raise _service_error(e)
+
+    result["timings"] = Timings(
+        embed_ms=embed_ms,
+        **result["timings"],
+        total_ms=(time.perf_counter() - started) * 1000,
+    )
+    return QueryResponse(**result)
+
+
+@app.post("/api/v1/query/batch", response_model=BatchQueryResponse, tags=["Query"])
+def query_batch(request: BatchQueryRequest):
+    """
+    여러 질문 일괄 처리
+
+    어휘 정확 일치가 아닌 질문만 한 번의 배치 요청으로 임베딩하고,
+    질문별 검색 + 생성은 동시에 실행합니다.
+    각 결과의 embed_ms는 공유된 배치 임베딩 시간입니다. (임베딩을 생략한 질문은 0)
+    """
+    started = time.perf_counter()
+    request_filter(request)  # 필터 형식 오류는 400
+    try:
+        snapshot = current_artifacts()
+        lexicals = [lexical_lookup(snapshot, q, request) for q in request.questions]
+        pending = [i for i, lexical in enumerate(lexicals) if not lexical["confident"]]
+        embeddings: list[list[float] | None] = [None] * len(request.questions)
+        embed_ms = 0.0
+        if pending:
+            t0 = time.perf_counter()
+            vectors = embed_questions(snapshot, [request.questions[i] for i in pending])
+            embed_ms = (time.perf_counter() - t0) * 1000
+            for i, vector in zip(pending, vectors):
+                embeddings[i] = vector
+
+        futures = [
+            batch_pool.submit(
+                answer_question, snapshot, question, embedding, request, lexical
+            )
+            for question, embedding, lexical in zip(
+                request.questions, embeddings, lexicals
+            )
+        ]
+        results = [future.result() for future in futures]
+    except Exception as e:
+        raise _service_error(e)
+
+    total_ms = (time.perf_counter() - started) * 1000
+    responses = []
+    for result in results:
+        item_timings = result["timings"]
+        item_embed_ms = 0.0 if result["retrieval"] == "lexical" else embed_ms
+        result["timings"] = Timings(
+            embed_ms=item_embed_ms,
+            **item_timings,
+            total_ms=item_embed_ms
+            + item_timings.get("search_ms", 0.0)
+            + item_timings.get("generate_ms", 0.0),
+        )
+        responses.append(QueryResponse(**result))
+
+    return BatchQueryResponse(
+        results=responses,
+        timings=Timings(
+            embed_ms=embed_ms,
+            search_ms=sum(r.timings.search_ms for r in responses),
+            generate_ms=sum(r.timings.generate_ms for r in responses),
+            total_ms=total_ms,
+        ),
+    )
+
+
+@app.post("/api/v1/query/stream", tags=["Query"])
+def query_stream(request: QueryRequest):
+    """
+    단일 질문 스트리밍 (Server-Sent Events)
+
+    이벤트 순서:
+    - meta: corpus_version, sources(인용 번호별 출처), cached, embed/search 시간
+    - token: 답변 조각 {"text": ...} (도착 즉시)
+    - citation: 처음 등장한 [n] 인용의 출처
+    - done: 전체 답변, 인용 순서, timings (ttft_ms / tokens_per_sec 포함)
+    - error: 생성 도중 실패
+    """
+    started = time.perf_counter()
+    request_filter(request)  # 필터 형식 오류는 400
+    try:
+        snapshot = current_artifacts()
+        lexical = lexical_lookup(snapshot, request.question, request)
+        query_embedding, embed_ms, cached = None, 0.0, None
+        version = snapshot.corpus_version
+        if not lexical["confident"]:
+            t0 = time.perf_counter()
+            query_embedding = embed_questions(snapshot, [request.question])[0]
+            embed_ms = (time.perf_counter() - t0) * 1000
+            cached = cached_answer(request.question, query_embedding, request, version)
+        documents, scope = [], None
+        search_ms = lexical["search_ms"]
+        if not cached:
+            t0 = time.perf_counter()
+            documents, scope = search_documents(
+                snapshot, query_embedding, request, lexical["documents"]
+            )
+            search_ms += (time.perf_counter() - t0) * 1000
+    except Exception as e:
+        raise _service_error(e)
+
+    def events():
+        meta = {
+            "question": request.question,
+            "corpus_version": version,
+            "retrieval": retrieval_mode(snapshot, query_embedding),
+            "scope": scope,
+            "cached": bool(cached),
+            "sources": cached["sources"] if cached else to_sources(documents),
+            "timings": {"embed_ms": embed_ms, "search_ms": search_ms},
+        }
+        if cached:
+            # 캐시 적중: 저장된 답변을 한 번에 전송
+            meta["cache_similarity"] = cached["cache_similarity"]
+            yield sse("meta", meta)
+            yield sse("token", {"text": cached["answer"]})
+            timings = Timings(
+                embed_ms=embed_ms, total_ms=(time.perf_counter() - started) * 1000
+            )
+            yield sse(
+                "done", {"answer": cached["answer"], "timings": timings.model_dump()}
+            )
+            return
+
+        yield sse("meta", meta)
+        try:
+            for event in stream_answer(openai_client, request.question, documents):
+                if event["type"] == "token":
+                    yield sse("token", {"text": event["text"]})
+                elif event["type"] == "citation":
+                    yield sse(
+                        "citation", {k: v for k, v in event.items() if k != "type"}
+                    )
+                else:
+                    done = event
+        except Exception as e:
+            print(f"   ❌ Stream error: {e}")
+            yield sse("error", {"detail": "답변 생성 중 문제가 발생했습니다."})
+            return
+
+        metrics = done["metrics"]
+        timings = Timings(
+            embed_ms=embed_ms,
+            search_ms=search_ms,
+            generate_ms=metrics["generate_ms"],
+            total_ms=(time.perf_counter() - started) * 1000,
+            ttft_ms=metrics["ttft_ms"],
+            tokens_per_sec=metrics["tokens_per_sec"],
+        )
+        if request.use_cache and query_embedding is not None:
+            answer_cache.put(
+                request.question,
+                query_embedding,
+                {"answer": done["answer"], "sources": done["sources"]},
+                version,
+                cache_scope(request),
+            )
+        yield sse(
+            "done",
+            {
+                "answer": done["answer"],
+                "cited": done["cited"],
+                "tokens": metrics["tokens"],
+                "timings": timings.model_dump(),
+            },
+        )
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=8001)
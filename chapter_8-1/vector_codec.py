@@ -0,0 +1,193 @@
+"""
+Chapter 8-1: RAG Pipeline - content_vector 압축 인코딩
+
+임베딩을 Python list로 저장하면 BSON double 배열이 되어 1536차원 기준 청크당 약 20KB를
+차지하고, 읽을 때마다 1536개의 float 객체로 디코딩됩니다.
+BSON BinData vector(subtype 9)로 저장하면 크기와 디코딩 비용이 모두 줄어듭니다.
+
+[인코딩 모드] (환경 변수 VECTOR_ENCODING)
+- list: 기존 방식 (BSON double 배열, 약 12바이트/차원)
+- float32: packed float32 BinData (4바이트/차원, 손실 없음)
+- int8: 벡터별 scalar quantization (1바이트/차원, cosine은 스케일 불변이므로 벡터별 스케일 사용)
+- binary: 1비트 부호 양자화 (1/8바이트/차원)
+          + 재채점용 int8 사본을 content_vector_rescore에 함께 저장 (1바이트/차원, 검색 인덱스 대상 아님)
+          → 청크당 float32 단독보다 작고, 재채점 순위는 float 원본과 거의 같음 (int8 recall 참고)
+          (이전 버전의 float32 사본 content_vector_full도 읽을 수 있음, migrate_vectors.py로 변환)
+
+[Atlas Vector Search 인덱스]
+- list / float32 / int8: similarity "cosine"
+- binary: similarity "euclidean" (bit 벡터는 해밍 거리로 검색됨)
+"""
+
+import numpy as np
+from bson.binary import Binary, BinaryVectorDtype
+
+from metadata_filter import FILTER_FIELDS
+
+ENCODINGS = ("list", "float32", "int8", "binary")
+
+# binary 모드에서 재채점용 int8 사본을 저장하는 필드
+RESCORE_VECTOR_FIELD = "content_vector_rescore"
+# 이전 버전 binary 모드의 float32 원본 필드 (읽기 전용, 마이그레이션 시 제거)
+FULL_VECTOR_FIELD = "content_vector_full"
+RESCORE_FIELDS = (RESCORE_VECTOR_FIELD, FULL_VECTOR_FIELD)
+
+_DTYPE_TO_ENCODING = {
+    BinaryVectorDtype.FLOAT32: "float32",
+    BinaryVectorDtype.INT8: "int8",
+    BinaryVectorDtype.PACKED_BIT: "binary",
+}
+_NUMPY_DTYPES = {
+    BinaryVectorDtype.FLOAT32: np.dtype("<f4"),
+    BinaryVectorDtype.INT8: np.int8,
+    BinaryVectorDtype.PACKED_BIT: np.uint8,
+}
+
+
+def _to_binary(array: np.ndarray, dtype: BinaryVectorDtype, padding: int = 0) -> Binary:
+    """NumPy 배열 → BSON BinData vector (subtype 9) 바이트 직접 구성"""
+    data = array.astype(_NUMPY_DTYPES[dtype], copy=False).tobytes()
+    return Binary(dtype.value + bytes([padding]) + data, subtype=9)
+
+
+def quantize_int8(vector: np.ndarray) -> np.ndarray:
+    """벡터별 스케일 int8 양자화 (max|x| → 127)"""
+    scale = np.abs(vector).max()
+    if scale == 0:
+        return np.zeros(len(vector), dtype=np.int8)
+    return np.round(vector * (127.0 / scale)).astype(np.int8)
+
+
+def binarize(vector: np.ndarray) -> np.ndarray:
+    """부호 기준 1비트 양자화 후 8개씩 packing"""
+    return np.packbits(vector > 0)
+
+
+def encode_vector(vector: list[float] | np.ndarray, encoding: str) -> dict:
+    """
+    임베딩을 저장용 필드로 인코딩
+
+    Args:
+        vector: float 임베딩
+        encoding: ENCODINGS 중 하나
+
+    Returns:
+        dict: 문서에 합칠 필드 ({"content_vector": ...} + binary면 원본 필드)
+    """
+    if encoding == "list":
+        return {"content_vector": [float(x) for x in vector]}
+
+    array = np.asarray(vector, dtype=np.float32)
+    if encoding == "float32":
+        return {"content_vector": _to_binary(array, BinaryVectorDtype.FLOAT32)}
+    if encoding == "int8":
+        return {
+            "content_vector": _to_binary(quantize_int8(array), BinaryVectorDtype.INT8)
+        }
+    if encoding == "binary":
+        return {
+            "content_vector": _to_binary(
+                binarize(array), BinaryVectorDtype.PACKED_BIT, padding=-len(array) % 8
+            ),
+            RESCORE_VECTOR_FIELD: _to_binary(
+                quantize_int8(array), BinaryVectorDtype.INT8
+            ),
+        }
+    raise ValueError(f"알 수 없는 인코딩: {encoding} (가능: {', '.join(ENCODINGS)})")
+
+
+def encode_query(vector: list[float], encoding: str) -> list[float] | Binary:
+    """$vectorSearch queryVector를 인덱스 인코딩에 맞춰 변환"""
+    return encode_vector(vector, encoding)["content_vector"]
+
+
+def detect_encoding(value) -> str:
+    """저장된 content_vector의 인코딩 판별"""
+    if isinstance(value, list):
+        return "list"
+    if isinstance(value, Binary) and value.subtype == 9:
+        return _DTYPE_TO_ENCODING[BinaryVectorDtype(bytes(value[:1]))]
+    raise ValueError(f"content_vector 형식을 알 수 없습니다: {type(value)}")
+
+
+def decode_raw(value) -> np.ndarray:
+    """
+    저장된 값을 그대로 NumPy 배열로 디코딩 (리스트 변환 없이 버퍼에서 직접)
+
+    Returns:
+        float32 / int8 / uint8(packed bit) 배열
+    """
+    if isinstance(value, list):
+        return np.asarray(value, dtype=np.float32)
+    # BinData vector 레이아웃: [dtype 1바이트][padding 1바이트][data...]
+    dtype = BinaryVectorDtype(bytes(value[:1]))
+    return np.frombuffer(value, dtype=_NUMPY_DTYPES[dtype], offset=2)
+
+
+def decode_vector(doc: dict) -> np.ndarray:
+    """
+    문서에서 검색/인덱스 빌드용 float32 벡터 복원
+
+    - binary 문서는 재채점용 사본(content_vector_rescore / 이전 버전 content_vector_full)을 사용
+    - int8 문서는 스케일이 사라진 근사 벡터 (cosine 계산에는 영향 없음)
+    """
+    for field in (FULL_VECTOR_FIELD, RESCORE_VECTOR_FIELD):
+        if field in doc:
+            return decode_raw(doc[field]).astype(np.float32)
+    raw = decode_raw(doc["content_vector"])
+    if raw.dtype == np.uint8:
+        # 원본 없는 bit 벡터: ±1로 복원
+        return np.unpackbits(raw).astype(np.float32) * 2 - 1
+    return raw.astype(np.float32)
+
+
+def index_definition(encoding: str, dimensions: int) -> dict:
+    """
+    Atlas Vector Search 인덱스 정의 (인코딩별 similarity)
+
+    metadata.source / h1 / h2 / h3는 $vectorSearch filter(사전 필터링)용 filter 필드
+    """
+    return {
+        "fields": [
+            {
+                "type": "vector",
+                "path": "content_vector",
+                "numDimensions": dimensions,
+                "similarity": "euclidean" if encoding == "binary" else "cosine",
+            },
+            *(
+                {"type": "filter", "path": f"metadata.{field}"}
+                for field in FILTER_FIELDS
+            ),
+        ]
+    }
+
+
+def rescore_documents(
+    documents: list[dict], query_vector: list[float], limit: int
+) -> list[dict]:
+    """
+    binary 검색 후보를 재채점용 사본으로 재채점하여 상위 limit개 반환
+
+    Args:
+        documents: 재채점 필드(RESCORE_FIELDS)가 포함된 후보 문서
+        query_vector: float 쿼리 임베딩
+        limit: 반환할 결과 수
+
+    Returns:
+        cosine 점수 내림차순 문서 (score 갱신, 재채점 필드 제거)
+    """
+    if not documents:
+        return []
+    query = np.array(query_vector, dtype=np.float32)
+    query /= np.linalg.norm(query) or 1.0
+    matrix = np.stack([decode_vector(doc) for doc in documents])
+    norms = np.linalg.norm(matrix, axis=1)
+    norms[norms == 0] = 1.0
+    scores = (matrix @ query) / norms
+
+    for doc, score in zip(documents, scores):
+        doc["score"] = float(score)
+        for field in RESCORE_FIELDS:
+            doc.pop(field, None)
+    return sorted(documents, key=lambda doc: doc["score"], reverse=True)[:limit]
@@ -0,0 +1,435 @@
+"""
+Chapter 8-1: RAG Pipeline - 로컬 벡터 인덱스 (Atlas $vectorSearch 대안)
+
+MongoDB Atlas 없이 프로세스 안에서 content_vector를 검색합니다.
+
+[인덱스 종류]
+- exact: 정규화된 float32 행렬과 쿼리의 행렬곱 (소규모 코퍼스, 정확도 100%)
+- ivfpq: IVF(k-means 역색인) + PQ(Product Quantization) 근사 검색 후
+         상위 후보만 원본 벡터로 재채점 (대규모 코퍼스)
+
+[저장 구조] (index_dir/)
+- CURRENT: 현재 버전 디렉토리 이름 (os.replace로 원자적 교체)
+- versions/<버전>/: 아래 파일 전체 (저장할 때마다 새 디렉토리에 쓰고 CURRENT만 교체)
+  → 기존 버전을 mmap 중인 프로세스는 교체 전 파일을 계속 읽고, 새로 로드하면 새 버전을 읽음
+- manifest.json: 종류, 차원, 파라미터
+- documents.json: 문서 _id, content, metadata (검색 결과 반환용)
+- vectors.npy: 정규화된 float32 벡터 (mmap으로 로드)
+- centroids.npy / codebooks.npy / codes.npy / list_offsets.npy / list_rows.npy (ivfpq 전용)
+
+점수는 Atlas cosine 인덱스와 같은 cosine 유사도입니다.
+
+[필터 검색] (metadata_filter.py)
+- search(rows=...): 파티션(필터를 만족하는 행) 안에서만 검색
+- ivfpq도 파티션이 PARTITION_EXACT_SIZE 이하면 파티션 행만 exact 계산 (근사 단계 생략)
+"""
+
+import json
+import os
+import shutil
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from metadata_filter import Partitions
+
+DEFAULT_INDEX_DIR = Path(__file__).parent / ".cache" / "vector_index"
+
+# 이 문서 수를 넘으면 build(kind="auto")가 ivfpq를 선택
+IVFPQ_THRESHOLD = 50_000
+
+# ivfpq 필터 검색: 파티션이 이 크기 이하면 파티션 전체를 exact로 계산
+PARTITION_EXACT_SIZE = 20_000
+
+# 보관할 버전 디렉토리 수 (현재 + 직전: 교체 직후에도 이전 버전을 읽는 프로세스 보호)
+KEEP_VERSIONS = 2
+
+CURRENT_FILE = "CURRENT"
+
+
+def resolve_index_dir(index_dir: Path | str) -> Path:
+    """
+    현재 버전 디렉토리 (CURRENT가 없으면 index_dir 자체: 이전 저장 구조 / 버전 디렉토리)
+
+    같은 버전의 파일을 여러 번 읽을 때는 이 경로를 한 번 구해 재사용합니다.
+    """
+    index_dir = Path(index_dir)
+    pointer = index_dir / CURRENT_FILE
+    try:
+        name = pointer.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return index_dir
+    return index_dir / "versions" / name
+
+
+def index_exists(index_dir: Path | str) -> bool:
+    return (resolve_index_dir(index_dir) / "manifest.json").exists()
+
+
+@contextmanager
+def staged_index_dir(index_dir: Path | str) -> Iterator[Path]:
+    """
+    새 버전 디렉토리에 저장한 뒤 CURRENT를 원자적으로 교체
+
+    with 블록 안에서 예외가 나면 새 버전은 버리고 현재 버전을 유지합니다.
+
+    Yields:
+        Path: 파일을 쓸 임시 디렉토리
+    """
+    index_dir = Path(index_dir)
+    versions = index_dir / "versions"
+    versions.mkdir(parents=True, exist_ok=True)
+    name = f"v{time.time_ns()}"
+    staging = versions / f".{name}.tmp"
+    staging.mkdir()
+    try:
+        yield staging
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    # STEP 1: 완성된 디렉토리를 버전 이름으로 → STEP 2: CURRENT 교체
+    os.replace(staging, versions / name)
+    pointer_tmp = index_dir / f"{CURRENT_FILE}.tmp"
+    pointer_tmp.write_text(name, encoding="utf-8")
+    os.replace(pointer_tmp, index_dir / CURRENT_FILE)
+
+    # STEP 3: 오래된 버전 정리 (버전 이름은 생성 시각 순)
+    published = sorted(
+        path.name for path in versions.iterdir() if not path.name.startswith(".")
+    )
+    for old in published[:-KEEP_VERSIONS]:
+        shutil.rmtree(versions / old, ignore_errors=True)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """행 단위 L2 정규화 (cosine = 내적)"""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def _kmeans(
+    data: np.ndarray, k: int, iterations: int = 20, seed: int = 0
+) -> np.ndarray:
+    """간단한 k-means (L2, 학습 샘플 기준)"""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+
+    for _ in range(iterations):
+        # ||x - c||^2 = ||x||^2 - 2x·c + ||c||^2 (||x||^2는 argmin에 무관)
+        distances = -2 * data @ centroids.T + (centroids**2).sum(axis=1)
+        assign = distances.argmin(axis=1)
+
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        counts = np.bincount(assign, minlength=k)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # 빈 클러스터는 임의의 점으로 재시작
+        empty = np.flatnonzero(~filled)
+        centroids[empty] = data[rng.integers(len(data), size=len(empty))]
+    return centroids.astype(np.float32)
+
+
+class LocalVectorIndex:
+    """
+    로컬 벡터 인덱스
+
+    Attributes:
+        kind: "exact" 또는 "ivfpq"
+        documents: 행 순서대로의 문서 정보 [{"_id", "content", "metadata"}, ...]
+        vectors: 정규화된 float32 벡터 (n, d)
+    """
+
+    def __init__(self, kind: str, documents: list[dict], vectors: np.ndarray) -> None:
+        self.kind = kind
+        self.documents = documents
+        self.vectors = vectors
+        self.params: dict = {}
+        self.partitions = Partitions(documents)
+        # ivfpq 전용
+        self.centroids: np.ndarray | None = None
+        self.codebooks: np.ndarray | None = None
+        self.codes: np.ndarray | None = None
+        self.list_offsets: np.ndarray | None = None
+        self.list_rows: np.ndarray | None = None
+
+    @property
+    def dimensions(self) -> int:
+        return self.vectors.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    # =========================================================================
+    # 빌드
+    # =========================================================================
+
+    @classmethod
+    def build(
+        cls,
+        documents: list[dict],
+        vectors: np.ndarray | list,
+        kind: str = "auto",
+        n_lists: int | None = None,
+        n_subspaces: int = 64,
+        train_size: int = 20_000,
+        dimensions: int | None = None,
+    ) -> "LocalVectorIndex":
+        """
+        인덱스 생성
+
+        Args:
+            documents: 문서 정보 리스트 (vectors와 같은 순서)
+            vectors: 임베딩 행렬 (n, d)
+            kind: "exact" / "ivfpq" / "auto" (문서 수 기준 자동 선택)
+            n_lists: IVF 리스트 수 (기본값: 4·√n)
+            n_subspaces: PQ 부분공간 수 (d의 약수, 1바이트 코드 × n_subspaces)
+            train_size: k-means 학습 샘플 수
+            dimensions: 임베딩 차원 (문서가 없을 때 필수, 빈 인덱스는 항상 exact)
+
+        Raises:
+            ValueError: 문서가 없는데 dimensions가 없는 경우
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(vectors):
+            if dimensions is None:
+                raise ValueError("문서가 없으면 dimensions를 지정해야 합니다")
+            vectors = np.zeros((0, dimensions), dtype=np.float32)
+            kind = "exact"
+        vectors = _normalize(vectors)
+        if kind == "auto":
+            kind = "ivfpq" if len(vectors) > IVFPQ_THRESHOLD else "exact"
+
+        index = cls(kind, documents, vectors)
+        if kind == "ivfpq":
+            index._train_ivfpq(n_lists, n_subspaces, train_size)
+        return index
+
+    def _train_ivfpq(
+        self, n_lists: int | None, n_subspaces: int, train_size: int
+    ) -> None:
+        n, d = self.vectors.shape
+        if d % n_subspaces:
+            raise ValueError(
+                f"dimensions({d})는 n_subspaces({n_subspaces})의 배수여야 합니다"
+            )
+        n_lists = n_lists or max(1, int(4 * np.sqrt(n)))
+
+        rng = np.random.default_rng(0)
+        sample = self.vectors[rng.choice(n, min(n, train_size), replace=False)]
+
+        # STEP 1: 역색인 중심점 + 리스트 배정
+        centroids = _kmeans(sample, n_lists)
+        assign = np.empty(n, dtype=np.int64)
+        for start in range(0, n, 10_000):
+            block = self.vectors[start : start + 10_000]
+            assign[start : start + 10_000] = (
+                -2 * block @ centroids.T + (centroids**2).sum(axis=1)
+            ).argmin(axis=1)
+
+        # STEP 2: 잔차(residual)의 부분공간별 PQ 코드북 학습
+        sub_d = d // n_subspaces
+        sample_assign = (
+            -2 * sample @ centroids.T + (centroids**2).sum(axis=1)
+        ).argmin(axis=1)
+        residual_sample = sample - centroids[sample_assign]
+        codebooks = np.stack(
+            [
+                _kmeans(residual_sample[:, m * sub_d : (m + 1) * sub_d], 256, 10)
+                for m in range(n_subspaces)
+            ]
+        )
+
+        # STEP 3: 전체 벡터 인코딩 (부분공간별 가장 가까운 코드)
+        codes = np.empty((n, n_subspaces), dtype=np.uint8)
+        for start in range(0, n, 10_000):
+            residual = (
+                self.vectors[start : start + 10_000]
+                - centroids[assign[start : start + 10_000]]
+            )
+            for m in range(n_subspaces):
+                part = residual[:, m * sub_d : (m + 1) * sub_d]
+                codes[start : start + 10_000, m] = (
+                    -2 * part @ codebooks[m].T + (codebooks[m] ** 2).sum(axis=1)
+                ).argmin(axis=1)
+
+        # STEP 4: 리스트별 연속 배치 (CSR 형태)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=len(centroids))
+
+        self.centroids = centroids
+        self.codebooks = codebooks.astype(np.float32)
+        self.codes = codes[order]
+        self.list_rows = order.astype(np.int64)
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self.params = {"n_lists": len(centroids), "n_subspaces": n_subspaces}
+
+    # =========================================================================
+    # 검색
+    # =========================================================================
+
+    def search(
+        self,
+        query_vector: list[float] | np.ndarray,
+        limit: int = 5,
+        num_candidates: int = 40,
+        n_probe: int = 16,
+        rows: np.ndarray | None = None,
+    ) -> list[tuple[int, float]]:
+        """
+        cosine 유사도 상위 limit개 검색
+
+        Args:
+            query_vector: 쿼리 임베딩
+            limit: 반환할 결과 수
+            num_candidates: ivfpq 근사 단계에서 재채점할 후보 수
+                ($vectorSearch의 numCandidates와 같은 의미)
+            n_probe: ivfpq에서 탐색할 리스트 수
+            rows: 검색할 행 번호 (오름차순, partitions.rows(필터)) / None이면 전체
+
+        Returns:
+            [(행 번호, score), ...] (score 내림차순)
+        """
+        if not len(self):
+            return []
+        query = _normalize(np.asarray(query_vector, dtype=np.float32)[None, :])[0]
+
+        if rows is not None and (
+            self.kind == "exact" or len(rows) <= PARTITION_EXACT_SIZE
+        ):
+            # 파티션 행만 계산 (오름차순 → mmap 순차 접근)
+            scores = self.vectors[rows] @ query
+            return [(int(rows[i]), float(scores[i])) for i in _top_k(scores, limit)]
+
+        if self.kind == "exact":
+            scores = self.vectors @ query
+            return [(int(i), float(scores[i])) for i in _top_k(scores, limit)]
+
+        # 근사 후보를 원본 벡터로 재채점 (행 번호 정렬 → mmap 순차 접근)
+        allowed = None
+        if rows is not None:
+            allowed = np.zeros(len(self), dtype=bool)
+            allowed[rows] = True
+        rows = np.sort(
+            self._ivfpq_candidates(query, max(num_candidates, limit), n_probe, allowed)
+        )
+        scores = self.vectors[rows] @ query
+        return [(int(rows[i]), float(scores[i])) for i in _top_k(scores, limit)]
+
+    def _ivfpq_candidates(
+        self,
+        query: np.ndarray,
+        num_candidates: int,
+        n_probe: int,
+        allowed: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """IVF 리스트 선택 + PQ 근사 점수로 후보 행 선택 (allowed: 허용 행 마스크)"""
+        # 내적 점수: q·x ≈ q·c + Σ_m q_m·codebook[m][code_m]
+        centroid_scores = self.centroids @ query
+        probes = _top_k(centroid_scores, n_probe)
+
+        n_subspaces, _, sub_d = self.codebooks.shape
+        lut = np.einsum("mkd,md->mk", self.codebooks, query.reshape(n_subspaces, sub_d))
+
+        candidate_rows, candidate_scores = [], []
+        for probe in probes:
+            start, end = self.list_offsets[probe], self.list_offsets[probe + 1]
+            if start == end:
+                continue
+            list_rows = self.list_rows[start:end]
+            codes = self.codes[start:end]
+            if allowed is not None:
+                keep = allowed[list_rows]
+                list_rows, codes = list_rows[keep], codes[keep]
+                if not len(list_rows):
+                    continue
+            approx = centroid_scores[probe] + lut[np.arange(n_subspaces), codes].sum(
+                axis=1
+            )
+            candidate_rows.append(list_rows)
+            candidate_scores.append(approx)
+
+        if not candidate_rows:
+            return np.empty(0, dtype=np.int64)
+        rows = np.concatenate(candidate_rows)
+        scores = np.concatenate(candidate_scores)
+        return rows[_top_k(scores, num_candidates)]
+
+    # =========================================================================
+    # 저장 / 로드
+    # =========================================================================
+
+    def save(self, index_dir: Path = DEFAULT_INDEX_DIR) -> None:
+        """인덱스를 새 버전으로 저장 (완성 후 CURRENT 원자적 교체)"""
+        with staged_index_dir(index_dir) as staging:
+            self.write_files(staging)
+
+    def write_files(self, directory: Path) -> None:
+        """
+        인덱스 파일을 디렉토리에 기록 (원자성 없음)
+
+        staged_index_dir()의 임시 디렉토리에 다른 인덱스(어휘 인덱스)와 함께 쓸 때 사용합니다.
+        """
+        directory = Path(directory)
+        arrays = {"vectors": self.vectors}
+        if self.kind == "ivfpq":
+            arrays.update(
+                centroids=self.centroids,
+                codebooks=self.codebooks,
+                codes=self.codes,
+                list_offsets=self.list_offsets,
+                list_rows=self.list_rows,
+            )
+        for name, array in arrays.items():
+            np.save(directory / f"{name}.npy", np.ascontiguousarray(array))
+
+        (directory / "documents.json").write_text(
+            json.dumps(self.documents, ensure_ascii=False, default=str),
+            encoding="utf-8",
+        )
+        manifest = {
+            "kind": self.kind,
+            "count": len(self),
+            "dimensions": self.dimensions,
+            "params": self.params,
+        }
+        (directory / "manifest.json").write_text(
+            json.dumps(manifest, indent=2), encoding="utf-8"
+        )
+
+    @classmethod
+    def load(cls, index_dir: Path = DEFAULT_INDEX_DIR) -> "LocalVectorIndex":
+        """인덱스 로드 (현재 버전, 벡터/코드는 memory-mapped, 필요한 페이지만 읽음)"""
+        index_dir = resolve_index_dir(index_dir)
+        manifest = json.loads((index_dir / "manifest.json").read_text(encoding="utf-8"))
+        documents = json.loads(
+            (index_dir / "documents.json").read_text(encoding="utf-8")
+        )
+
+        def _load(name: str) -> np.ndarray:
+            return np.load(index_dir / f"{name}.npy", mmap_mode="r")
+
+        index = cls(manifest["kind"], documents, _load("vectors"))
+        index.params = manifest.get("params", {})
+        if index.kind == "ivfpq":
+            index.centroids = np.asarray(_load("centroids"))
+            index.codebooks = np.asarray(_load("codebooks"))
+            index.codes = _load("codes")
+            index.list_offsets = np.asarray(_load("list_offsets"))
+            index.list_rows = _load("list_rows")
+        return index
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """점수 상위 k개의 인덱스 (내림차순, argpartition으로 O(n))"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]